@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Fronius Modbus MQTT - Hot Path Benchmark
+
+Measures the CPU cost of the parse -> publish path of one poll cycle:
+register block decoding, event flag parsing, MQTT publishing (against a
+null client) and InfluxDB line encoding, plus a whole poller cycle run on
+in-memory register images.
+
+Register blocks come from the simulator's synthetic images, animated over a
+day so values change like on a real device, or from a register dump.
+Results are compared with benchmark_baseline.json; --save stores new
+baselines (they are machine specific, record them on the target box).
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from fronius.config import (ModbusConfig, DevicesConfig, MQTTConfig, InfluxDBConfig,
+                            RollupConfig)
+from fronius.logging_setup import setup_logging, get_logger
+from fronius.modbus_client import DevicePoller, SunSpecDiscovery
+from fronius.mqtt_publisher import MQTTPublisher
+from fronius.influxdb_publisher import InfluxDBPublisher
+from fronius.register_parser import RegisterParser
+from fronius.rollup import RollupEngine
+from fronius.simulator import (SimulatedDevice, build_inverter_image, build_meter_image,
+                               load_dump)
+
+BASELINE_FILE = Path(__file__).parent / 'benchmark_baseline.json'
+INVERTER_ID = 1
+METER_ID = 240
+SNAPSHOTS = 64
+
+
+class NullMQTTClient:
+    """paho client stand-in that accepts every publish"""
+
+    _RESULT = SimpleNamespace(rc=0)  # MQTT_ERR_SUCCESS
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        return self._RESULT
+
+
+class BankConnection(SunSpecDiscovery):
+    """Poller connection that reads from in-memory register banks"""
+
+    def __init__(self, parser: RegisterParser, banks: dict):
+        self.parser = parser
+        self.banks = banks
+        self.log = get_logger()
+        self.connected = True
+        self.successful_reads = 0
+        self.failed_reads = 0
+
+    def connect(self) -> bool:
+        return True
+
+    def disconnect(self):
+        pass
+
+    def read_registers(self, address: int, count: int, unit_id: int):
+        bank = self.banks.get(unit_id)
+        return bank.read(address, count) if bank else None
+
+    def report_stale(self):
+        pass
+
+
+def build_snapshots(register_map: dict, dump: str = None) -> list:
+    """Register banks per cycle: {unit_id: bank} over one animated day."""
+    if dump:
+        banks = load_dump(dump)
+    else:
+        banks = {INVERTER_ID: build_inverter_image(INVERTER_ID, register_map, storage=True),
+                 METER_ID: build_meter_image(METER_ID, register_map)}
+    devices = {unit_id: SimulatedDevice(unit_id, bank, register_map, animate=True,
+                                        day_length=SNAPSHOTS * 2, update_interval=0, seed=1)
+               for unit_id, bank in banks.items()}
+    # One second per snapshot across the daylight half of the simulated day
+    start = time.monotonic() - SNAPSHOTS / 2
+    snapshots = []
+    for index in range(SNAPSHOTS):
+        for device in devices.values():
+            device.update(start + index)
+        snapshots.append({unit_id: device.bank.copy() for unit_id, device in devices.items()})
+    return snapshots
+
+
+def make_poller(parser: RegisterParser, snapshots: list, callback, skip_unchanged: bool):
+    """
+    DevicePoller reading from the snapshots (set connection.banks per cycle).
+
+    Returns:
+        (poller, inverter infos, meter infos)
+    """
+    connection = BankConnection(parser, snapshots[0])
+    inverters, meters = [], []
+    for unit_id in snapshots[0]:
+        info = connection.identify_device(unit_id)
+        if info is None:
+            continue
+        if info.get('device_type') == 'inverter':
+            info['has_storage'] = connection.check_storage_support(unit_id, info.get('models'))
+            inverters.append(info)
+        elif info.get('device_type') == 'meter':
+            meters.append(info)
+    poller = DevicePoller(ModbusConfig(host='benchmark'), inverters, meters, 1.0, 0, parser,
+                          callback, DevicesConfig(skip_unchanged=skip_unchanged))
+    poller.connection = connection
+    return poller, inverters, meters
+
+
+def make_mqtt(publish_mode: str) -> MQTTPublisher:
+    publisher = MQTTPublisher(MQTTConfig(enabled=False), publish_mode)
+    publisher.client = NullMQTTClient()
+    publisher.connected = True
+    return publisher
+
+
+def make_influx() -> InfluxDBPublisher:
+    """Publisher that encodes lines but has no write API (batches are dropped)."""
+    publisher = InfluxDBPublisher(InfluxDBConfig(enabled=False, write_interval=0,
+                                                 batch_interval=0, spool=False), 'all')
+    publisher.config.enabled = True
+    publisher.connected = True
+    return publisher
+
+
+def measure(func, iterations: int, alloc_iterations: int, repeat: int = 3) -> dict:
+    """
+    Time func(i) per call and measure its memory allocation.
+
+    The calls are timed in repeat rounds and the fastest round counts
+    (like timeit); throughput is taken from its median call, which is
+    less sensitive to scheduler noise than the mean.
+
+    Returns:
+        ops/s, mean and p99 latency (us), peak KiB allocated per call
+    """
+    for i in range(min(iterations, 200)):
+        func(i)
+    gc.collect()
+
+    clock = time.perf_counter_ns
+    rounds = []
+    for _ in range(max(1, repeat)):
+        timings = []
+        for i in range(iterations):
+            started = clock()
+            func(i)
+            timings.append(clock() - started)
+        timings.sort()
+        rounds.append(timings)
+    timings = min(rounds, key=lambda t: t[len(t) // 2])
+    mean = statistics.fmean(timings)
+    median = timings[len(timings) // 2]
+
+    # CPython does not count allocation events; the peak traced memory of
+    # a call is the memory it allocates at once, temporaries included
+    peaks = []
+    tracemalloc.start()
+    for i in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        'ops_per_sec': round(1e9 / median, 1),
+        'mean_us': round(mean / 1000, 2),
+        'p99_us': round(timings[int(len(timings) * 0.99) - 1] / 1000, 2),
+        'alloc_kib': round(statistics.fmean(peaks) / 1024, 2),
+    }
+
+
+def build_cases(register_map: dict, snapshots: list) -> dict:
+    """Benchmark name -> func(i)"""
+    parser = RegisterParser(register_map)
+
+    # Parsed data per snapshot, captured from the real poll path
+    captured = []
+    poller, inverters, meters = make_poller(parser, snapshots,
+                                           lambda *args: captured.append(args), False)
+    for banks in snapshots:
+        poller.connection.banks = banks
+        for info in inverters:
+            poller._poll_inverter(info)
+        for info in meters:
+            poller._poll_meter(info)
+    inverter_data = [d for _, t, d in captured if t == 'inverter']
+    meter_data = [d for _, t, d in captured if t == 'meter']
+
+    # Raw blocks per snapshot (registers after the model header)
+    def blocks(device_type: str, devices: list) -> list:
+        if not devices:
+            return []
+        info = devices[0]
+        address = info['models'][0][1] if info.get('models') else DevicePoller.DEVICE_ADDRESS
+        length = parser.measurement_length(device_type, info['model_id'])
+        return [(info['model_id'], banks[info['device_id']].read(address + 2, length))
+                for banks in snapshots]
+
+    inverter_blocks = blocks('inverter', inverters)
+    meter_blocks = blocks('meter', meters)
+    n = len(snapshots)
+
+    cases = {}
+    if inverter_blocks:
+        cases['parse_inverter'] = lambda i: parser.parse_inverter_measurements(
+            inverter_blocks[i % n][1], inverter_blocks[i % n][0])
+    if meter_blocks:
+        cases['parse_meter'] = lambda i: parser.parse_meter_measurements(
+            meter_blocks[i % n][1], meter_blocks[i % n][0])
+    # Grid error, DC low and an internal power stage error active
+    cases['parse_event_flags'] = lambda i: parser.parse_event_flags(0x42, 0x4000, 0, 0, 'symo')
+
+    if inverter_data:
+        mqtt_changed = make_mqtt('changed')
+        mqtt_all = make_mqtt('all')
+        influx = make_influx()
+        cases['mqtt_inverter_changed'] = lambda i: mqtt_changed.publish_inverter_data(
+            '1', inverter_data[i % n])
+        cases['mqtt_inverter_all'] = lambda i: mqtt_all.publish_inverter_data(
+            '1', inverter_data[i % n])
+        cases['influx_inverter'] = lambda i: influx.write_inverter_data('1', inverter_data[i % n])
+        # One sample every 2 s of simulated time: a 1-minute window closes every 30 calls
+        rollups = RollupEngine(RollupConfig(enabled=True), [make_influx().write_rollup])
+        sample_time = itertools.count(1_700_000_000, 2)
+        cases['rollup_inverter'] = lambda i: rollups.add('inverter', '1', inverter_data[i % n],
+                                                         next(sample_time))
+    if meter_data:
+        mqtt_meter = make_mqtt('changed')
+        influx_meter = make_influx()
+        cases['mqtt_meter_changed'] = lambda i: mqtt_meter.publish_meter_data(
+            '240', meter_data[i % n])
+        cases['influx_meter'] = lambda i: influx_meter.write_meter_data('240', meter_data[i % n])
+
+    # One poll of every device, read plan to published lines
+    mqtt_cycle = make_mqtt('changed')
+    influx_cycle = make_influx()
+
+    def publish(unit_id, device_type, data):
+        if device_type == 'inverter':
+            mqtt_cycle.publish_inverter_data(str(unit_id), data)
+            influx_cycle.write_inverter_data(str(unit_id), data)
+        elif device_type == 'meter':
+            mqtt_cycle.publish_meter_data(str(unit_id), data)
+            influx_cycle.write_meter_data(str(unit_id), data)
+        else:
+            mqtt_cycle.publish_storage_data(str(unit_id), data)
+            influx_cycle.write_storage_data(str(unit_id), data)
+
+    cycle_poller, cycle_inverters, cycle_meters = make_poller(parser, snapshots, publish, True)
+
+    def poll_cycle(i):
+        cycle_poller.connection.banks = snapshots[i % n]
+        for info in cycle_inverters:
+            cycle_poller._poll_inverter(info)
+        for info in cycle_meters:
+            cycle_poller._poll_meter(info)
+
+    cases['poll_cycle'] = poll_cycle
+    return cases
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Names of benchmarks that lost throughput or allocate more than tolerance allows."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(name)
+        elif result['alloc_kib'] > base['alloc_kib'] * (1 + tolerance) + 0.1:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fronius Modbus MQTT hot path benchmark")
+    parser.add_argument('--registers', default='config/registers.json', help='Register map')
+    parser.add_argument('--dump', help='Register dump to use instead of synthetic images')
+    parser.add_argument('-n', '--iterations', type=int, default=5000, help='Timed calls per benchmark')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Timing rounds per benchmark (fastest counts)')
+    parser.add_argument('--filter', default='', help='Only run benchmarks containing this text')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='Baseline file')
+    parser.add_argument('--save', action='store_true', help='Store results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed throughput loss / allocation growth (fraction)')
+    parser.add_argument('--check', action='store_true', help='Exit 1 on regressions')
+    args = parser.parse_args()
+
+    setup_logging('WARNING')
+    with open(args.registers) as f:
+        register_map = json.load(f)
+
+    cases = build_cases(register_map, build_snapshots(register_map, args.dump))
+    alloc_iterations = max(50, args.iterations // 20)
+
+    baseline_path = Path(args.baseline)
+    stored = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    baseline = stored.get('results', {})
+    machine = f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+    if stored and stored.get('machine') != machine:
+        print(f"Note: baseline recorded on {stored.get('machine')}, running on {machine}")
+
+    results = {}
+    print(f"{'benchmark':<24}{'ops/s':>12}{'mean us':>10}{'p99 us':>10}{'alloc KiB':>11}{'vs base':>10}")
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        result = measure(func, args.iterations, alloc_iterations, args.repeat)
+        results[name] = result
+        base = baseline.get(name)
+        delta = f"{(result['ops_per_sec'] / base['ops_per_sec'] - 1) * 100:+.1f}%" if base else '-'
+        print(f"{name:<24}{result['ops_per_sec']:>12,.0f}{result['mean_us']:>10.2f}"
+              f"{result['p99_us']:>10.2f}{result['alloc_kib']:>11.2f}{delta:>10}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+    if args.save:
+        stored = {'machine': machine, 'iterations': args.iterations,
+                  'results': dict(baseline, **results)}
+        baseline_path.write_text(json.dumps(stored, indent=2) + '\n')
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Pipelined asyncio Modbus TCP transport for devices with their own Modbus server
+
+The Fronius DataManager must be polled one request at a time, but GEN24 and
+Tauro inverters run their own Modbus TCP server that matches responses to
+requests by MBAP transaction ID. This transport keeps several requests in
+flight on one socket, which multiplies throughput on such endpoints.
+
+Architecture:
+- ModbusTcpPipeline: lean asyncio MBAP framer (Read Holding Registers only)
+- PipelinedConnection: ModbusConnection-compatible wrapper that runs the
+  pipeline on a background event loop for the polling thread
+- PipelinedDevicePoller: DevicePoller that sends a whole read plan at once
+"""
+
+import asyncio
+import contextlib
+import itertools
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config import ModbusConfig
+from .modbus_client import DevicePoller, SunSpecDiscovery
+from .pacing import AdaptivePacer
+from .read_planner import ModelSpan, ReadRequest, RegisterImage
+from .register_parser import RegisterParser
+from .logging_setup import get_logger
+
+
+class ModbusPipelineError(Exception):
+    """Modbus exception response or transport failure"""
+
+
+class ModbusPipelineTimeout(ModbusPipelineError):
+    """No response (timeout or connection lost)"""
+
+
+class ModbusPipelineStale(ModbusPipelineError):
+    """Response with the request's transaction ID but not matching the request"""
+
+
+class ModbusTcpPipeline:
+    """
+    Minimal Modbus TCP client that keeps up to max_in_flight requests
+    outstanding and matches responses by transaction ID.
+    """
+
+    READ_HOLDING_REGISTERS = 0x03
+    WRITE_MULTIPLE_REGISTERS = 0x10
+    _HEADER = struct.Struct('>HHHB')      # Transaction, protocol, length, unit
+
+    def __init__(self, host: str, port: int = 502, timeout: float = 3.0, max_in_flight: int = 4):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_in_flight = max(1, max_in_flight)
+        self.log = get_logger()
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connected = False
+        self.unmatched_responses = 0
+        self.stale_responses = 0
+        # Transaction ID -> (future, unit ID, function code) of the request
+        self._pending: Dict[int, Tuple[asyncio.Future, int, int]] = {}
+        self._transaction_ids = itertools.cycle(range(1, 0x10000))
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> bool:
+        """Open the TCP connection and start the response reader."""
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self.log.debug(f"Pipeline {self.host}:{self.port}: connect failed - {e}")
+            self.connected = False
+            return False
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._reader_task = asyncio.ensure_future(self._read_responses())
+        self.connected = True
+        return True
+
+    async def close(self):
+        """Close the connection and fail all outstanding requests."""
+        self.connected = False
+        task, self._reader_task = self._reader_task, None
+        if task:
+            # Wait for the reader to finish, so stopping the loop never
+            # leaves it pending ("Task was destroyed but it is pending!")
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.writer = None
+        self._fail_pending(ModbusPipelineTimeout("connection closed"))
+
+    def _fail_pending(self, error: Exception):
+        for future, _, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def _read_responses(self):
+        """
+        Dispatch responses to the waiting requests by transaction ID.
+
+        Protocol ID, unit ID and function code must match the request as
+        well; a response that does not fails its request as stale. Any
+        other error ends the reader and fails all outstanding requests, so
+        the next batch reconnects.
+        """
+        try:
+            while True:
+                header = await self.reader.readexactly(self._HEADER.size)
+                transaction_id, protocol_id, length, unit_id = self._HEADER.unpack(header)
+                if length < 2:
+                    # No function code: the frame boundaries are lost
+                    raise ModbusPipelineError(f"invalid MBAP length {length}")
+                pdu = await self.reader.readexactly(length - 1)
+                entry = self._pending.pop(transaction_id, None)
+                if entry is None or entry[0].done():
+                    # Late answer to a request that already timed out
+                    self.unmatched_responses += 1
+                    continue
+                future, request_unit, function = entry
+                reason = self._mismatch(protocol_id, unit_id, pdu[0], request_unit, function)
+                if reason:
+                    self.stale_responses += 1
+                    future.set_exception(ModbusPipelineStale(f"stale response ({reason})"))
+                    continue
+                future.set_result(pdu)
+        except Exception as e:
+            self.connected = False
+            self._fail_pending(ModbusPipelineTimeout(f"connection lost: {e}"))
+
+    @staticmethod
+    def _mismatch(protocol_id: int, unit_id: int, function: int,
+                  request_unit: int, request_function: int) -> Optional[str]:
+        """Reason a response does not belong to its request, or None."""
+        if protocol_id != 0:
+            return f"protocol {protocol_id}"
+        if unit_id != request_unit:
+            return f"unit {unit_id}, expected {request_unit}"
+        if function & 0x7F != request_function:
+            return f"function {function:#04x}, expected {request_function:#04x}"
+        return None
+
+    async def _transact(self, unit_id: int, pdu: bytes, what: str) -> bytes:
+        """Send one request PDU and wait for the response PDU with its transaction ID."""
+        if not self.connected:
+            raise ModbusPipelineTimeout("not connected")
+
+        async with self._slots:
+            transaction_id = next(self._transaction_ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transaction_id] = (future, unit_id, pdu[0])
+            self.writer.write(self._HEADER.pack(transaction_id, 0, len(pdu) + 1, unit_id) + pdu)
+            try:
+                await self.writer.drain()
+                response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self._pending.pop(transaction_id, None)
+                raise ModbusPipelineTimeout(f"timeout {what}")
+            except OSError as e:
+                self._pending.pop(transaction_id, None)
+                self.connected = False
+                raise ModbusPipelineTimeout(f"write failed: {e}")
+
+        if response[0] & 0x80:
+            raise ModbusPipelineError(f"exception code {response[1]} {what}")
+        return response
+
+    async def read_holding_registers(self, address: int, count: int, unit_id: int) -> List[int]:
+        """
+        Read holding registers.
+
+        Args:
+            address: First register (1-based, as in the SunSpec documentation)
+            count: Number of registers (1-125)
+            unit_id: Modbus unit ID
+
+        Returns:
+            Register values
+
+        Raises:
+            ModbusPipelineError: On exception responses, timeouts or
+                connection loss
+        """
+        pdu = await self._transact(
+            unit_id, struct.pack('>BHH', self.READ_HOLDING_REGISTERS, address - 1, count),
+            f"reading {address}x{count}")
+        byte_count = pdu[1]
+        if byte_count != count * 2 or len(pdu) < 2 + byte_count:
+            raise ModbusPipelineError(f"short response reading {address}x{count}")
+        return list(struct.unpack(f'>{count}H', pdu[2:2 + byte_count]))
+
+    async def write_registers(self, address: int, values: List[int], unit_id: int):
+        """
+        Write holding registers (function code 16).
+
+        Raises:
+            ModbusPipelineError: On exception responses, timeouts or
+                connection loss
+        """
+        count = len(values)
+        await self._transact(
+            unit_id,
+            struct.pack(f'>BHHB{count}H', self.WRITE_MULTIPLE_REGISTERS, address - 1, count,
+                        count * 2, *values),
+            f"writing {address}x{count}")
+
+
+class PipelinedConnection(SunSpecDiscovery):
+    """
+    Drop-in replacement for ModbusConnection backed by ModbusTcpPipeline.
+
+    The pipeline runs on its own event loop thread; the polling thread
+    submits batches of reads and waits for all of them. The adaptive pacer
+    still spaces batches and backs off on errors, but starts without a
+    gap: initial_gap is accepted for interface compatibility and ignored.
+    """
+
+    def __init__(self, config: ModbusConfig, parser: RegisterParser, initial_gap: float = None):
+        self.config = config
+        self.parser = parser
+        self.log = get_logger()
+        self.connected = False
+        self.lock = threading.Lock()
+        self.successful_reads = 0
+        self.failed_reads = 0
+        self.reconnects = 0
+        # Per-request latency of the last batch (None for failed reads)
+        self.last_latencies: List[Optional[float]] = []
+        self.pacer = AdaptivePacer(
+            min_gap=config.pacing_min_ms / 1000.0,
+            max_gap=config.pacing_max_ms / 1000.0,
+            initial_gap=0.0,
+            backoff_floor=config.retry_delay
+        )
+        self.pipeline = ModbusTcpPipeline(config.host, config.port, config.timeout,
+                                          config.max_in_flight)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self, coro, timeout: float = None):
+        """Run a coroutine on the pipeline's event loop and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def connect(self) -> bool:
+        """Start the event loop thread and connect the pipeline."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                            name=f"ModbusPipeline-{self.config.host}")
+            self._thread.start()
+        self.connected = self._run(self.pipeline.connect(), self.config.timeout + 1)
+        if self.connected:
+            self.log.info(f"Modbus pipeline connected to {self.config.host}:{self.config.port} "
+                          f"({self.pipeline.max_in_flight} in flight)")
+        return self.connected
+
+    def disconnect(self):
+        """Close the pipeline and stop the event loop thread."""
+        if self._loop is None:
+            return
+        self._run(self.pipeline.close(), self.config.timeout + 1)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+        self.connected = False
+        self.log.info("Modbus pipeline disconnected")
+
+    async def _read_batch(self, requests: List[Tuple[int, int, int]]) -> List[Optional[List[int]]]:
+        async def read_one(address, count, unit_id):
+            started = time.monotonic()
+            try:
+                registers = await self.pipeline.read_holding_registers(address, count, unit_id)
+            except ModbusPipelineError as e:
+                self.log.debug(f"Unit {unit_id}: read error - {e}")
+                return None, 0.0, e
+            return registers, time.monotonic() - started, None
+
+        if not self.pipeline.connected:
+            self.reconnects += 1
+            await self.pipeline.close()
+            await self.pipeline.connect()
+        if self.pipeline.connected:
+            results = await asyncio.gather(*(read_one(*r) for r in requests))
+        else:
+            # Reconnect failed: every request counts as a timeout
+            results = [(None, 0.0, ModbusPipelineTimeout("not connected"))] * len(requests)
+
+        registers = []
+        self.last_latencies = []
+        for regs, latency, error in results:
+            if regs is None:
+                self.pacer.record_failure(timeout=isinstance(error, ModbusPipelineTimeout),
+                                          stale=isinstance(error, ModbusPipelineStale))
+                self.failed_reads += 1
+            else:
+                self.pacer.record_success(latency)
+                self.successful_reads += 1
+            registers.append(regs)
+            self.last_latencies.append(latency if regs is not None else None)
+        return registers
+
+    def read_many(self, requests: List[Tuple[int, int, int]]) -> List[Optional[List[int]]]:
+        """
+        Read several (address, count, unit_id) ranges concurrently.
+
+        Returns:
+            Register lists in request order (None for failed reads)
+        """
+        with self.lock:
+            self.pacer.wait()
+            self.last_latencies = [None] * len(requests)
+            if self._loop is None:
+                self.connect()
+            timeout = self.config.timeout * (len(requests) / self.pipeline.max_in_flight + 2)
+            try:
+                result = self._run(self._read_batch(requests), timeout)
+            except Exception as e:
+                self.log.debug(f"Pipeline batch failed: {e}")
+                self.pacer.record_failure(timeout=True)
+                self.failed_reads += len(requests)
+                return [None] * len(requests)
+            self.connected = self.pipeline.connected
+            return result
+
+    def read_registers(self, address: int, count: int, unit_id: int) -> Optional[List[int]]:
+        """Read holding registers (single request, with retries)."""
+        for _ in range(self.config.retry_attempts):
+            regs = self.read_many([(address, count, unit_id)])[0]
+            if regs is not None:
+                return regs
+        return None
+
+    def write_registers(self, address: int, values: List[int], unit_id: int) -> bool:
+        """Write holding registers; True if the device acknowledged the write."""
+        with self.lock:
+            self.pacer.wait()
+            if self._loop is None:
+                self.connect()
+            started = time.monotonic()
+            try:
+                if not self.pipeline.connected:
+                    self.reconnects += 1
+                    self._run(self.pipeline.close(), self.config.timeout + 1)
+                    self._run(self.pipeline.connect(), self.config.timeout + 1)
+                self._run(self.pipeline.write_registers(address, values, unit_id),
+                          self.config.timeout * 2)
+            except Exception as e:
+                self.log.debug(f"Unit {unit_id}: write {address}x{len(values)} failed - {e}")
+                self.pacer.record_failure(timeout=isinstance(e, ModbusPipelineTimeout))
+                return False
+            self.pacer.record_success(time.monotonic() - started)
+            return True
+
+    def report_stale(self):
+        """Record a response with the wrong model ID and back off."""
+        with self.lock:
+            self.pacer.record_failure(stale=True)
+
+    def get_stats(self) -> Dict:
+        """Return read counters and pacing state"""
+        pacing = self.pacer.get_stats()
+        pacing['max_in_flight'] = self.pipeline.max_in_flight
+        pacing['unmatched_responses'] = self.pipeline.unmatched_responses
+        return {
+            'connected': self.connected,
+            'successful_reads': self.successful_reads,
+            'failed_reads': self.failed_reads,
+            'reconnects': self.reconnects,
+            'stale_responses': self.pipeline.stale_responses,
+            'pacing': pacing,
+        }
+
+
+class PipelinedDevicePoller(DevicePoller):
+    """
+    DevicePoller for endpoints that accept concurrent transactions.
+
+    Every request of a read plan is sent at once instead of one after the
+    other; failed or mismatched requests are retried together.
+    """
+
+    CONNECTION_CLASS = PipelinedConnection
+
+    def _execute_plan(self, unit_id: int, spans: List[ModelSpan],
+                      max_retries: int = 3) -> Dict[str, List[int]]:
+        image = RegisterImage()
+        pending = list(self.planner.plan(spans))
+        for attempt in range(max_retries):
+            if not pending:
+                break
+            if self.commands:
+                self._run_commands()
+            results = self.connection.read_many([(r.address, r.count, unit_id) for r in pending])
+            latencies = self.connection.last_latencies
+            retry = []
+            for request, regs, latency in zip(pending, results, latencies):
+                if not regs or len(regs) < request.count:
+                    self._observe_batch_read(unit_id, request, None, 'failed', attempt)
+                    retry.append(request)
+                    continue
+                mismatch = self._model_mismatch(request, regs, spans)
+                self._observe_batch_read(unit_id, request, latency,
+                                         'stale' if mismatch else 'ok', attempt)
+                if mismatch and attempt < max_retries - 1:
+                    self.connection.report_stale()
+                    retry.append(request)
+                    continue
+                image.add(request.address, regs)
+            if retry and attempt < max_retries - 1:
+                self.log.debug(f"Unit {unit_id}: {len(retry)} pipelined read(s) failed, "
+                               f"retry {attempt + 1}/{max_retries}")
+            pending = retry
+
+        return self._collect_blocks(image, spans)
+
+    def _observe_batch_read(self, unit_id: int, request: ReadRequest, latency: Optional[float],
+                            result: str, attempt: int):
+        if self.metrics is not None:
+            self.metrics.observe_read(unit_id, '+'.join(request.spans), latency, result,
+                                      1 if attempt else 0)
@@ -0,0 +1,366 @@
+"""Table-driven SunSpec block decoder compiled from registers.json"""
+
+import struct
+from operator import itemgetter, mul
+from typing import Dict, List, Optional, Tuple
+
+
+def _getter(indices: Tuple[int, ...]):
+    """Build a callable returning a tuple of the given indices (like itemgetter)"""
+    if not indices:
+        return lambda seq: ()
+    if len(indices) == 1:
+        index = indices[0]
+        return lambda seq: (seq[index],)
+    return itemgetter(*indices)
+
+
+class BlockDecoder:
+    """
+    Decode a contiguous SunSpec register block in a single pass.
+
+    The register definitions from registers.json are compiled once into a
+    struct format string plus offset/type/scale-factor tables. Decoding a
+    block is then one struct.unpack followed by a single scaling pass over
+    precomputed indices:
+
+    - values are picked out of the unpacked tuple with itemgetter
+    - per-field multipliers are cached per scale factor combination
+    - scaling runs as map(mul, ...) with no per-field Python code
+    - not-implemented checks are one containment test per sentinel value
+      over the whole block; only blocks that contain a sentinel (or an
+      invalid scale factor) take the per-field slow path
+
+    Float32 registers (SunSpec float models, e.g. 111-113 and 211-214)
+    come out of the same struct.unpack already scaled. Their not-implemented
+    value is NaN, which a containment test cannot find, so the whole float
+    group is checked with one sum(): only a NaN sum takes the per-field path.
+
+    Register definitions need a "field" key to appear in the output;
+    scale factors, headers and padding are read but not emitted. Fields
+    marked "raw" skip the not-implemented check (St/StVnd report 0xFFFF
+    as-is).
+    """
+
+    # SunSpec type -> (struct code, register count, not-implemented value)
+    TYPES = {
+        'uint16': ('H', 1, 0xFFFF),
+        'int16': ('h', 1, -0x8000),
+        'sunssf': ('h', 1, -0x8000),
+        'enum16': ('H', 1, 0xFFFF),
+        'bitfield16': ('H', 1, 0xFFFF),
+        'uint32': ('I', 2, 0xFFFFFFFF),
+        'acc32': ('I', 2, 0xFFFFFFFF),
+        'bitfield32': ('I', 2, 0xFFFFFFFF),
+        'enum32': ('I', 2, 0xFFFFFFFF),
+        'int32': ('i', 2, -0x80000000),
+    }
+
+    # Valid SunSpec scale factor range -> multiplier
+    MULTIPLIERS = {sf: 10.0 ** sf for sf in range(-10, 11)}
+
+    # Bound for the per-decoder multiplier cache (scale factors rarely change)
+    MULT_CACHE_SIZE = 32
+
+    def __init__(self, name: str, registers: List[Dict], base_address: int = None,
+                 model_id: int = None):
+        """
+        Compile a register block.
+
+        Args:
+            name: Block name (used in log messages)
+            registers: Register definitions with 'address' or 'offset'
+            base_address: First register address of the block (defaults to
+                the lowest 'address' found in the definitions)
+            model_id: Optional SunSpec model ID; registers with a "models"
+                list that does not include it are skipped
+
+        Raises:
+            ValueError: On unknown types or overlapping registers
+        """
+        self.name = name
+        self.model_id = model_id
+
+        entries = []
+        for reg in registers:
+            models = reg.get('models')
+            if models and model_id is not None and str(model_id) not in models:
+                continue
+            entries.append(reg)
+
+        if base_address is None:
+            addresses = [r['address'] for r in entries if 'address' in r]
+            base_address = min(addresses) if addresses else 0
+        self.base_address = base_address
+
+        def offset_of(reg: Dict) -> int:
+            if 'offset' in reg:
+                return reg['offset']
+            return reg['address'] - base_address
+
+        entries.sort(key=offset_of)
+
+        fmt = ['>']
+        position = 0      # current register offset
+        index = 0         # index into the unpacked tuple
+        sf_index: Dict[str, int] = {}
+        value_defs: List[Tuple[str, int, object, Optional[str]]] = []
+        float_defs: List[Tuple[str, int]] = []
+        string_defs: List[Tuple[str, int]] = []
+        field_ends: List[Tuple[str, int]] = []
+        self.sf_offsets: Dict[str, int] = {}
+
+        for reg in entries:
+            offset = offset_of(reg)
+            count = reg.get('count', 1)
+            reg_type = reg.get('type', 'uint16')
+            if offset < position:
+                raise ValueError(f"{name}: register {reg.get('name')} overlaps previous register")
+            if offset > position:
+                fmt.append(f"{(offset - position) * 2}x")
+
+            if reg_type.startswith('string'):
+                fmt.append(f"{count * 2}s")
+                if reg.get('field'):
+                    string_defs.append((reg['field'], index))
+                index += 1
+            elif reg_type == 'float32':
+                if count != 2:
+                    raise ValueError(f"{name}: register {reg.get('name')} has count {count}, "
+                                     f"type float32 needs 2")
+                fmt.append('f')
+                if reg.get('field'):
+                    float_defs.append((reg['field'], index))
+                index += 1
+            elif reg_type in self.TYPES:
+                code, size, not_impl = self.TYPES[reg_type]
+                if reg.get('raw'):
+                    not_impl = None
+                if size != count:
+                    raise ValueError(f"{name}: register {reg.get('name')} has count {count}, "
+                                     f"type {reg_type} needs {size}")
+                fmt.append(code)
+                if reg_type == 'sunssf':
+                    sf_index[reg['name']] = index
+                    self.sf_offsets[reg['name']] = offset
+                elif reg.get('field'):
+                    value_defs.append((reg['field'], index, not_impl, reg.get('scale_factor')))
+                index += 1
+            else:
+                raise ValueError(f"{name}: unknown register type {reg_type}")
+
+            position = offset + count
+            if reg.get('field') and reg_type != 'sunssf':
+                field_ends.append((reg['field'], position))
+
+        self.length = position
+        self._struct = struct.Struct(''.join(fmt))
+        self._pack = struct.Struct(f'>{self.length}H')
+
+        # Scale factors referenced by fields, in first-use order. Scale factors
+        # that live outside this block must be passed to decode().
+        sf_names: List[str] = []
+        for _, _, _, sf_name in value_defs:
+            if sf_name and sf_name not in sf_names:
+                sf_names.append(sf_name)
+        self.sf_names: Tuple[str, ...] = tuple(sf_names)
+        self.external_sf: Tuple[str, ...] = tuple(n for n in sf_names if n not in sf_index)
+
+        scaled = [d for d in value_defs if d[3]]
+        raw = [d for d in value_defs if not d[3]]
+        self._scaled_keys = tuple(d[0] for d in scaled)
+        self._scaled_ni = tuple(d[2] for d in scaled)
+        self._scaled_sf = tuple(sf_names.index(d[3]) for d in scaled)
+        self._raw_keys = tuple(d[0] for d in raw)
+        self._raw_ni = tuple(d[2] for d in raw)
+        self._float_keys = tuple(d[0] for d in float_defs)
+        self._string_defs = tuple(string_defs)
+        self._field_ends = tuple(field_ends)
+
+        # Precompiled getters for the decode hot path
+        self._sf_in_block = tuple(n in sf_index for n in sf_names)
+        self._sf_index = tuple(sf_index.items())
+        self._get_sf = _getter(tuple(sf_index[n] for n in sf_names if n in sf_index))
+        self._get_scaled = _getter(tuple(d[1] for d in scaled))
+        self._get_raw = _getter(tuple(d[1] for d in raw))
+        self._get_float = _getter(tuple(d[1] for d in float_defs))
+        self._get_sf_slot = _getter(self._scaled_sf)
+        self._sentinels = tuple({d[2] for d in value_defs} - {None})
+        self._mult_cache: Dict[tuple, Optional[tuple]] = {}
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Output field names produced by decode()"""
+        return (self._scaled_keys + self._raw_keys + self._float_keys +
+                tuple(k for k, _ in self._string_defs))
+
+    def unpack(self, registers: List[int]) -> tuple:
+        """
+        Unpack raw registers into typed values (one struct call).
+
+        Short blocks are padded with 0xFFFF; decode() reports fields that
+        are not fully covered by the supplied registers as None.
+        """
+        if len(registers) != self.length:
+            registers = list(registers[:self.length])
+            registers.extend([0xFFFF] * (self.length - len(registers)))
+        return self._struct.unpack(self._pack.pack(*registers))
+
+    def decode_scale_factors(self, registers: List[int]) -> Dict[str, Optional[int]]:
+        """
+        Extract the in-block scale factors from a register block.
+
+        Args:
+            registers: Raw register values starting at the block base address
+
+        Returns:
+            Dict of scale factor name -> signed value (None if not implemented)
+            for every sunssf register in the block, referenced or not
+        """
+        values = self.unpack(registers)
+        return {
+            name: (None if values[idx] == -0x8000 else values[idx])
+            for name, idx in self._sf_index
+        }
+
+    def _sf_tuple(self, values: tuple) -> tuple:
+        """Scale factor values in sf_names order (None for external ones)"""
+        found = self._get_sf(values)
+        if len(found) == len(self.sf_names):
+            return found
+        found = iter(found)
+        return tuple(next(found) if inside else None for inside in self._sf_in_block)
+
+    def _multipliers(self, sf_values: tuple) -> Optional[tuple]:
+        """
+        Per-field multipliers for a scale factor combination (cached).
+
+        Returns None if any scale factor is invalid; callers then fall
+        back to the per-field path.
+        """
+        try:
+            return self._mult_cache[sf_values]
+        except KeyError:
+            pass
+        multipliers = [self.MULTIPLIERS.get(sf) for sf in sf_values]
+        result = None if None in multipliers else self._get_sf_slot(multipliers)
+        if len(self._mult_cache) >= self.MULT_CACHE_SIZE:
+            self._mult_cache.clear()
+        self._mult_cache[sf_values] = result
+        return result
+
+    def decode(self, registers: List[int],
+               scale_factors: Dict[str, Optional[int]] = None) -> Dict:
+        """
+        Decode a register block into a field dictionary.
+
+        Args:
+            registers: Raw register values starting at the block base address
+            scale_factors: Optional scale factor values by name; these take
+                precedence over the in-block registers and are required for
+                scale factors that live outside the block
+
+        Returns:
+            Dictionary of field name -> decoded value (None if not implemented
+            or if the scale factor is invalid)
+        """
+        values = self.unpack(registers)
+
+        sf_values = self._sf_tuple(values)
+        if scale_factors:
+            sf_values = tuple(scale_factors.get(n, v) for n, v in zip(self.sf_names, sf_values))
+        field_mult = self._multipliers(sf_values)
+        scaled_values = self._get_scaled(values)
+
+        raw_values = self._get_raw(values)
+
+        # A sentinel anywhere in the block (even in a register that is
+        # legitimately 0xFFFF, e.g. a uint32 low word) only costs the slow path
+        has_sentinel = False
+        for ni in self._sentinels:
+            if ni in values:
+                has_sentinel = True
+                break
+        if field_mult is not None and not has_sentinel:
+            data = dict(zip(self._scaled_keys, map(mul, scaled_values, field_mult)))
+        else:
+            multipliers = [self.MULTIPLIERS.get(sf) for sf in sf_values]
+            data = dict(zip(self._scaled_keys, [
+                None if v == ni or m is None else v * m
+                for v, ni, m in zip(scaled_values, self._scaled_ni,
+                                    self._get_sf_slot(multipliers))
+            ]))
+
+        if has_sentinel:
+            raw_values = [None if v == ni else v for v, ni in zip(raw_values, self._raw_ni)]
+        data.update(zip(self._raw_keys, raw_values))
+
+        if self._float_keys:
+            float_values = self._get_float(values)
+            total = sum(float_values)
+            if total == total:
+                data.update(zip(self._float_keys, float_values))
+            else:
+                # NaN somewhere (not implemented, or inf - inf)
+                data.update(zip(self._float_keys, [None if v != v else v for v in float_values]))
+
+        for key, idx in self._string_defs:
+            data[key] = values[idx].decode('ascii', errors='ignore').rstrip('\x00 ')
+
+        available = len(registers)
+        if available < self.length:
+            for key, end in self._field_ends:
+                if end > available:
+                    data[key] = None
+        return data
+
+
+def compile_section(section: Dict, model_id: int = None) -> Optional[BlockDecoder]:
+    """
+    Compile a registers.json section ({"description": ..., "registers": [...]}).
+
+    Args:
+        section: Register map section with a "registers" list and optional
+            "address" (required when registers use relative offsets)
+        model_id: Optional SunSpec model ID for "models" filtering
+
+    Returns:
+        BlockDecoder, or None if the section has no registers
+    """
+    if not section or not section.get('registers'):
+        return None
+    return BlockDecoder(
+        section.get('description', ''),
+        section['registers'],
+        base_address=section.get('address'),
+        model_id=model_id,
+    )
+
+
+def compile_sections(name: str, sections: List[Dict], model_id: int = None) -> Optional[BlockDecoder]:
+    """
+    Compile several adjacent registers.json sections into one block.
+
+    Each section needs an "address"; register offsets are rebased onto the
+    address of the first section.
+
+    Args:
+        name: Block name (used in log messages)
+        sections: Register map sections in any order
+        model_id: Optional SunSpec model ID for "models" filtering
+
+    Returns:
+        BlockDecoder, or None if no section has registers
+    """
+    sections = [s for s in sections if s and s.get('registers')]
+    if not sections:
+        return None
+    base_address = min(s['address'] for s in sections)
+    registers = []
+    for section in sections:
+        shift = section['address'] - base_address
+        for reg in section['registers']:
+            if 'offset' in reg:
+                reg = dict(reg, offset=reg['offset'] + shift)
+            registers.append(reg)
+    return BlockDecoder(name, registers, base_address=base_address, model_id=model_id)
@@ -0,0 +1,136 @@
+"""Deadband and precision-aware change detection for the publishers"""
+
+from typing import Any, Dict, Optional, Tuple
+
+
+class ChangeFilter:
+    """
+    Decide whether a value differs enough from the last published one.
+
+    - floats are quantized to the published precision before comparing,
+      so noise below the payload resolution never counts as a change
+    - numeric fields get a deadband: a new value only counts as changed
+      when |new - last| >= max(absolute, relative * |last|)
+    - max_silence forces a republish of unchanged values after that many
+      seconds, so consumers can tell a steady value from a stale one
+
+    Deadbands are looked up by field name first, then by the quantity
+    the field measures (see QUANTITIES). The defaults sit a few counts
+    above the resolution of the usual Fronius scale factors (W_SF 0,
+    V_SF -1, A_SF -2, Hz_SF -2), which is where register noise lives.
+
+    Model 123 fields are named 'controls.<field>' (their leaf names clash
+    with measurements, e.g. power_factor) and, like the Model 124
+    settings, are setpoints without a deadband: every change is a write
+    or its readback.
+    """
+
+    # Model 124 settings and rate setpoints (storage data field names)
+    SETPOINT_FIELDS = frozenset((
+        'max_charge_power', 'charge_ramp_rate', 'discharge_ramp_rate',
+        'storage_control_mode', 'max_charge_va', 'min_reserve_pct',
+        'discharge_rate_pct', 'charge_rate_pct',
+        'rate_window_secs', 'rate_revert_secs', 'rate_ramp_secs', 'grid_charging_code',
+    ))
+
+    # Quantity of a field by name fragment (first match wins)
+    QUANTITIES = (
+        ('controls.', 'setpoint'),
+        ('pct', 'percent'),
+        ('energy', 'energy'),
+        ('power_factor', 'power_factor'),
+        ('pf_', 'power_factor'),
+        ('frequency', 'frequency'),
+        ('voltage', 'voltage'),
+        ('current', 'current'),
+        ('power', 'power'),
+        ('va_', 'power'),
+        ('var_', 'power'),
+        ('temp', 'temperature'),
+    )
+
+    # quantity -> (absolute, relative) deadband
+    DEFAULT_DEADBANDS = {
+        'power': (10.0, 0.01),       # W / VA / var
+        'voltage': (0.5, 0.0),       # V
+        'current': (0.05, 0.0),      # A
+        'frequency': (0.02, 0.0),    # Hz
+        'power_factor': (1.0, 0.0),  # % (SunSpec PF is a percentage)
+        'energy': (10.0, 0.0),       # Wh
+        'temperature': (0.5, 0.0),   # °C
+        'percent': (0.5, 0.0),       # %
+        'setpoint': (0.0, 0.0),      # Model 123/124 controls and settings
+    }
+
+    NO_DEADBAND = (0.0, 0.0)
+
+    def __init__(self, deadbands: Dict[str, Any] = None, precision: int = 3,
+                 max_silence: float = 0.0):
+        """
+        Args:
+            deadbands: Overrides by quantity or field name; each value is
+                an absolute deadband or {"absolute": x, "relative": y}
+            precision: Decimals floats are rounded to before comparing
+            max_silence: Seconds after which an unchanged value is
+                published again (0 = never)
+        """
+        self.precision = precision
+        self.max_silence = max_silence
+        self.deadbands: Dict[str, Tuple[float, float]] = dict(self.DEFAULT_DEADBANDS)
+        for name, band in (deadbands or {}).items():
+            self.deadbands[name] = self._parse_band(band)
+        self._bands: Dict[str, Tuple[float, float]] = {}
+
+    @staticmethod
+    def _parse_band(band: Any) -> Tuple[float, float]:
+        if isinstance(band, dict):
+            return float(band.get('absolute', 0.0)), float(band.get('relative', 0.0))
+        return float(band or 0.0), 0.0
+
+    @classmethod
+    def quantity(cls, field: str) -> Optional[str]:
+        """Quantity a field measures, or None for codes, flags and counts"""
+        if field in cls.SETPOINT_FIELDS:
+            return 'setpoint'
+        for fragment, quantity in cls.QUANTITIES:
+            if fragment in field:
+                return quantity
+        return None
+
+    def band(self, field: str) -> Tuple[float, float]:
+        """(absolute, relative) deadband of a field (cached)"""
+        try:
+            return self._bands[field]
+        except KeyError:
+            pass
+        band = self.deadbands.get(field)
+        if band is None:
+            band = self.deadbands.get(self.quantity(field), self.NO_DEADBAND)
+        self._bands[field] = band
+        return band
+
+    def changed(self, old: Any, new: Any, band: Tuple[float, float] = NO_DEADBAND) -> bool:
+        """
+        Check whether new differs from the last published value.
+
+        Args:
+            old: Last published value
+            new: Current value
+            band: (absolute, relative) deadband, see band()
+
+        Returns:
+            True if new should be published
+        """
+        if (isinstance(new, bool) or isinstance(old, bool)
+                or not isinstance(new, (int, float)) or not isinstance(old, (int, float))):
+            return old != new
+        if isinstance(new, float) or isinstance(old, float):
+            delta = abs(round(new, self.precision) - round(old, self.precision))
+        else:
+            delta = abs(new - old)
+        absolute, relative = band
+        return delta > 0 and delta >= max(absolute, relative * abs(old))
+
+    def quantize(self, value: Any) -> Any:
+        """Round floats to the published precision"""
+        return round(value, self.precision) if isinstance(value, float) else value
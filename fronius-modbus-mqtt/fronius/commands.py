@@ -0,0 +1,145 @@
+"""Control writes for Model 123 (Immediate Controls) and Model 124 (Basic Storage Controls)
+
+Architecture:
+- CONTROL_POINTS: writable fields with their register offset inside the
+  model block, scale factor and enable register
+- ControlCommand: one requested setpoint, timestamped on arrival
+- CommandQueue: per-poller queue drained ahead of the poll schedule; a
+  newer command for the same device and field replaces a queued one
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ControlPoint:
+    """A writable register of a control model."""
+    block: str                      # 'controls' (Model 123) or 'storage' (Model 124)
+    offset: int                     # Register offset from the model header
+    minimum: float
+    maximum: float
+    sf_index: Optional[int] = None  # Index into the block's scale factor tail (None = unscaled)
+    signed: bool = False
+    enable_offset: Optional[int] = None  # Register set to 1 with the value (0 = "off")
+
+
+CONTROL_POINTS: Dict[str, ControlPoint] = {
+    # Model 123: Conn, WMaxLimPct + WMaxLim_Ena, OutPFSet + OutPFSet_Ena
+    'connected': ControlPoint('controls', 4, 0, 1),
+    'power_limit_pct': ControlPoint('controls', 5, 0, 100, sf_index=0, enable_offset=9),
+    'power_factor': ControlPoint('controls', 10, -1, 1, sf_index=1, signed=True, enable_offset=14),
+    # Model 124: StorCtl_Mod (bit0 charge, bit1 discharge limit), OutWRte, InWRte
+    'storage_control_mode': ControlPoint('storage', 5, 0, 3),
+    'discharge_rate_pct': ControlPoint('storage', 12, -100, 100, sf_index=7, signed=True),
+    'charge_rate_pct': ControlPoint('storage', 13, -100, 100, sf_index=7, signed=True),
+}
+
+# Payloads that switch an enable-controlled setpoint off instead of writing it
+OFF_PAYLOADS = ('off', 'disable', 'disabled', 'none')
+BOOL_PAYLOADS = {'true': 1, 'on': 1, 'connect': 1, 'false': 0, 'disconnect': 0}
+
+
+@dataclass
+class ControlCommand:
+    """A setpoint request for one device."""
+    unit_id: int
+    name: str                        # Key of CONTROL_POINTS
+    value: Optional[float]           # None = disable (write the enable register only)
+    received: float = field(default_factory=time.monotonic)
+    source: str = ""                 # Reply topic / device key, for the result
+
+
+def parse_command(name: str, payload: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Convert a command payload into a setpoint.
+
+    Returns:
+        (value, None) on success, value None meaning "disable";
+        (None, error message) for invalid commands
+    """
+    point = CONTROL_POINTS.get(name)
+    if point is None:
+        return None, f"unknown control '{name}'"
+    text = payload.strip().lower()
+    if text in OFF_PAYLOADS:
+        if point.enable_offset is None:
+            return None, f"{name} cannot be disabled"
+        return None, None
+    if text in BOOL_PAYLOADS:
+        value = float(BOOL_PAYLOADS[text])
+    else:
+        try:
+            value = float(text)
+        except ValueError:
+            return None, f"invalid value '{payload}'"
+    if not point.minimum <= value <= point.maximum:
+        return None, f"{value:g} outside {point.minimum:g}..{point.maximum:g}"
+    return value, None
+
+
+def encode_value(point: ControlPoint, value: float, sf_tail: Tuple[int, ...]) -> int:
+    """
+    Raw register value for a setpoint.
+
+    Args:
+        sf_tail: Trailing scale factor registers of the block
+
+    Raises:
+        ValueError: Scaled value does not fit the register
+    """
+    sf = 0
+    if point.sf_index is not None:
+        sf = sf_tail[point.sf_index]
+        sf = sf - 65536 if sf >= 32768 else sf
+    raw = int(round(value / (10 ** sf)))
+    if point.signed:
+        if not -32767 <= raw <= 32767:
+            raise ValueError(f"{value:g} does not fit with scale factor {sf}")
+        return raw & 0xFFFF
+    if not 0 <= raw <= 65534:
+        raise ValueError(f"{value:g} does not fit with scale factor {sf}")
+    return raw
+
+
+class CommandQueue:
+    """
+    Pending control commands of one poller.
+
+    Commands run in arrival order; a new command for a device and field
+    that is still queued replaces the old one (only the latest setpoint
+    matters) but keeps its place and arrival time, so the replacement
+    does not wait longer than the command it supersedes.
+    """
+
+    def __init__(self):
+        self._commands: 'OrderedDict[tuple, ControlCommand]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.replaced = 0
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def put(self, command: ControlCommand):
+        key = (command.unit_id, command.name)
+        with self._lock:
+            queued = self._commands.get(key)
+            if queued is not None:
+                command.received = queued.received
+                self.replaced += 1
+            self._commands[key] = command
+
+    def pop(self) -> Optional[ControlCommand]:
+        with self._lock:
+            if not self._commands:
+                return None
+            return self._commands.popitem(last=False)[1]
+
+    def drain(self) -> List[ControlCommand]:
+        with self._lock:
+            commands = list(self._commands.values())
+            self._commands.clear()
+        return commands
@@ -2,7 +2,7 @@
 
 import os
 import yaml
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
 
 
@@ -13,7 +13,14 @@ class ModbusConfig:
     port: int = 502
     timeout: int = 3
     retry_attempts: int = 2
-    retry_delay: float = 0.1
+    retry_delay: float = 0.1        # Minimum request gap after a failure
+    max_read_registers: int = 125   # Registers per read request (Modbus limit: 125)
+    read_gap_max: int = 16          # Unneeded registers worth reading through to merge reads
+    pacing_min_ms: int = 0          # Adaptive request gap lower bound
+    pacing_max_ms: int = 2000       # Adaptive request gap upper bound
+    transport: str = "sync"         # 'sync' (one request at a time) or 'pipelined'
+    max_in_flight: int = 4          # Concurrent requests with the pipelined transport
+    unit_switch_reconnect: bool = False  # Reconnect on every unit ID change (legacy workaround)
 
 
 @dataclass
@@ -22,8 +29,37 @@ class DevicesConfig:
     inverters: List[int] = field(default_factory=list)  # List of inverter Modbus IDs
     meters: List[int] = field(default_factory=list)      # List of meter Modbus IDs
     meter_poll_interval: float = 2.0    # Meter polling interval in seconds
-    inverter_poll_delay: float = 1.0    # Delay between inverter reads in seconds
-    inverter_read_delay_ms: int = 200   # Delay between register blocks within same inverter
+    inverter_poll_interval: float = 5.0 # Inverter polling interval in seconds
+    mppt_poll_interval: float = 0.0     # Model 160 interval (0 = every inverter poll)
+    controls_poll_interval: float = 60.0  # Model 123 interval in seconds
+    storage_poll_interval: float = 0.0  # Model 124 interval (0 = every inverter poll)
+    sf_refresh_interval: float = 3600.0 # Re-read cached Model 123/124 scale factors (0 = every read)
+    skip_unchanged: bool = True         # Don't parse/publish polls with identical registers
+    unchanged_refresh: int = 10         # Process every Nth identical poll anyway (0 = never)
+    inverter_poll_delay: float = 1.0    # Unused - replaced by the poll intervals
+    inverter_read_delay_ms: int = 200   # Initial delay between requests (adapted at runtime)
+    device_cache: bool = True           # Warm-start discovery from cached identities
+    cache_file: str = ""                # Empty = data/device_cache.json
+    rescan_interval: int = 0            # Seconds before a full rediscovery (0 = never)
+    sleep_backoff: bool = False         # Only probe inverters that sleep or don't answer
+    sleep_status_codes: List[int] = field(default_factory=lambda: [2, 8])  # St: SLEEPING, STANDBY
+    sleep_after_failures: int = 3       # Unanswered polls before an inverter counts as asleep
+    sleep_probe_interval: float = 30.0  # Probe interval while asleep (daylight / no location)
+    night_probe_interval: float = 300.0 # Probe interval while asleep between sunset and sunrise
+    latitude: Optional[float] = None    # Location for sunrise/sunset (None = status only)
+    longitude: Optional[float] = None
+    sun_margin: float = 1800.0          # Daylight starts before sunrise / ends after sunset (s)
+    meter_interval_asleep: float = 1.0  # Meter interval while all inverters sleep (0 = unchanged)
+
+
+@dataclass
+class EndpointConfig:
+    """A Modbus TCP endpoint and the device IDs polled through it"""
+    name: str
+    modbus: ModbusConfig
+    inverters: List[int] = field(default_factory=list)
+    meters: List[int] = field(default_factory=list)
+    id_prefix: str = ""                 # Prepended to device IDs in topics/tags
 
 
 @dataclass
@@ -37,6 +73,9 @@ class MQTTConfig:
     topic_prefix: str = "fronius"
     retain: bool = True
     qos: int = 0
+    publish_format: str = "fields"  # 'fields', 'json' (one document per device) or 'both'
+    ha_discovery: bool = False      # Home Assistant discovery for the JSON documents
+    ha_discovery_prefix: str = "homeassistant"
 
 
 @dataclass
@@ -49,6 +88,59 @@ class InfluxDBConfig:
     bucket: str = "fronius"
     write_interval: int = 5
     publish_mode: str = ""  # Empty = use general.publish_mode
+    batch_interval: float = 1.0  # Collect one poll cycle's points per write (0 = write at once)
+    spool: bool = True           # Spool batches to disk while InfluxDB is down
+    spool_dir: str = ""          # Empty = data/influx_spool
+    spool_max_mb: float = 100.0  # Oldest segments are dropped above this size
+    spool_segment_kb: int = 1024 # Spool segment file size
+    replay_rate: int = 2000      # Max spooled lines replayed per second
+    retry_interval: float = 30.0 # Seconds between write attempts while InfluxDB is down
+
+
+@dataclass
+class ChangeDetectionConfig:
+    """Deadbands and heartbeat for publish_mode 'changed' (MQTT and InfluxDB)"""
+    precision: int = 3                # Decimals compared (matches the MQTT payloads)
+    max_silence: float = 300.0        # Republish unchanged values after N seconds (0 = never)
+    deadbands: Dict[str, Any] = field(default_factory=dict)  # Quantity or field -> deadband
+
+
+@dataclass
+class ControlsConfig:
+    """Control writes (Model 123/124) through MQTT command topics"""
+    enabled: bool = False
+    command_timeout: float = 5.0    # Drop commands not started within N seconds
+    verify: bool = True             # Read written registers back to confirm
+
+
+@dataclass
+class MetricsConfig:
+    """Prometheus metrics endpoint"""
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 9105
+    path: str = "/metrics"
+    buckets: List[float] = field(default_factory=list)  # Latency buckets in seconds (empty = default)
+
+
+@dataclass
+class RollupConfig:
+    """Streaming min/max/mean/last and energy-delta aggregates per device field"""
+    enabled: bool = False
+    windows: List[int] = field(default_factory=lambda: [60, 900])  # Window lengths in seconds
+    max_gap: float = 120.0          # Seconds a sampled value holds without a new sample
+    influxdb: bool = True           # Write fronius_<type>_<window> measurements
+    mqtt: bool = False              # Publish {prefix}/<type>/<id>/rollup/<window>
+    fields: Dict[str, List[str]] = field(default_factory=dict)  # Device type -> fields (default set)
+
+
+@dataclass
+class HistoryConfig:
+    """In-memory recent history per device field, queried over MQTT"""
+    enabled: bool = False
+    capacity: int = 600             # Samples kept per device (600 = 20 min at 2 s polls)
+    max_gap: float = 120.0          # Seconds a value fills empty downsampling buckets
+    fields: Dict[str, List[str]] = field(default_factory=dict)  # Device type -> fields (default set)
 
 
 @dataclass
@@ -70,8 +162,14 @@ class ConfigLoader:
         self.general: GeneralConfig = None
         self.modbus: ModbusConfig = None
         self.devices: DevicesConfig = None
+        self.endpoints: List[EndpointConfig] = []
         self.mqtt: MQTTConfig = None
         self.influxdb: InfluxDBConfig = None
+        self.change_detection: ChangeDetectionConfig = None
+        self.controls: ControlsConfig = None
+        self.metrics: MetricsConfig = None
+        self.rollups: RollupConfig = None
+        self.history: HistoryConfig = None
         self._load_config(config_path)
 
     @classmethod
@@ -108,6 +206,33 @@ class ConfigLoader:
             "\n".join(f"  - {p}" for p in filter(None, paths))
         )
 
+    @staticmethod
+    def _id_list(ids) -> List[int]:
+        """Handle single int or list of device IDs"""
+        if isinstance(ids, int):
+            return [ids]
+        return list(ids or [])
+
+    @staticmethod
+    def _parse_modbus(mb: Dict) -> ModbusConfig:
+        """Parse modbus connection settings"""
+        if mb.get('transport', 'sync') not in ('sync', 'pipelined'):
+            raise ValueError("modbus.transport must be 'sync' or 'pipelined'")
+        return ModbusConfig(
+            host=mb.get('host'),
+            port=mb.get('port', 502),
+            timeout=mb.get('timeout', 3),
+            retry_attempts=mb.get('retry_attempts', 2),
+            retry_delay=mb.get('retry_delay', 0.1),
+            max_read_registers=mb.get('max_read_registers', 125),
+            read_gap_max=mb.get('read_gap_max', 16),
+            pacing_min_ms=mb.get('pacing_min_ms', 0),
+            pacing_max_ms=mb.get('pacing_max_ms', 2000),
+            transport=mb.get('transport', 'sync'),
+            max_in_flight=mb.get('max_in_flight', 4),
+            unit_switch_reconnect=mb.get('unit_switch_reconnect', False)
+        )
+
     def _parse_config(self):
         """Parse configuration into dataclasses"""
         # Parse general settings
@@ -119,39 +244,72 @@ class ConfigLoader:
             publish_mode=gen.get('publish_mode', 'changed')
         )
 
-        # Parse modbus settings (required)
-        mb = self.config.get('modbus', {})
-        if not mb.get('host'):
+        # Parse modbus settings (modbus.host is required unless endpoints are listed)
+        mb = self.config.get('modbus', {}) or {}
+        endpoints = self.config.get('endpoints') or []
+        if not endpoints and not mb.get('host'):
             raise ValueError("modbus.host is required in configuration")
 
-        self.modbus = ModbusConfig(
-            host=mb.get('host'),
-            port=mb.get('port', 502),
-            timeout=mb.get('timeout', 3),
-            retry_attempts=mb.get('retry_attempts', 2),
-            retry_delay=mb.get('retry_delay', 0.1)
-        )
-
         # Parse devices settings
         dev = self.config.get('devices', {})
-        inverters = dev.get('inverters', [1])
-        meters = dev.get('meters', [240])
-        # Handle single int or list
-        if isinstance(inverters, int):
-            inverters = [inverters]
-        if isinstance(meters, int):
-            meters = [meters]
+        inverters = self._id_list(dev.get('inverters', [1]))
+        meters = self._id_list(dev.get('meters', [240]))
+
+        # Parse endpoints; each inherits the modbus section as defaults
+        self.endpoints = []
+        for index, ep in enumerate(endpoints):
+            name = ep.get('name', f"endpoint{index + 1}")
+            if not ep.get('host', mb.get('host')):
+                raise ValueError(f"endpoints[{index}] ({name}): host is required")
+            self.endpoints.append(EndpointConfig(
+                name=name,
+                modbus=self._parse_modbus({**mb, **ep}),
+                inverters=self._id_list(ep.get('inverters', [])),
+                meters=self._id_list(ep.get('meters', [])),
+                id_prefix=ep.get('id_prefix', '' if index == 0 else f"{name}_")
+            ))
+        if not self.endpoints:
+            self.endpoints.append(EndpointConfig(
+                name='default',
+                modbus=self._parse_modbus(mb),
+                inverters=inverters,
+                meters=meters
+            ))
+        self.modbus = self.endpoints[0].modbus
 
         self.devices = DevicesConfig(
             inverters=inverters,
             meters=meters,
             meter_poll_interval=dev.get('meter_poll_interval', 2.0),
+            inverter_poll_interval=dev.get('inverter_poll_interval', 5.0),
+            mppt_poll_interval=dev.get('mppt_poll_interval', 0.0),
+            controls_poll_interval=dev.get('controls_poll_interval', 60.0),
+            storage_poll_interval=dev.get('storage_poll_interval', 0.0),
+            sf_refresh_interval=dev.get('sf_refresh_interval', 3600.0),
+            skip_unchanged=dev.get('skip_unchanged', self.general.publish_mode != 'all'),
+            unchanged_refresh=dev.get('unchanged_refresh', 10),
             inverter_poll_delay=dev.get('inverter_poll_delay', 1.0),
-            inverter_read_delay_ms=dev.get('inverter_read_delay_ms', 200)
+            inverter_read_delay_ms=dev.get('inverter_read_delay_ms', 200),
+            device_cache=dev.get('device_cache', True),
+            cache_file=dev.get('cache_file', ''),
+            rescan_interval=dev.get('rescan_interval', 0),
+            sleep_backoff=dev.get('sleep_backoff', False),
+            sleep_status_codes=self._id_list(dev.get('sleep_status_codes', [2, 8])),
+            sleep_after_failures=max(1, dev.get('sleep_after_failures', 3)),
+            sleep_probe_interval=dev.get('sleep_probe_interval', 30.0),
+            night_probe_interval=dev.get('night_probe_interval', 300.0),
+            latitude=dev.get('latitude'),
+            longitude=dev.get('longitude'),
+            sun_margin=dev.get('sun_margin', 1800.0),
+            meter_interval_asleep=dev.get('meter_interval_asleep', 1.0)
         )
+        if (self.devices.latitude is None) != (self.devices.longitude is None):
+            raise ValueError("devices.latitude and devices.longitude must be set together")
 
         # Parse MQTT settings
         mq = self.config.get('mqtt', {})
+        if mq.get('publish_format', 'fields') not in ('fields', 'json', 'both'):
+            raise ValueError("mqtt.publish_format must be 'fields', 'json' or 'both'")
         self.mqtt = MQTTConfig(
             enabled=mq.get('enabled', True),
             broker=mq.get('broker', 'localhost'),
@@ -160,7 +318,10 @@ class ConfigLoader:
             password=mq.get('password', ''),
             topic_prefix=mq.get('topic_prefix', 'fronius'),
             retain=mq.get('retain', True),
-            qos=mq.get('qos', 0)
+            qos=mq.get('qos', 0),
+            publish_format=mq.get('publish_format', 'fields'),
+            ha_discovery=mq.get('ha_discovery', False),
+            ha_discovery_prefix=mq.get('ha_discovery_prefix', 'homeassistant')
         )
 
         # Parse InfluxDB settings
@@ -172,7 +333,65 @@ class ConfigLoader:
             org=idb.get('org', ''),
             bucket=idb.get('bucket', 'fronius'),
             write_interval=idb.get('write_interval', 5),
-            publish_mode=idb.get('publish_mode', '')
+            publish_mode=idb.get('publish_mode', ''),
+            batch_interval=idb.get('batch_interval', 1.0),
+            spool=idb.get('spool', True),
+            spool_dir=idb.get('spool_dir', ''),
+            spool_max_mb=idb.get('spool_max_mb', 100.0),
+            spool_segment_kb=idb.get('spool_segment_kb', 1024),
+            replay_rate=idb.get('replay_rate', 2000),
+            retry_interval=idb.get('retry_interval', 30.0)
+        )
+
+        # Parse change detection settings
+        cd = self.config.get('change_detection', {}) or {}
+        self.change_detection = ChangeDetectionConfig(
+            precision=cd.get('precision', 3),
+            max_silence=cd.get('max_silence', 300.0),
+            deadbands=cd.get('deadbands', {}) or {}
+        )
+
+        # Parse control write settings
+        ct = self.config.get('controls', {}) or {}
+        self.controls = ControlsConfig(
+            enabled=ct.get('enabled', False),
+            command_timeout=ct.get('command_timeout', 5.0),
+            verify=ct.get('verify', True)
+        )
+
+        # Parse metrics endpoint settings
+        mt = self.config.get('metrics', {}) or {}
+        self.metrics = MetricsConfig(
+            enabled=mt.get('enabled', False),
+            host=mt.get('host', '0.0.0.0'),
+            port=mt.get('port', 9105),
+            path=mt.get('path', '/metrics'),
+            buckets=[float(b) for b in mt.get('buckets', []) or []]
+        )
+
+        # Parse rollup settings
+        ru = self.config.get('rollups', {}) or {}
+        windows = [int(w) for w in ru.get('windows', [60, 900]) or []]
+        if any(w <= 0 for w in windows):
+            raise ValueError("rollups.windows must be positive numbers of seconds")
+        self.rollups = RollupConfig(
+            enabled=ru.get('enabled', False),
+            windows=windows,
+            max_gap=ru.get('max_gap', 120.0),
+            influxdb=ru.get('influxdb', True),
+            mqtt=ru.get('mqtt', False),
+            fields={k: list(v) for k, v in (ru.get('fields', {}) or {}).items()}
+        )
+
+        # Parse history settings
+        hi = self.config.get('history', {}) or {}
+        if int(hi.get('capacity', 600)) <= 0:
+            raise ValueError("history.capacity must be positive")
+        self.history = HistoryConfig(
+            enabled=hi.get('enabled', False),
+            capacity=int(hi.get('capacity', 600)),
+            max_gap=hi.get('max_gap', 120.0),
+            fields={k: list(v) for k, v in (hi.get('fields', {}) or {}).items()}
         )
 
 
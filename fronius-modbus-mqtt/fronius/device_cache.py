@@ -2,6 +2,7 @@
 
 import json
 import os
+import threading
 import time
 from typing import Dict, List, Optional
 from pathlib import Path
@@ -14,6 +15,7 @@ class DeviceCache:
 
     Stores discovered device info to avoid re-scanning on each startup.
     Supports automatic cache invalidation based on rescan_interval.
+    Safe to share between poller threads.
     """
 
     def __init__(self, cache_path: str = None):
@@ -27,6 +29,7 @@ class DeviceCache:
         self.devices: Dict[str, Dict] = {}
         self.discovered_at: float = 0
         self.log = get_logger()
+        self.lock = threading.RLock()
         self._load_cache()
 
     def _default_cache_path(self) -> str:
@@ -61,12 +64,17 @@ class DeviceCache:
             if cache_dir and not os.path.exists(cache_dir):
                 os.makedirs(cache_dir, exist_ok=True)
 
-            with open(self.cache_path, 'w') as f:
-                json.dump({
-                    'devices': self.devices,
-                    'discovered_at': self.discovered_at,
-                    'updated_at': time.time()
-                }, f, indent=2)
+            # Write to a temporary file first so a crash never leaves a
+            # truncated cache behind
+            tmp_path = f"{self.cache_path}.tmp"
+            with self.lock:
+                with open(tmp_path, 'w') as f:
+                    json.dump({
+                        'devices': self.devices,
+                        'discovered_at': self.discovered_at,
+                        'updated_at': time.time()
+                    }, f, indent=2)
+                os.replace(tmp_path, self.cache_path)
         except Exception as e:
             self.log.warning(f"Could not save device cache: {e}")
 
@@ -118,8 +126,9 @@ class DeviceCache:
         """
         key = self._make_key(device_id, device_type)
         info['cached_at'] = time.time()
-        self.devices[key] = info
-        self._save_cache()
+        with self.lock:
+            self.devices[key] = info
+            self._save_cache()
         self.log.debug(f"Cached {device_type} ID {device_id}")
 
     def get_all_devices(self, device_type: str = None) -> List[Dict]:
@@ -167,7 +176,9 @@ class DeviceCache:
             device_type: 'inverter' or 'meter'
         """
         key = self._make_key(device_id, device_type)
-        if key in self.devices:
+        with self.lock:
+            if key not in self.devices:
+                return
             del self.devices[key]
             self._save_cache()
             self.log.debug(f"Invalidated cache for {device_type} ID {device_id}")
@@ -0,0 +1,273 @@
+"""Recent history per device field in fixed-size ring buffers
+
+Architecture:
+- DeviceHistory: one ring of capacity samples per device, array('d')
+  backed - a shared timestamp column plus one value column per field
+  (NaN = field missing in that poll); appending overwrites the oldest
+  sample, so memory is fixed at capacity * (fields + 1) * 8 bytes
+- HistoryStore: rings of all devices, filled from the publish callback
+  and queried from the MQTT thread
+- query: a time window as raw samples or downsampled into step-second
+  buckets, returned as one compact columnar document
+"""
+
+import json
+import math
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import HistoryConfig
+from .rollup import DEFAULT_FIELDS
+
+
+AGGREGATES = ('mean', 'min', 'max', 'last')
+
+# Largest number of buckets per field in one response (step is raised to fit)
+MAX_POINTS = 1000
+
+NAN = float('nan')
+
+
+class DeviceHistory:
+    """Ring buffer of one device's recent samples"""
+
+    __slots__ = ('fields', 'capacity', 'times', 'columns', 'head', 'count')
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.times = array('d', [0.0]) * capacity
+        self.columns = {name: array('d', [NAN]) * capacity for name in self.fields}
+        self.head = 0       # Next slot to write
+        self.count = 0      # Valid samples (<= capacity)
+
+    def append(self, data: Dict, now: float):
+        """Store one poll, overwriting the oldest sample when full"""
+        head = self.head
+        self.times[head] = now
+        get = data.get
+        for name, column in self.columns.items():
+            value = get(name)
+            column[head] = (NAN if value is None or value is True or value is False
+                            else float(value))
+        self.head = head + 1 if head + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _chronological(self, column: array) -> array:
+        """Column in time order (oldest first)"""
+        if self.count < self.capacity:
+            return column[:self.head]
+        return column[self.head:] + column[:self.head]
+
+    def snapshot(self, fields: Sequence[str], since: float) -> Tuple[array, Dict[str, array]]:
+        """Time-ordered samples from since on: (times, {field: values})"""
+        times = self._chronological(self.times)
+        first = _bisect(times, since)
+        return times[first:], {name: self._chronological(self.columns[name])[first:]
+                               for name in fields}
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.itemsize * self.capacity * (len(self.columns) + 1)
+
+
+def _bisect(times: array, t: float) -> int:
+    """Index of the first sample at or after t"""
+    low, high = 0, len(times)
+    while low < high:
+        middle = (low + high) // 2
+        if times[middle] < t:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def downsample(times: Sequence[float], values: Sequence[float], start: float, step: float,
+               buckets: int, aggregate: str, max_gap: float) -> List[Optional[float]]:
+    """
+    Aggregate samples into step-second buckets from start.
+
+    A bucket without samples repeats the last earlier value if that is at
+    most max_gap seconds older than the bucket (polls skipped as unchanged),
+    otherwise it is None.
+    """
+    result: List[Optional[float]] = []
+    index, count = 0, len(times)
+    last_time, last_value = None, None
+    while index < count and times[index] < start:
+        if values[index] == values[index]:
+            last_time, last_value = times[index], values[index]
+        index += 1
+
+    for bucket in range(buckets):
+        begin = start + bucket * step
+        end = begin + step
+        total, samples, low, high = 0.0, 0, math.inf, -math.inf
+        while index < count and times[index] < end:
+            value = values[index]
+            index += 1
+            if value != value:  # NaN: field missing in this poll
+                continue
+            total += value
+            samples += 1
+            low = value if value < low else low
+            high = value if value > high else high
+            last_time, last_value = times[index - 1], value
+        if samples:
+            result.append(total / samples if aggregate == 'mean' else
+                          low if aggregate == 'min' else
+                          high if aggregate == 'max' else last_value)
+        elif last_value is not None and begin - last_time <= max_gap:
+            result.append(last_value)
+        else:
+            result.append(None)
+    return result
+
+
+def parse_request(payload: str) -> Tuple[Dict, Optional[str]]:
+    """
+    Parse a history request payload.
+
+    Empty payloads use the defaults; otherwise a JSON object with any of
+    seconds, step, fields, aggregate, id and reply_to.
+
+    Returns:
+        (request, None) or ({}, error message)
+    """
+    text = payload.strip()
+    if not text:
+        return {}, None
+    try:
+        request = json.loads(text)
+    except ValueError:
+        return {}, "payload is not valid JSON"
+    if not isinstance(request, dict):
+        return {}, "payload must be a JSON object"
+    return request, None
+
+
+class HistoryStore:
+    """
+    Ring buffers of all polled devices.
+
+    Memory is bounded by the configured capacity: rings are allocated once
+    per device at full size and never grow.
+    """
+
+    def __init__(self, config: HistoryConfig):
+        """
+        Args:
+            config: History settings (capacity, max_gap, field overrides)
+        """
+        self.config = config
+        self.capacity = max(1, int(config.capacity))
+        self.fields = {device_type: tuple(config.fields.get(device_type, fields))
+                       for device_type, fields in DEFAULT_FIELDS.items()}
+        self._devices: Dict[tuple, DeviceHistory] = {}
+        self._lock = threading.Lock()
+
+        # Stats
+        self.queries_total = 0
+        self.queries_rejected = 0
+
+    def add(self, device_type: str, device_id: str, data: Dict, now: float = None):
+        """
+        Record one parsed poll result.
+
+        Args:
+            device_type: 'inverter', 'meter' or 'storage'
+            device_id: Device identifier (as used in topics)
+            data: Parsed device data
+            now: Sample time (epoch seconds, defaults to time.time())
+        """
+        fields = self.fields.get(device_type)
+        if not fields:
+            return
+        now = time.time() if now is None else now
+        key = (device_type, device_id)
+        with self._lock:
+            history = self._devices.get(key)
+            if history is None:
+                history = self._devices[key] = DeviceHistory(fields, self.capacity)
+            history.append(data, now)
+
+    def query(self, device_type: str, device_id: str, request: Dict,
+              now: float = None) -> Dict:
+        """
+        Answer a history request.
+
+        Args:
+            device_type: Device type from the request topic
+            device_id: Device identifier from the request topic
+            request: Parsed request (see parse_request)
+            now: Window end (epoch seconds, defaults to time.time())
+
+        Returns:
+            {'id', 'start', 'step', 'fields': {field: [values]}} where
+            values are per bucket (step > 0) or per sample with the sample
+            offsets from start in 't' (step 0); {'id', 'error'} on errors
+        """
+        self.queries_total += 1
+        response = {'id': request.get('id')}
+        try:
+            seconds = float(request.get('seconds', 600))
+            step = float(request.get('step', 0))
+            aggregate = str(request.get('aggregate', 'mean'))
+            if seconds <= 0 or step < 0:
+                raise ValueError("seconds must be positive and step not negative")
+            if aggregate not in AGGREGATES:
+                raise ValueError(f"aggregate must be one of {', '.join(AGGREGATES)}")
+
+            history = self._devices.get((device_type, device_id))
+            if history is None:
+                raise ValueError(f"no history for {device_type}/{device_id}")
+            fields = request.get('fields') or history.fields
+            if isinstance(fields, str):
+                fields = [fields]
+            unknown = [name for name in fields if name not in history.columns]
+            if unknown:
+                raise ValueError(f"unknown fields: {', '.join(map(str, unknown))}")
+        except (TypeError, ValueError) as e:
+            self.queries_rejected += 1
+            response['error'] = str(e)
+            return response
+
+        now = time.time() if now is None else now
+        if step:
+            step = max(step, seconds / MAX_POINTS)
+            start = math.floor((now - seconds) / step) * step
+            buckets = int(math.ceil((now - start) / step))
+            with self._lock:
+                times, columns = history.snapshot(fields, start - self.config.max_gap)
+            response.update(start=round(start, 3), step=step, fields={
+                name: [None if v is None else round(v, 3) for v in
+                       downsample(times, values, start, step, buckets, aggregate,
+                                  self.config.max_gap)]
+                for name, values in columns.items()})
+        else:
+            start = now - seconds
+            with self._lock:
+                times, columns = history.snapshot(fields, start)
+            start = times[0] if times else start
+            response.update(start=round(start, 3), step=0,
+                            t=[round(t - start, 1) for t in times],
+                            fields={name: [None if v != v else round(v, 3) for v in values]
+                                    for name, values in columns.items()})
+        return response
+
+    def get_stats(self) -> Dict:
+        """Return history statistics"""
+        with self._lock:
+            devices = list(self._devices.values())
+        return {
+            'devices': len(devices),
+            'capacity': self.capacity,
+            'samples': sum(history.count for history in devices),
+            'memory_kib': round(sum(history.nbytes for history in devices) / 1024, 1),
+            'queries_total': self.queries_total,
+            'queries_rejected': self.queries_rejected,
+        }
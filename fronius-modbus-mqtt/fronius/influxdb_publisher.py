@@ -2,10 +2,72 @@
 
 import time
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
+from .change_filter import ChangeFilter
 from .config import InfluxDBConfig
 from .logging_setup import get_logger
+from .rollup import Rollup
+from .spool import LineSpool
+
+
+# Write errors caused by the lines themselves (bad line protocol, field type
+# conflict, request too large): sending the same lines again cannot succeed.
+# Other errors (connection, 5xx, 401/403/404, 429) mean InfluxDB is unavailable.
+REJECTED_STATUS = frozenset((400, 413, 422))
+
+
+def _rejected(error: Exception) -> bool:
+    """True if InfluxDB refused the data rather than being unavailable"""
+    return getattr(error, 'status', None) in REJECTED_STATUS
+
+def _escape_tag(value: Any) -> str:
+    """Escape a tag value for line protocol (commas, equals signs, spaces)"""
+    return (str(value).replace('\\', '\\\\').replace(',', '\\,')
+            .replace('=', '\\=').replace(' ', '\\ '))
+
+
+def _field_keys(*names: str) -> Tuple[Tuple[str, str], ...]:
+    """(data field, 'field=') pairs in line protocol order"""
+    return tuple((name, name + '=') for name in names)
+
+
+def _encode_fields(data: Dict, floats: Tuple = (), ints: Tuple = (),
+                   bools: Tuple = ()) -> List[str]:
+    """
+    Encode line protocol fields from a data dict.
+
+    Missing, None and non-finite values are left out. Floats keep the
+    float type even for integral values so the InfluxDB field type never
+    flips between poll cycles.
+
+    Args:
+        data: Parsed device data
+        floats: _field_keys() pairs written as floats
+        ints: _field_keys() pairs written as integers ('i' suffix)
+        bools: _field_keys() pairs written as true/false
+
+    Returns:
+        List of 'field=value' strings
+    """
+    fields = []
+    get = data.get
+    for name, key in floats:
+        value = get(name)
+        if value is None or value is True or value is False:
+            continue
+        value = float(value)
+        if value - value == 0.0:  # False for inf and NaN
+            fields.append(key + repr(value))
+    for name, key in ints:
+        value = get(name)
+        if value is not None and value is not True and value is not False:
+            fields.append(f"{key}{int(value)}i")
+    for name, key in bools:
+        value = get(name)
+        if value is not None:
+            fields.append(key + ('true' if value else 'false'))
+    return fields
 
 
 class InfluxDBPublisher:
@@ -13,23 +75,82 @@ class InfluxDBPublisher:
     InfluxDB Publisher for Fronius data.
 
     Features:
-    - Line protocol generation
-    - Batched writes
+    - Line protocol encoded directly from the parsed data: measurement and
+      tags are precomputed per device, fields are written in a fixed order
+    - One batch per poll cycle: lines from all devices collected within
+      batch_interval seconds are submitted as a single write
+    - Measurements for inverters, meters, storage (Model 124), MPPT
+      strings (Model 160) and immediate controls (Model 123)
     - Rate limiting per device
     - Publish-on-change mode
+    - Rollup measurements (fronius_<type>_<window>) from the RollupEngine
     - Automatic reconnection
+    - Write-ahead spool: batches that cannot be written while InfluxDB is
+      down go to an on-disk spool and are replayed at replay_rate lines/s
+      once writes succeed again, after the live batch of each cycle
+    - Lines InfluxDB rejects (4xx) are isolated and dropped, so they never
+      block the spool or count as an outage
     """
 
-    def __init__(self, config: InfluxDBConfig, publish_mode: str = 'changed'):
+    # Largest replay write (lines) and longest idle time credited to replay (seconds)
+    REPLAY_CHUNK = 5000
+    REPLAY_WINDOW = 10.0
+
+    # Fixed field order per measurement
+    INVERTER_FLOAT_FIELDS = _field_keys(
+        'ac_power', 'ac_current', 'ac_current_a', 'ac_current_b', 'ac_current_c',
+        'ac_voltage_ab', 'ac_voltage_bc', 'ac_voltage_ca',
+        'ac_voltage_an', 'ac_voltage_bn', 'ac_voltage_cn',
+        'ac_frequency',
+        'dc_power', 'dc_voltage', 'dc_current',
+        'lifetime_energy',
+        'power_factor', 'apparent_power', 'reactive_power',
+        'temp_cabinet', 'temp_heatsink', 'temp_transformer', 'temp_other'
+    )
+
+    METER_FLOAT_FIELDS = _field_keys(
+        'power_total', 'power_a', 'power_b', 'power_c',
+        'current_total', 'current_a', 'current_b', 'current_c',
+        'voltage_ln_avg', 'voltage_an', 'voltage_bn', 'voltage_cn',
+        'voltage_ll_avg', 'voltage_ab', 'voltage_bc', 'voltage_ca',
+        'frequency',
+        'va_total', 'va_a', 'va_b', 'va_c',
+        'var_total', 'var_a', 'var_b', 'var_c',
+        'pf_avg', 'pf_a', 'pf_b', 'pf_c',
+        'energy_exported', 'energy_exported_a', 'energy_exported_b', 'energy_exported_c',
+        'energy_imported', 'energy_imported_a', 'energy_imported_b', 'energy_imported_c'
+    )
+
+    MPPT_FLOAT_FIELDS = _field_keys(
+        'dc_current', 'dc_voltage', 'dc_power', 'dc_energy', 'temperature'
+    )
+
+    CONTROLS_FLOAT_FIELDS = _field_keys('power_limit_pct', 'power_factor')
+    CONTROLS_BOOL_FIELDS = _field_keys('connected', 'power_limit_enabled',
+                                       'power_factor_enabled', 'var_enabled')
+
+    STORAGE_FLOAT_FIELDS = _field_keys(
+        'max_charge_power', 'charge_ramp_rate', 'discharge_ramp_rate', 'max_charge_va',
+        'min_reserve_pct', 'charge_state_pct', 'available_storage_ah', 'battery_voltage',
+        'discharge_rate_pct', 'charge_rate_pct'
+    )
+    STORAGE_INT_FIELDS = _field_keys('charge_status_code', 'grid_charging_code',
+                                     'storage_control_mode')
+
+    def __init__(self, config: InfluxDBConfig, publish_mode: str = 'changed',
+                 change_filter: ChangeFilter = None):
         """
         Initialize InfluxDB publisher.
 
         Args:
             config: InfluxDB configuration
             publish_mode: 'changed' or 'all'
+            change_filter: Deadbands and heartbeat for 'changed' mode
+                (defaults to the built-in deadbands, no heartbeat)
         """
         self.config = config
         self.publish_mode = publish_mode
+        self.change_filter = change_filter or ChangeFilter()
         self.client = None
         self.write_api = None
         self.connected = False
@@ -38,17 +159,41 @@ class InfluxDBPublisher:
         self.lock = threading.Lock()
         self.log = get_logger()
 
+        # Line protocol prefixes ("measurement,tags ") by measurement and tag values
+        self._prefixes: Dict[tuple, str] = {}
+
+        # Lines of the current poll cycle, submitted together by _flush_pending
+        self._pending: List[str] = []
+        self._pending_lock = threading.Lock()
+        self._batch_timer: Optional[threading.Timer] = None
+
+        # Outage handling: one writer at a time, no write attempts until retry_at
+        self.spool: Optional[LineSpool] = None
+        self._write_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._last_replay = 0.0
+        self.replay_rate = 0.0     # Lines/s replayed by the last replay pass
+
         # Stats
-        self.writes_total = 0
+        self.writes_total = 0      # Points written
         self.writes_failed = 0
+        self.batches_total = 0     # Write requests submitted
+        self.lines_rejected = 0    # Lines InfluxDB refused (dropped)
 
         if config.enabled:
+            if config.spool:
+                self.spool = LineSpool(
+                    config.spool_dir or None,
+                    segment_bytes=config.spool_segment_kb * 1024,
+                    max_bytes=int(config.spool_max_mb * 1024 * 1024)
+                )
             self._setup_client()
 
     def _setup_client(self):
         """Setup InfluxDB client"""
         try:
             from influxdb_client import InfluxDBClient, WriteOptions
+            from influxdb_client.client.write_api import SYNCHRONOUS
 
             self.client = InfluxDBClient(
                 url=self.config.url,
@@ -56,13 +201,17 @@ class InfluxDBPublisher:
                 org=self.config.org
             )
 
-            self.write_api = self.client.write_api(write_options=WriteOptions(
-                batch_size=100,
-                flush_interval=10_000,
-                jitter_interval=2_000,
-                retry_interval=5_000,
-                max_retries=3
-            ))
+            if self.spool is not None:
+                # Failed writes must surface here so they can be spooled
+                self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+            else:
+                self.write_api = self.client.write_api(write_options=WriteOptions(
+                    batch_size=100,
+                    flush_interval=10_000,
+                    jitter_interval=2_000,
+                    retry_interval=5_000,
+                    max_retries=3
+                ))
 
             # Test connection
             health = self.client.health()
@@ -83,16 +232,20 @@ class InfluxDBPublisher:
             self.connected = False
 
     def is_enabled(self) -> bool:
-        """Check if InfluxDB publishing is enabled and connected"""
-        return self.config.enabled and self.connected
+        """Check if InfluxDB publishing is enabled and connected (or spooling)"""
+        if not self.config.enabled:
+            return False
+        return self.connected or (self.spool is not None and self.write_api is not None)
 
-    def _should_write(self, key: str, data: Dict) -> bool:
+    def _should_write(self, key: str, data: Dict, prefix: str = '') -> bool:
         """
         Check if data should be written based on mode and interval.
 
         Args:
-            key: Unique device key
+            key: Unique device (or measurement) key
             data: Data to write
+            prefix: Prepended to the field names to select deadbands
+                ('controls.' for Model 123)
 
         Returns:
             True if should write
@@ -105,18 +258,22 @@ class InfluxDBPublisher:
             if elapsed < self.config.write_interval:
                 return False
 
-        # Change detection
+        # Change detection against the last written point: a point is only
+        # written when a numeric field left its deadband, or as heartbeat
         if self.publish_mode == 'changed':
+            silence = self.change_filter.max_silence
+            heartbeat = silence and current_time - self.last_write_time.get(key, 0.0) >= silence
             with self.lock:
-                if key in self.last_values:
-                    # Compare numeric fields
+                if key in self.last_values and not heartbeat:
+                    last = self.last_values[key]
                     changed = False
                     for field, value in data.items():
-                        if isinstance(value, (int, float)):
-                            old_value = self.last_values[key].get(field)
-                            if old_value is None or old_value != value:
-                                changed = True
-                                break
+                        old_value = last.get(field)
+                        if (isinstance(value, (int, float)) and old_value != value
+                                and self.change_filter.changed(
+                                    old_value, value, self.change_filter.band(prefix + field))):
+                            changed = True
+                            break
 
                     if not changed:
                         return False
@@ -130,10 +287,186 @@ class InfluxDBPublisher:
         self.last_write_time[key] = current_time
         return True
 
+    def _prefix(self, measurement: str, device_type: str, device_id: str,
+                data: Dict, *extra: Tuple[str, Any]) -> str:
+        """
+        Line protocol prefix "measurement,tags " for a device (cached).
+
+        Tags are emitted in sorted key order, as InfluxDB prefers.
+
+        Args:
+            measurement: Measurement name
+            device_type: device_type tag
+            device_id: device_id tag
+            data: Device data (model and serial_number tags)
+            extra: Additional (tag, value) pairs, already in key order
+        """
+        model = data.get('model')
+        serial = data.get('serial_number')
+        cache_key = (measurement, device_type, device_id, model, serial) + extra
+        prefix = self._prefixes.get(cache_key)
+        if prefix is None:
+            tags = [('device_id', device_id), ('device_type', device_type)]
+            if model:
+                tags.append(('model', model))
+            if serial:
+                tags.append(('serial_number', serial))
+            tags.extend(extra)
+            prefix = measurement + ''.join(f",{k}={_escape_tag(v)}" for k, v in tags) + ' '
+            self._prefixes[cache_key] = prefix
+        return prefix
+
+    def _submit(self, lines: List[str]):
+        """
+        Queue lines for the current batch.
+
+        The first line of a batch starts a timer; everything queued until
+        it fires (one poll cycle across all devices) goes out as one write.
+        """
+        if not lines:
+            return
+        with self._pending_lock:
+            self._pending.extend(lines)
+            immediate = self.config.batch_interval <= 0
+            if not immediate and self._batch_timer is None:
+                self._batch_timer = threading.Timer(self.config.batch_interval,
+                                                    self._flush_pending)
+                self._batch_timer.daemon = True
+                self._batch_timer.start()
+        if immediate:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        """Submit all queued lines as one write request"""
+        with self._pending_lock:
+            lines, self._pending = self._pending, []
+            self._batch_timer = None
+        if not lines or not self.write_api:
+            return
+
+        with self._write_lock:
+            now = time.monotonic()
+            if self.spool is not None and now < self._retry_at:
+                # InfluxDB is down: spool without another attempt
+                self.spool.append(lines)
+                return
+            if not self._write_lines(lines):
+                return
+            if self.spool is not None and self.spool.segments:
+                self._replay(now)
+
+    def _write_lines(self, lines: List[str]) -> bool:
+        """
+        Write lines as one request (write lock held).
+
+        When InfluxDB is unavailable the lines are spooled and further
+        attempts are held off for retry_interval seconds.
+
+        Returns:
+            True if written (apart from rejected lines)
+        """
+        try:
+            rejected = self._send(lines)
+        except Exception as e:
+            self.writes_failed += len(lines)
+            if self.spool is None:
+                self.log.error(f"InfluxDB write error ({len(lines)} points): {e}")
+                return False
+            if self.connected:
+                self.log.warning(f"InfluxDB unavailable, spooling writes: {e}")
+            self.connected = False
+            self._retry_at = time.monotonic() + self.config.retry_interval
+            self.spool.append(lines)
+            return False
+
+        if not self.connected:
+            self.log.info(f"InfluxDB available again at {self.config.url}")
+            self.connected = True
+        self.writes_total += len(lines) - rejected
+        self.batches_total += 1
+        return True
+
+    def _send(self, lines: List[str]) -> int:
+        """
+        Write lines, leaving out the ones InfluxDB refuses (write lock held).
+
+        A rejected request is split in halves until the offending lines are
+        isolated; those are dropped and the rest is written. Points that
+        InfluxDB already stored from a partial write are simply overwritten.
+        Errors other than rejections are raised to the caller.
+
+        Returns:
+            Number of lines dropped
+        """
+        try:
+            self.write_api.write(bucket=self.config.bucket, record='\n'.join(lines))
+            return 0
+        except Exception as e:
+            if not _rejected(e):
+                raise
+            if len(lines) == 1:
+                self.lines_rejected += 1
+                self.log.warning(f"InfluxDB rejected a line, dropping it "
+                                 f"({getattr(e, 'message', None) or e}): {lines[0][:200]}")
+                return 1
+        middle = len(lines) // 2
+        return self._send(lines[:middle]) + self._send(lines[middle:])
+
+    def _replay(self, now: float):
+        """
+        Write spooled lines back, at most replay_rate lines per second
+        since the previous replay pass (write lock held).
+
+        Runs after the live batch, so a long backlog never delays current data.
+        """
+        elapsed = now - self._last_replay if self._last_replay else 1.0
+        self._last_replay = now
+        budget = int(self.config.replay_rate * min(elapsed, self.REPLAY_WINDOW))
+        replayed = 0
+        while budget > 0:
+            chunk = self.spool.peek(min(budget, self.REPLAY_CHUNK))
+            if chunk is None:
+                break
+            sequence, end, lines = chunk
+            if lines and not self._write_spooled(lines):
+                break
+            self.spool.commit(sequence, end, len(lines))
+            replayed += len(lines)
+            budget -= max(1, len(lines))
+        self.replay_rate = replayed / elapsed if elapsed > 0 else 0.0
+        if not self.spool.segments:
+            self._last_replay = 0.0
+            self.log.info(f"InfluxDB spool drained ({self.spool.lines_replayed} lines replayed)")
+
+    def _write_spooled(self, lines: List[str]) -> bool:
+        """
+        Write replayed lines.
+
+        Returns:
+            True if the lines are done with (written or rejected), False if
+            InfluxDB is unavailable and they stay in the spool
+        """
+        try:
+            rejected = self._send(lines)
+        except Exception as e:
+            self.log.warning(f"InfluxDB spool replay failed: {e}")
+            self.connected = False
+            self._retry_at = time.monotonic() + self.config.retry_interval
+            return False
+        self.writes_total += len(lines) - rejected
+        self.batches_total += 1
+        return True
+
     def write_inverter_data(self, device_id: str, data: Dict):
         """
         Write inverter data to InfluxDB.
 
+        Besides fronius_inverter this writes one fronius_mppt point per
+        MPPT string and a fronius_controls point when the inverter data
+        includes them. Each of these points has its own change detection,
+        so e.g. a new power limit is written while the AC values sit
+        inside their deadbands.
+
         Args:
             device_id: Device identifier
             data: Parsed inverter data
@@ -142,53 +475,44 @@ class InfluxDBPublisher:
             return
 
         key = f"inverter_{device_id}"
-        if not self._should_write(key, data):
-            return
-
         try:
-            from influxdb_client import Point
-
-            point = Point("fronius_inverter") \
-                .tag("device_id", device_id) \
-                .tag("device_type", "inverter")
-
-            # Add model info as tags
-            if data.get('model'):
-                point = point.tag("model", data['model'])
-            if data.get('serial_number'):
-                point = point.tag("serial_number", data['serial_number'])
-
-            # Add status as tag
-            if 'status' in data:
-                point = point.tag("status", data['status'].get('name', 'UNKNOWN'))
-
-            # Numeric fields
-            numeric_fields = [
-                'ac_power', 'ac_current', 'ac_current_a', 'ac_current_b', 'ac_current_c',
-                'ac_voltage_ab', 'ac_voltage_bc', 'ac_voltage_ca',
-                'ac_voltage_an', 'ac_voltage_bn', 'ac_voltage_cn',
-                'ac_frequency',
-                'dc_power', 'dc_voltage', 'dc_current',
-                'lifetime_energy',
-                'power_factor', 'apparent_power', 'reactive_power',
-                'temp_cabinet', 'temp_heatsink', 'temp_transformer', 'temp_other'
-            ]
-
-            for field in numeric_fields:
-                if field in data and data[field] is not None:
-                    point = point.field(field, float(data[field]))
-
-            # Status code as field
-            if 'status' in data:
-                point = point.field("status_code", data['status'].get('code', 0))
-                point = point.field("status_alarm", data['status'].get('alarm', False))
-
-            # Event count
-            if 'events' in data:
-                point = point.field("event_count", len(data['events']))
-
-            self.write_api.write(bucket=self.config.bucket, record=point)
-            self.writes_total += 1
+            timestamp = f" {time.time_ns()}"
+            lines = []
+
+            if self._should_write(key, data):
+                status = data.get('status')
+                fields = _encode_fields(data, self.INVERTER_FLOAT_FIELDS)
+                if status is not None:
+                    fields.append(f"status_code={int(status.get('code', 0))}i")
+                    fields.append('status_alarm=true' if status.get('alarm', False)
+                                  else 'status_alarm=false')
+                if 'events' in data:
+                    fields.append(f"event_count={len(data['events'] or [])}i")
+                if fields:
+                    extra = (('status', status.get('name', 'UNKNOWN')),) if status is not None else ()
+                    prefix = self._prefix('fronius_inverter', 'inverter', device_id, data, *extra)
+                    lines.append(prefix + ','.join(fields) + timestamp)
+
+            mppt = data.get('mppt')
+            if mppt:
+                for module in mppt.get('modules', []):
+                    if not self._should_write(f"{key}_mppt{module.get('id', 0)}", module):
+                        continue
+                    fields = _encode_fields(module, self.MPPT_FLOAT_FIELDS)
+                    if fields:
+                        prefix = self._prefix('fronius_mppt', 'inverter', device_id, data,
+                                              ('string', module.get('id', 0)))
+                        lines.append(prefix + ','.join(fields) + timestamp)
+
+            controls = data.get('controls')
+            if controls and self._should_write(f"{key}_controls", controls, 'controls.'):
+                fields = _encode_fields(controls, self.CONTROLS_FLOAT_FIELDS,
+                                        bools=self.CONTROLS_BOOL_FIELDS)
+                if fields:
+                    prefix = self._prefix('fronius_controls', 'inverter', device_id, data)
+                    lines.append(prefix + ','.join(fields) + timestamp)
+
+            self._submit(lines)
 
         except Exception as e:
             self.writes_failed += 1
@@ -210,45 +534,76 @@ class InfluxDBPublisher:
             return
 
         try:
-            from influxdb_client import Point
-
-            point = Point("fronius_meter") \
-                .tag("device_id", device_id) \
-                .tag("device_type", "meter")
-
-            # Add model info as tags
-            if data.get('model'):
-                point = point.tag("model", data['model'])
-            if data.get('serial_number'):
-                point = point.tag("serial_number", data['serial_number'])
-
-            # Numeric fields
-            numeric_fields = [
-                'power_total', 'power_a', 'power_b', 'power_c',
-                'current_total', 'current_a', 'current_b', 'current_c',
-                'voltage_ln_avg', 'voltage_an', 'voltage_bn', 'voltage_cn',
-                'voltage_ll_avg', 'voltage_ab', 'voltage_bc', 'voltage_ca',
-                'frequency',
-                'va_total', 'va_a', 'va_b', 'va_c',
-                'var_total', 'var_a', 'var_b', 'var_c',
-                'pf_avg', 'pf_a', 'pf_b', 'pf_c',
-                'energy_exported', 'energy_exported_a', 'energy_exported_b', 'energy_exported_c',
-                'energy_imported', 'energy_imported_a', 'energy_imported_b', 'energy_imported_c'
-            ]
-
-            for field in numeric_fields:
-                if field in data and data[field] is not None:
-                    point = point.field(field, float(data[field]))
-
-            self.write_api.write(bucket=self.config.bucket, record=point)
-            self.writes_total += 1
+            fields = _encode_fields(data, self.METER_FLOAT_FIELDS)
+            if fields:
+                prefix = self._prefix('fronius_meter', 'meter', device_id, data)
+                self._submit([f"{prefix}{','.join(fields)} {time.time_ns()}"])
 
         except Exception as e:
             self.writes_failed += 1
             self.log.error(f"InfluxDB write error for meter {device_id}: {e}")
 
+    def write_storage_data(self, device_id: str, data: Dict):
+        """
+        Write storage (Model 124) data to InfluxDB.
+
+        Args:
+            device_id: Device identifier of the inverter the battery is attached to
+            data: Parsed storage data
+        """
+        if not self.is_enabled():
+            return
+
+        key = f"storage_{device_id}"
+        if not self._should_write(key, data):
+            return
+
+        try:
+            fields = _encode_fields(data, self.STORAGE_FLOAT_FIELDS, self.STORAGE_INT_FIELDS)
+            if fields:
+                charge_status = data.get('charge_status') or {}
+                prefix = self._prefix('fronius_storage', 'storage', device_id, data,
+                                      ('status', charge_status.get('name', 'UNKNOWN')))
+                self._submit([f"{prefix}{','.join(fields)} {time.time_ns()}"])
+
+        except Exception as e:
+            self.writes_failed += 1
+            self.log.error(f"InfluxDB write error for storage {device_id}: {e}")
+
+    def write_rollup(self, rollup: Rollup):
+        """
+        Write one closed rollup window.
+
+        The measurement is fronius_<device type>_<window> (e.g.
+        fronius_inverter_1m), timestamped at the window start. Rollups
+        bypass rate limiting and change detection: every window is written.
+
+        Args:
+            rollup: Aggregates from the RollupEngine
+        """
+        if not self.is_enabled():
+            return
+
+        try:
+            fields = [f"{name}={float(value)!r}" for name, value in rollup.values.items()
+                      if value - value == 0.0]
+            if fields:
+                fields.append(f"samples={rollup.samples}i")
+                prefix = self._prefix(f"fronius_{rollup.device_type}_{rollup.label}",
+                                      rollup.device_type, rollup.device_id, rollup.tags)
+                self._submit([f"{prefix}{','.join(fields)} {rollup.start * 1_000_000_000}"])
+
+        except Exception as e:
+            self.writes_failed += 1
+            self.log.error(f"InfluxDB rollup write error for {rollup.device_type} "
+                           f"{rollup.device_id}: {e}")
+
     def flush(self):
-        """Flush pending writes"""
+        """Submit the current batch and flush pending writes"""
+        timer = self._batch_timer
+        if timer is not None:
+            timer.cancel()
+        self._flush_pending()
         if self.write_api:
             try:
                 self.write_api.flush()
@@ -257,6 +612,11 @@ class InfluxDBPublisher:
 
     def close(self):
         """Close InfluxDB connection"""
+        timer = self._batch_timer
+        if timer is not None:
+            timer.cancel()
+        self._flush_pending()
+
         if self.write_api:
             try:
                 self.write_api.close()
@@ -281,5 +641,11 @@ class InfluxDBPublisher:
             'bucket': self.config.bucket,
             'writes_total': self.writes_total,
             'writes_failed': self.writes_failed,
+            'lines_rejected': self.lines_rejected,
+            'batches_total': self.batches_total,
+            'pending_lines': len(self._pending),
+            'batch_interval': self.config.batch_interval,
+            'spool': dict(self.spool.get_stats(), replay_rate=round(self.replay_rate, 1),
+                          replay_limit=self.config.replay_rate) if self.spool is not None else None,
             'publish_mode': self.publish_mode
         }
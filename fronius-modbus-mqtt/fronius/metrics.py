@@ -0,0 +1,366 @@
+"""Prometheus metrics endpoint for the bridge
+
+Architecture:
+- Counter/Histogram: labelled metrics updated by the polling threads
+  (per-request read latency, retries, poll durations, scheduler lag,
+  control command latency)
+- Collectors: called on each scrape to turn the existing get_stats()
+  counters of endpoints and publishers into samples
+- MetricsServer: stdlib HTTP server thread serving the text exposition format
+"""
+
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .logging_setup import get_logger
+
+# Read and poll latencies of a DataManager range from ~20ms to seconds
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric name, type, help, [(labels, value)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_family(name: str, kind: str, help_text: str,
+                  samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Text exposition lines of one metric family."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                 for labels, value in samples)
+    return lines
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            samples = [(dict(zip(self.label_names, key)), value)
+                       for key, value in sorted(self._values.items())]
+        return render_family(self.name, 'counter', self.help, samples)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last = +Inf), sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        key = tuple(str(v) for v in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(key, list(counts), total, count)
+                      for key, (counts, total, count) in sorted(self._series.items())]
+        for key, counts, total, count in series:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(dict(labels, le=_format_value(float(bound))))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics updated by the pollers plus collectors evaluated on each scrape."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.log = get_logger()
+        self.read_duration = Histogram(
+            'fronius_modbus_read_duration_seconds',
+            'Modbus read request latency by unit ID and model block',
+            ('endpoint', 'unit', 'block'), buckets)
+        self.read_results = Counter(
+            'fronius_modbus_read_results_total',
+            'Planned Modbus reads by outcome (ok, failed, stale)',
+            ('endpoint', 'unit', 'block', 'result'))
+        self.retries = Counter(
+            'fronius_modbus_retries_total',
+            'Modbus read attempts repeated after a failure or stale response',
+            ('endpoint', 'unit'))
+        self.poll_duration = Histogram(
+            'fronius_poll_duration_seconds',
+            'Duration of a scheduled poll task',
+            ('endpoint', 'task'), buckets)
+        self.scheduler_lag = Histogram(
+            'fronius_scheduler_lag_seconds',
+            'Delay between a poll task deadline and its start',
+            ('endpoint', 'task'), buckets)
+        self.command_latency = Histogram(
+            'fronius_command_latency_seconds',
+            'Time from receiving a control command to its confirmed write',
+            ('endpoint', 'unit', 'control'), buckets)
+        self.commands = Counter(
+            'fronius_commands_total',
+            'Control commands by outcome (ok, failed, unconfirmed, expired, rejected)',
+            ('endpoint', 'unit', 'control', 'status'))
+        self._metrics = [self.read_duration, self.read_results, self.retries,
+                         self.poll_duration, self.scheduler_lag,
+                         self.command_latency, self.commands]
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]):
+        """Register a callable returning metric families at scrape time."""
+        self._collectors.append(collector)
+
+    def poller(self, endpoint: str) -> 'PollerMetrics':
+        """Metrics view bound to one endpoint's poller."""
+        return PollerMetrics(self, endpoint)
+
+    def render(self) -> str:
+        """Text exposition of all metrics."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                self.log.warning(f"Metrics: collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.extend(render_family(name, kind, help_text, samples))
+        return '\n'.join(lines) + '\n'
+
+
+class PollerMetrics:
+    """Records the reads and task runs of one endpoint's poller."""
+
+    def __init__(self, registry: MetricsRegistry, endpoint: str):
+        self.registry = registry
+        self.endpoint = endpoint
+
+    def observe_read(self, unit_id: int, block: str, latency: Optional[float],
+                     result: str, retries: int = 0):
+        """
+        Record one planned read.
+
+        Args:
+            unit_id: Modbus unit ID
+            block: Model block(s) covered by the request, e.g. "inverter+controls"
+            latency: Seconds of the successful attempt (None if all failed)
+            result: 'ok', 'failed' or 'stale'
+            retries: Attempts beyond the first
+        """
+        if latency is not None:
+            self.registry.read_duration.observe(latency, self.endpoint, unit_id, block)
+        self.registry.read_results.inc(self.endpoint, unit_id, block, result)
+        if retries:
+            self.registry.retries.inc(self.endpoint, unit_id, amount=retries)
+
+    def observe_command(self, unit_id: int, control: str, latency: float, status: str):
+        """Record a control command; latency only counts for confirmed writes."""
+        if status == 'ok':
+            self.registry.command_latency.observe(latency, self.endpoint, unit_id, control)
+        self.registry.commands.inc(self.endpoint, unit_id, control, status)
+
+    def observe_task(self, task, lateness: float, duration: float):
+        """DeadlineScheduler observer: poll duration and scheduler lag."""
+        self.registry.poll_duration.observe(duration, self.endpoint, task.name)
+        self.registry.scheduler_lag.observe(lateness, self.endpoint, task.name)
+
+
+def modbus_collector(client) -> Callable[[], List[Family]]:
+    """Scrape-time metrics from FroniusModbusClient.get_stats()."""
+    def collect() -> List[Family]:
+        endpoints = client.get_stats()['endpoints']
+        reads, reconnects, stale, timeouts = [], [], [], []
+        gap, latency, error_rate, connected = [], [], [], []
+        misses, skipped, unchanged = [], [], []
+        for name, ep in endpoints.items():
+            labels = {'endpoint': name}
+            pacing = ep['pacing']
+            reads.append((dict(labels, result='ok'), ep['successful_reads']))
+            reads.append((dict(labels, result='failed'), ep['failed_reads']))
+            reconnects.append((labels, ep['reconnects']))
+            stale.append((labels, pacing['stale']))
+            timeouts.append((labels, pacing['timeouts']))
+            gap.append((labels, pacing['gap_ms'] / 1000.0))
+            if pacing['latency_ms'] is not None:
+                latency.append((labels, pacing['latency_ms'] / 1000.0))
+            error_rate.append((labels, pacing['error_rate']))
+            connected.append((labels, 1 if ep['connected'] else 0))
+            for task, stats in ep['scheduler'].items():
+                misses.append((dict(labels, task=task), stats['misses']))
+                skipped.append((dict(labels, task=task), stats['skipped']))
+            if ep['unchanged_polls']:
+                unchanged.append((labels, ep['unchanged_polls']['hits']))
+        return [
+            ('fronius_modbus_reads_total', 'counter', 'Modbus requests by result', reads),
+            ('fronius_modbus_reconnects_total', 'counter',
+             'Modbus TCP connections re-established after a drop, stale response or unit switch',
+             reconnects),
+            ('fronius_modbus_stale_responses_total', 'counter',
+             'Responses that belonged to an earlier request', stale),
+            ('fronius_modbus_timeouts_total', 'counter',
+             'Requests without response or connection', timeouts),
+            ('fronius_modbus_request_gap_seconds', 'gauge',
+             'Current adaptive gap between requests', gap),
+            ('fronius_modbus_latency_seconds', 'gauge',
+             'Smoothed response latency seen by the pacer', latency),
+            ('fronius_modbus_error_rate', 'gauge',
+             'Smoothed fraction of failed requests', error_rate),
+            ('fronius_modbus_connected', 'gauge', 'Endpoint discovery connection state', connected),
+            ('fronius_scheduler_deadline_misses_total', 'counter',
+             'Poll runs that started more than half an interval late', misses),
+            ('fronius_scheduler_skipped_total', 'counter',
+             'Poll intervals lost while behind schedule', skipped),
+            ('fronius_unchanged_polls_total', 'counter',
+             'Polls skipped because the registers were unchanged', unchanged),
+        ]
+    return collect
+
+
+def mqtt_collector(publisher) -> Callable[[], List[Family]]:
+    """Scrape-time metrics from MQTTPublisher.get_stats()."""
+    def collect() -> List[Family]:
+        stats = publisher.get_stats()
+        return [
+            ('fronius_mqtt_messages_published_total', 'counter', 'MQTT messages published',
+             [({}, stats['messages_published'])]),
+            ('fronius_mqtt_messages_skipped_total', 'counter',
+             'MQTT messages suppressed by change detection', [({}, stats['messages_skipped'])]),
+            ('fronius_mqtt_connected', 'gauge', 'MQTT broker connection state',
+             [({}, 1 if stats['connected'] else 0)]),
+        ]
+    return collect
+
+
+def influxdb_collector(publisher) -> Callable[[], List[Family]]:
+    """Scrape-time metrics from InfluxDBPublisher.get_stats()."""
+    def collect() -> List[Family]:
+        stats = publisher.get_stats()
+        spool = stats['spool'] or {}
+        return [
+            ('fronius_influxdb_points_written_total', 'counter', 'Points written to InfluxDB',
+             [({}, stats['writes_total'])]),
+            ('fronius_influxdb_points_failed_total', 'counter', 'Points whose write failed',
+             [({}, stats['writes_failed'])]),
+            ('fronius_influxdb_points_rejected_total', 'counter', 'Points InfluxDB refused (dropped)',
+             [({}, stats['lines_rejected'])]),
+            ('fronius_influxdb_batches_total', 'counter', 'Write requests submitted',
+             [({}, stats['batches_total'])]),
+            ('fronius_influxdb_queue_lines', 'gauge', 'Lines waiting for the next batch write',
+             [({}, stats['pending_lines'])]),
+            ('fronius_influxdb_spool_bytes', 'gauge', 'Spooled data waiting for replay',
+             [({}, spool.get('pending_bytes', 0))]),
+            ('fronius_influxdb_spool_segments', 'gauge', 'Spool segment files',
+             [({}, spool.get('segments', 0))]),
+            ('fronius_influxdb_connected', 'gauge', 'InfluxDB availability',
+             [({}, 1 if stats['connected'] else 0)]),
+        ]
+    return collect
+
+
+class MetricsServer:
+    """Serves a MetricsRegistry over HTTP from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '0.0.0.0', port: int = 9105,
+                 path: str = '/metrics'):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.path = path
+        self.log = get_logger()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self):
+        registry = self.registry
+        path = self.path
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != path:
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> bool:
+        """Bind and start serving; returns False if the port is unavailable."""
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        except OSError as e:
+            self.log.error(f"Metrics: cannot listen on {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name="MetricsServer")
+        self._thread.start()
+        self.log.info(f"Metrics: serving http://{self.host}:{self.port}{self.path}")
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,12 +1,16 @@
-"""Modbus TCP Client with simple sequential polling for Fronius devices
+"""Modbus TCP Client with deadline-scheduled polling for Fronius devices
 
 Architecture:
-- MeterPoller: Thread that reads meter, publishes to MQTT, sleeps, repeats
-- InverterPoller: Thread that cycles through inverters one by one with pauses
+- DevicePoller: Single thread polling every device on its own interval
+  (meters fast, inverters slower), most urgent device first
+- Per-model block intervals inside an inverter poll (MPPT, controls, storage)
+- Night backoff: sleeping, standby or silent inverters are only probed,
+  slower between sunset and sunrise; meters get the freed time
 - Single shared Modbus connection
 """
 
 import time
+import select
 import logging
 import threading
 from typing import Dict, List, Optional, Callable
@@ -14,23 +18,140 @@ from typing import Dict, List, Optional, Callable
 from pymodbus.client import ModbusTcpClient
 from pymodbus.exceptions import ModbusException
 
-from .config import ModbusConfig, DevicesConfig
+from .config import ModbusConfig, DevicesConfig, EndpointConfig, ControlsConfig
 from .register_parser import RegisterParser
+from .read_planner import ModelSpan, ReadPlanner, ReadRequest, RegisterImage
+from .pacing import AdaptivePacer
+from .scheduler import DeadlineScheduler, PollTask
+from .device_cache import DeviceCache
+from .commands import CONTROL_POINTS, CommandQueue, ControlCommand, encode_value
+from .metrics import MetricsRegistry, PollerMetrics
+from .sun import Daylight
 from .logging_setup import get_logger
 
 # Suppress pymodbus exception logging
 logging.getLogger("pymodbus").setLevel(logging.CRITICAL)
 
 
-class ModbusConnection:
-    """Shared Modbus TCP connection with thread-safe access."""
+class SunSpecDiscovery:
+    """
+    Device identification and model discovery on top of read_registers().
+
+    Shared by the synchronous and the pipelined connection.
+    """
 
     SUNSPEC_ID = 0x53756E53  # 'SunS'
-    INVERTER_MODELS = [101, 102, 103]
-    METER_MODELS = [201, 202, 203, 204]
+    INVERTER_MODELS = [101, 102, 103, 111, 112, 113]    # Int+SF, float
+    METER_MODELS = [201, 202, 203, 204, 211, 212, 213, 214]
     STORAGE_MODEL = 124  # Basic Storage Controls
 
-    def __init__(self, config: ModbusConfig, parser: RegisterParser):
+    MODEL_CHAIN_START = 40070    # First model after the common block
+    END_MODEL_ID = 0xFFFF        # End block marker
+    MAX_MODELS = 32              # Give up on chains longer than this
+
+    def identify_device(self, unit_id: int) -> Optional[Dict]:
+        """Identify a device by reading SunSpec registers."""
+        regs = self.read_registers(40001, 69, unit_id)
+        if not regs or len(regs) < 69:
+            return None
+
+        # Verify SunSpec header
+        sunspec_id = (regs[0] << 16) | regs[1]
+        if sunspec_id != self.SUNSPEC_ID:
+            return None
+
+        device_info = {
+            'device_id': unit_id,
+            'manufacturer': self.parser.decode_string(regs[4:20]),
+            'model': self.parser.decode_string(regs[20:36]),
+            'version': self.parser.decode_string(regs[44:52]),
+            'serial_number': self.parser.decode_string(regs[52:68]),
+        }
+
+        # Model addresses; the first model identifies the device type
+        models = self.walk_models(unit_id)
+        if models:
+            device_info['models'] = models
+            model_id = models[0][0]
+        else:
+            model_regs = self.read_registers(self.MODEL_CHAIN_START, 1, unit_id)
+            model_id = model_regs[0] if model_regs else None
+        if model_id is not None:
+            device_info['model_id'] = model_id
+            device_info['register_format'] = 'float' if self.parser.is_float_model(model_id) else 'int_sf'
+            if model_id in self.INVERTER_MODELS:
+                device_info['device_type'] = 'inverter'
+                device_info['inverter_type'] = self.parser.detect_inverter_type(device_info['model'])
+            elif model_id in self.METER_MODELS:
+                device_info['device_type'] = 'meter'
+
+        self.log.info(f"Device {unit_id}: {device_info['manufacturer']} {device_info['model']} "
+                      f"(SN: {device_info['serial_number']}, model {model_id}, "
+                      f"{device_info.get('register_format', 'unknown')} format)")
+        return device_info
+
+    def walk_models(self, unit_id: int) -> Optional[List[List[int]]]:
+        """
+        Walk the SunSpec model chain from MODEL_CHAIN_START to the end block.
+
+        Each model starts with an ID and a length register, so one 2-register
+        read per model finds every model address, whatever the register
+        format (Int+SF or float) or firmware.
+
+        Args:
+            unit_id: Modbus unit ID
+
+        Returns:
+            [model_id, address, length] per model (address of the ID register,
+            length without the header), or None if the chain could not be
+            read to its end block
+        """
+        models = []
+        address = self.MODEL_CHAIN_START
+        for _ in range(self.MAX_MODELS):
+            regs = self.read_registers(address, 2, unit_id)
+            if not regs or len(regs) < 2:
+                self.log.debug(f"Device {unit_id}: model chain read failed at {address}")
+                return None
+            model_id, length = regs[0], regs[1]
+            if model_id == self.END_MODEL_ID:
+                self.log.debug(f"Device {unit_id}: models " +
+                               ", ".join(f"{m}@{a}" for m, a, _ in models))
+                return models
+            models.append([model_id, address, length])
+            address += 2 + length
+            if address + 2 > 0x10000:
+                break
+        self.log.debug(f"Device {unit_id}: model chain has no end block")
+        return None
+
+    def check_storage_support(self, unit_id: int, models: List[List[int]] = None) -> bool:
+        """
+        Check if an inverter supports storage (Model 124).
+
+        Uses the model chain when given; otherwise reads the model ID at
+        the fixed address 40341 (Int+SF format: model header before 40343).
+
+        Returns True if storage model 124 is found.
+        """
+        if models is not None:
+            found = any(m[0] == self.STORAGE_MODEL for m in models)
+        else:
+            # Read model header at 40341 (2 registers: ID + Length)
+            model_regs = self.read_registers(40341, 2, unit_id)
+            found = bool(model_regs) and len(model_regs) >= 2 and model_regs[0] == self.STORAGE_MODEL
+        if found:
+            self.log.info(f"Device {unit_id}: Storage support detected (Model 124)")
+        return found
+
+
+class ModbusConnection(SunSpecDiscovery):
+    """Shared Modbus TCP connection with thread-safe access."""
+
+    STALE_DRAIN_WAIT = 0.2        # Seconds to wait for a late frame after a stale response
+    STALE_RECONNECT_AFTER = 2     # Consecutive stale responses before reconnecting
+
+    def __init__(self, config: ModbusConfig, parser: RegisterParser, initial_gap: float = None):
         self.config = config
         self.parser = parser
         self.log = get_logger()
@@ -39,7 +160,23 @@ class ModbusConnection:
         self.lock = threading.Lock()
         self.successful_reads = 0
         self.failed_reads = 0
+        self.reconnects = 0
+        self.stale_responses = 0   # Responses that failed validation
+        self.drained_frames = 0    # Drains that discarded late responses
         self.last_unit_id = None  # Track last unit ID to detect changes
+        self._stale_streak = 0
+
+        # Outcome of the last read_registers call (for metrics)
+        self.last_latency: Optional[float] = None
+        self.last_attempts = 0
+
+        # Gap between requests, adapted to the DataManager's observed behaviour
+        self.pacer = AdaptivePacer(
+            min_gap=config.pacing_min_ms / 1000.0,
+            max_gap=config.pacing_max_ms / 1000.0,
+            initial_gap=config.retry_delay if initial_gap is None else initial_gap,
+            backoff_floor=config.retry_delay
+        )
 
     def connect(self) -> bool:
         """Establish Modbus TCP connection."""
@@ -66,19 +203,34 @@ class ModbusConnection:
             self.log.info("Modbus disconnected")
 
     def read_registers(self, address: int, count: int, unit_id: int) -> Optional[List[int]]:
-        """Read holding registers with thread-safe access."""
+        """
+        Read holding registers with thread-safe access.
+
+        Requests are spaced by the adaptive pacer; failed attempts make it
+        back off before the retry instead of sleeping a fixed delay.
+
+        The connection stays up across unit IDs. Responses are validated
+        instead: transaction ID, unit ID and register count must match the
+        request. Late frames are drained from the socket before a retry and
+        after every unit ID change.
+        """
         with self.lock:
-            # Reconnect if unit ID changed (Fronius DataManager has buffering issues)
-            if self.last_unit_id is not None and self.last_unit_id != unit_id:
+            unit_switch = self.last_unit_id is not None and self.last_unit_id != unit_id
+            if unit_switch and self.config.unit_switch_reconnect:
+                # Legacy workaround: fresh connection for every unit ID change
                 if self.client and self.connected:
                     self.client.close()
                     self.connected = False
-                    time.sleep(0.1)  # Brief pause before reconnect
 
+            self.last_latency = None
             for attempt in range(self.config.retry_attempts):
+                self.last_attempts = attempt + 1
+                self.pacer.wait()
                 try:
                     # Reconnect if needed
                     if not self.connected or not self.client.is_socket_open():
+                        if self.client is not None:
+                            self.reconnects += 1
                         self.client = ModbusTcpClient(
                             host=self.config.host,
                             port=self.config.port,
@@ -86,83 +238,179 @@ class ModbusConnection:
                         )
                         self.connected = self.client.connect()
                         if not self.connected:
-                            time.sleep(0.1)
+                            self.pacer.record_failure(timeout=True)
                             continue
+                    elif unit_switch or attempt:
+                        self._drain()
 
+                    started = time.monotonic()
                     result = self.client.read_holding_registers(
                         address=address - 1,  # pymodbus is 0-indexed
                         count=count,
                         slave=unit_id
                     )
 
-                    if not result.isError():
-                        self.successful_reads += 1
-                        self.last_unit_id = unit_id
-                        return result.registers
-                    else:
-                        if attempt < self.config.retry_attempts - 1:
-                            time.sleep(self.config.retry_delay)
+                    if result.isError():
+                        self.pacer.record_failure()
+                        continue
+                    latency = time.monotonic() - started
+
+                    problem = self._validate_response(result, count, unit_id)
+                    if problem:
+                        self._stale_response(f"unit {unit_id} at {address}: {problem}")
+                        continue
+
+                    regs = result.registers
+                    self.last_latency = latency
+                    self.pacer.record_success(latency)
+                    self.successful_reads += 1
+                    self.last_unit_id = unit_id
+                    self._stale_streak = 0
+                    return regs
 
                 except Exception as e:
                     self.log.debug(f"Unit {unit_id}: read error - {e}")
                     self.connected = False
-                    if attempt < self.config.retry_attempts - 1:
-                        time.sleep(self.config.retry_delay)
+                    self.pacer.record_failure(timeout=True)
 
             self.failed_reads += 1
             return None
 
-    def identify_device(self, unit_id: int) -> Optional[Dict]:
-        """Identify a device by reading SunSpec registers."""
-        regs = self.read_registers(40001, 69, unit_id)
-        if not regs or len(regs) < 69:
-            return None
+    def write_registers(self, address: int, values: List[int], unit_id: int) -> bool:
+        """
+        Write holding registers (function code 16) with thread-safe access.
 
-        # Verify SunSpec header
-        sunspec_id = (regs[0] << 16) | regs[1]
-        if sunspec_id != self.SUNSPEC_ID:
-            return None
+        Paced like reads. A write is only repeated when the request could
+        not be sent; an exception response is final.
 
-        device_info = {
-            'device_id': unit_id,
-            'manufacturer': self.parser.decode_string(regs[4:20]),
-            'model': self.parser.decode_string(regs[20:36]),
-            'version': self.parser.decode_string(regs[44:52]),
-            'serial_number': self.parser.decode_string(regs[52:68]),
-        }
+        Returns:
+            True if the device acknowledged the write
+        """
+        with self.lock:
+            for attempt in range(self.config.retry_attempts):
+                self.pacer.wait()
+                try:
+                    if not self.connected or not self.client.is_socket_open():
+                        if self.client is not None:
+                            self.reconnects += 1
+                        self.client = ModbusTcpClient(
+                            host=self.config.host,
+                            port=self.config.port,
+                            timeout=self.config.timeout
+                        )
+                        self.connected = self.client.connect()
+                        if not self.connected:
+                            self.pacer.record_failure(timeout=True)
+                            continue
+                    else:
+                        self._drain()
+
+                    started = time.monotonic()
+                    result = self.client.write_registers(
+                        address=address - 1,  # pymodbus is 0-indexed
+                        values=values,
+                        slave=unit_id
+                    )
+                    if result.isError():
+                        self.pacer.record_failure()
+                        self.log.debug(f"Unit {unit_id}: write {address}x{len(values)} rejected - {result}")
+                        return False
+                    self.pacer.record_success(time.monotonic() - started)
+                    self.last_unit_id = unit_id
+                    return True
 
-        time.sleep(0.1)
+                except Exception as e:
+                    self.log.debug(f"Unit {unit_id}: write error - {e}")
+                    self.connected = False
+                    self.pacer.record_failure(timeout=True)
+            return False
 
-        # Read model ID
-        model_regs = self.read_registers(40070, 1, unit_id)
-        if model_regs:
-            model_id = model_regs[0]
-            device_info['model_id'] = model_id
-            if model_id in self.INVERTER_MODELS:
-                device_info['device_type'] = 'inverter'
-                device_info['inverter_type'] = self.parser.detect_inverter_type(device_info['model'])
-            elif model_id in self.METER_MODELS:
-                device_info['device_type'] = 'meter'
+    def _validate_response(self, result, count: int, unit_id: int) -> Optional[str]:
+        """Reason the response does not belong to the request, or None."""
+        transaction = getattr(self.client, 'transaction', None)
+        expected_tid = getattr(transaction, 'next_tid', getattr(transaction, 'tid', None))
+        tid = getattr(result, 'transaction_id', None)
+        if expected_tid and tid and tid != expected_tid:
+            return f"transaction {tid}, expected {expected_tid}"
+        response_unit = getattr(result, 'dev_id', getattr(result, 'slave_id', None))
+        if response_unit and response_unit != unit_id:
+            return f"unit {response_unit}"
+        if len(result.registers) != count:
+            return f"{len(result.registers)} registers, expected {count}"
+        return None
+
+    def _drain(self, wait: float = 0.0) -> int:
+        """
+        Discard bytes waiting on the socket (late answers to earlier requests).
 
-        self.log.info(f"Device {unit_id}: {device_info['manufacturer']} {device_info['model']} (SN: {device_info['serial_number']})")
-        return device_info
+        Args:
+            wait: Seconds to keep listening for a frame still in flight
 
-    def check_storage_support(self, unit_id: int) -> bool:
+        Returns:
+            Number of bytes discarded
         """
-        Check if an inverter supports storage (Model 124) by reading
-        the model ID at address 40341 (Int+SF format: model header before 40343).
+        sock = getattr(self.client, 'socket', None)
+        if sock is None:
+            return 0
+        drained = 0
+        try:
+            while select.select([sock], [], [], wait)[0]:
+                data = sock.recv(4096)
+                if not data:
+                    self.connected = False
+                    break
+                drained += len(data)
+        except (OSError, ValueError):
+            self.connected = False
+        if drained:
+            self.drained_frames += 1
+            self.log.debug(f"Modbus: discarded {drained} bytes of late responses")
+        return drained
 
-        Returns True if storage model 124 is found.
+    def _stale_response(self, reason: str):
         """
-        time.sleep(0.1)
-        # Read model header at 40341 (2 registers: ID + Length)
-        model_regs = self.read_registers(40341, 2, unit_id)
-        if model_regs and len(model_regs) >= 2:
-            model_id = model_regs[0]
-            if model_id == self.STORAGE_MODEL:
-                self.log.info(f"Device {unit_id}: Storage support detected (Model 124)")
-                return True
-        return False
+        Handle a response that failed validation (lock held).
+
+        The late answer to this request may still be in flight, so the
+        socket is drained with a short wait. Only repeated failures in a
+        row cost a reconnect.
+        """
+        self.log.debug(f"Modbus: stale response ({reason})")
+        self.stale_responses += 1
+        self.pacer.record_failure(stale=True)
+        self._drain(min(self.config.timeout, self.STALE_DRAIN_WAIT))
+        self._stale_streak += 1
+        if self._stale_streak >= self.STALE_RECONNECT_AFTER:
+            self.log.debug(f"Modbus: {self._stale_streak} stale responses in a row, reconnecting")
+            self._stale_streak = 0
+            self.connected = False
+
+    def report_stale(self):
+        """
+        Handle a response that belongs to an earlier request
+        (detected by the caller, e.g. a wrong model ID).
+
+        Drains late frames and makes the pacer back off; the connection is
+        only dropped after repeated stale responses.
+        """
+        with self.lock:
+            if self.connected:
+                self._stale_response(f"unit {self.last_unit_id}: model ID mismatch")
+            else:
+                self.stale_responses += 1
+                self.pacer.record_failure(stale=True)
+
+    def get_stats(self) -> Dict:
+        """Return read counters and pacing state"""
+        return {
+            'connected': self.connected,
+            'successful_reads': self.successful_reads,
+            'failed_reads': self.failed_reads,
+            'reconnects': self.reconnects,
+            'stale_responses': self.stale_responses,
+            'drained_frames': self.drained_frames,
+            'pacing': self.pacer.get_stats(),
+        }
 
 
 class DevicePoller(threading.Thread):
@@ -174,13 +422,65 @@ class DevicePoller(threading.Thread):
     """
 
     ACTIVE_STATUS_CODES = [4, 5]
-    STORAGE_ADDRESS = 40343  # Model 124 data starts here (Int+SF format)
-    STORAGE_LENGTH = 24      # Model 124 has 24 registers
-    CONTROLS_POLL_INTERVAL = 60  # Read Model 123 every 60 seconds
+    CONNECTION_CLASS = ModbusConnection
+
+    # Scheduler priorities (lower runs first when several devices are due)
+    METER_PRIORITY = 0
+    INVERTER_PRIORITY = 1
+    REVALIDATE_PRIORITY = 2
+
+    # Background identity check of devices started from the cache
+    REVALIDATE_DELAY = 10.0      # Seconds after start (first polls go first)
+    REVALIDATE_RETRY = 60.0      # Retry interval while a device does not answer
+
+    # Model spans (addresses include the 2-register model header)
+    DEVICE_ADDRESS = 40070       # Inverter (101-103) / meter (201-204) model
+    INVERTER_LENGTH = 52         # Header + 50 registers
+    METER_LENGTH = 55            # Header + 53 registers (Int+SF format)
+    CONTROLS_ADDRESS = 40228     # Model 123 Immediate Controls
+    CONTROLS_LENGTH = 26         # Header + 24 registers
+    MPPT_ADDRESS = 40254         # Model 160 Multiple MPPT
+    MPPT_FIXED_LENGTH = 10       # Header, scale factors, global data
+    MPPT_MODULE_LENGTH = 20      # Registers per MPPT module
+    DEFAULT_MPPT_MODULES = 2     # Until the device reports N
+    STORAGE_ADDRESS = 40341      # Model 124 header (data at 40343, Int+SF format)
+    STORAGE_LENGTH = 26          # Header + 24 registers
+    FLOAT_SHIFT = 10             # Float inverter model is 10 registers longer
+
+    # Trailing scale factor registers of the control models. Fronius only
+    # changes these with firmware updates, so they are cached and re-read
+    # every sf_refresh_interval. Live data models (inverter, meter, MPPT)
+    # may change their scale factors at any time and are always read.
+    SF_TAIL_LENGTH = {'controls': 3, 'storage': 8}
+
+    # Percentages that must stay within 0-100 while cached scale factors
+    # are used; anything else drops the cache entry
+    SF_CHECK_FIELDS = {
+        'controls': ('power_limit_pct',),
+        'storage': ('charge_state_pct', 'min_reserve_pct'),
+    }
 
     def __init__(self, modbus_config: ModbusConfig, inverters: List[Dict],
                  meters: List[Dict], poll_delay: float, read_delay_ms: int,
-                 parser: RegisterParser, publish_callback: Callable):
+                 parser: RegisterParser, publish_callback: Callable,
+                 devices_config: DevicesConfig = None,
+                 revalidate: List[Dict] = None, identity_callback: Callable = None,
+                 metrics: PollerMetrics = None, controls_config: ControlsConfig = None,
+                 command_callback: Callable = None):
+        """
+        Args:
+            poll_delay: Poll interval for all devices when no devices_config
+                is given (backward compatibility)
+            devices_config: Per-device-type and per-block poll intervals
+            revalidate: Device infos taken from the cache whose identity
+                should be confirmed in the background
+            identity_callback: Called as (device_info, device_type, changed)
+                after a background identity check
+            metrics: Records read latencies and task timings (None = off)
+            controls_config: Timeout and read-back of control commands
+            command_callback: Called as (command, result dict) after a
+                control command ran, failed or expired
+        """
         super().__init__(daemon=True, name="DevicePoller")
         self.modbus_config = modbus_config
         self.inverters = inverters
@@ -189,39 +489,440 @@ class DevicePoller(threading.Thread):
         self.read_delay = read_delay_ms / 1000.0
         self.parser = parser
         self.publish_callback = publish_callback
+        self.identity_callback = identity_callback
+        self.metrics = metrics
         self.log = get_logger()
         self.running = False
 
-        # Single connection for all devices
-        self.connection = ModbusConnection(modbus_config, parser)
+        # Control writes jump the poll schedule at the next request boundary
+        self.controls_config = controls_config or ControlsConfig()
+        self.command_callback = command_callback
+        self.commands = CommandQueue()
+        self.commands_total = 0
+        self.commands_failed = 0
+        self.commands_expired = 0
+        self.command_latency_max = 0.0
+        self.command_latency_total = 0.0
+        self._wake = threading.Event()
+
+        if devices_config is None:
+            devices_config = DevicesConfig(meter_poll_interval=poll_delay,
+                                           inverter_poll_interval=poll_delay)
+        self.devices_config = devices_config
 
-        # Track last controls read time per inverter
-        self._last_controls_read: Dict[int, float] = {}
+        # Model blocks read less often than their inverter (0 = every poll)
+        self.block_intervals = {
+            'mppt': devices_config.mppt_poll_interval,
+            'controls': devices_config.controls_poll_interval,
+            'storage': devices_config.storage_poll_interval,
+        }
 
-    def _poll_inverter(self, device_info: Dict, max_retries: int = 3) -> bool:
-        """Poll a single inverter with retry on failure."""
+        # Single connection for all devices; read_delay is the starting
+        # request gap, tuned at runtime by the connection's pacer
+        self.connection = self.CONNECTION_CLASS(modbus_config, parser, initial_gap=self.read_delay)
+
+        # Coalesces the model reads of each device into as few requests as possible
+        self.planner = ReadPlanner(modbus_config.max_read_registers, modbus_config.read_gap_max)
+
+        # Last read time per (unit_id, block)
+        self._last_block_read: Dict[tuple, float] = {}
+
+        # Model ID -> (address, count) per unit, built from the discovered chain
+        self._model_indexes: Dict[int, tuple] = {}
+
+        # (unit_id, block) -> (trailing scale factor registers, read time)
+        self._sf_cache: Dict[tuple, tuple] = {}
+        self.sf_refresh = devices_config.sf_refresh_interval
+        self.sf_cache_hits = 0
+        self.sf_refreshes = 0
+
+        # Last parsed raw registers per (unit_id, block); byte-identical
+        # blocks are not parsed or published again
+        self.skip_unchanged = devices_config.skip_unchanged
+        self.unchanged_refresh = devices_config.unchanged_refresh
+        self._last_raw: Dict[tuple, List[int]] = {}
+        self._unchanged_polls: Dict[tuple, int] = {}
+        self.unchanged_hits = 0
+        self.unchanged_misses = 0
+
+        # Night backoff: inverters reporting a sleep status or not answering
+        # are only probed (sleep_probe_interval, night_probe_interval between
+        # sunset and sunrise) until their state changes
+        self.sleep_backoff = devices_config.sleep_backoff
+        self.sleep_status_codes = set(devices_config.sleep_status_codes)
+        self.daylight = None
+        if devices_config.latitude is not None and devices_config.longitude is not None:
+            self.daylight = Daylight(devices_config.latitude, devices_config.longitude,
+                                     devices_config.sun_margin)
+        self._asleep: Dict[int, float] = {}         # unit_id -> monotonic time it went to sleep
+        self._poll_failures: Dict[int, int] = {}    # Consecutive unanswered polls
+        self._last_status: Dict[int, int] = {}      # Last parsed St per inverter
+        self.sleep_transitions = 0
+
+        # One task per device; meters first when both are due. Inverters are
+        # staggered across their interval instead of all coming due at once.
+        self.scheduler = DeadlineScheduler()
+        if metrics is not None:
+            self.scheduler.observer = metrics.observe_task
+        self._meter_tasks: List[PollTask] = []
+        self._inverter_tasks: Dict[int, PollTask] = {}
+        for device_info in meters:
+            self._meter_tasks.append(self.scheduler.add(
+                f"meter {device_info['device_id']}", devices_config.meter_poll_interval,
+                lambda d=device_info: self._poll_meter(d), priority=self.METER_PRIORITY))
+        for index, device_info in enumerate(inverters):
+            interval = devices_config.inverter_poll_interval
+            self._inverter_tasks[device_info['device_id']] = self.scheduler.add(
+                f"inverter {device_info['device_id']}", interval,
+                lambda d=device_info: self._poll_inverter(d),
+                priority=self.INVERTER_PRIORITY,
+                start_delay=index * interval / len(inverters))
+
+        # Identity checks for cached devices run once, after the first polls
+        # and only when no poll is due
+        for index, device_info in enumerate(revalidate or []):
+            device_type = 'inverter' if any(device_info is d for d in inverters) else 'meter'
+            task = self.scheduler.add(f"revalidate {device_type} {device_info['device_id']}",
+                                      self.REVALIDATE_RETRY, None,
+                                      priority=self.REVALIDATE_PRIORITY,
+                                      start_delay=self.REVALIDATE_DELAY + index)
+            task.callback = lambda d=device_info, t=device_type, k=task: self._revalidate(d, t, k)
+
+    def _block_due(self, unit_id: int, block: str, now: float) -> bool:
+        """Check whether a model block's own interval has elapsed."""
+        last = self._last_block_read.get((unit_id, block))
+        return last is None or now - last >= self.block_intervals.get(block, 0)
+
+    def _model_index(self, device_info: Dict) -> Optional[Dict[int, tuple]]:
+        """
+        Model ID -> (address, count including header) from the model chain.
+
+        Returns:
+            Index dict, or None for devices without a discovered chain
+            (the fixed Fronius addresses are used then)
+        """
+        models = device_info.get('models')
+        if not models:
+            return None
+        unit_id = device_info['device_id']
+        cached = self._model_indexes.get(unit_id)
+        if cached is None or cached[0] is not models:
+            index = {}
+            for model_id, address, length in models:
+                index.setdefault(model_id, (address, length + 2))
+            cached = (models, index)
+            self._model_indexes[unit_id] = cached
+        return cached[1]
+
+    def _model_location(self, device_info: Dict, model_id: int,
+                        address: int, count: Optional[int]) -> Optional[tuple]:
+        """
+        Address and register count of a model.
+
+        Args:
+            model_id: SunSpec model ID
+            address: Fixed Fronius address, used without a model index
+            count: Registers the parser needs (None = whole model); capped
+                at the model length from the index
+
+        Returns:
+            (address, count), or None if the model index shows the device
+            does not implement the model. count is None only without an
+            index when the whole model was requested.
+        """
+        index = self._model_index(device_info)
+        if index is None:
+            # Models behind the float inverter model move with it
+            if address > self.DEVICE_ADDRESS and device_info.get('register_format') == 'float':
+                address += self.FLOAT_SHIFT
+            return address, count
+        found = index.get(model_id)
+        if found is None:
+            return None
+        return found[0], found[1] if count is None else min(count, found[1])
+
+    def _device_length(self, device_type: str, model_id: int, default: int) -> int:
+        """Registers to read for an inverter/meter model, header included."""
+        length = self.parser.measurement_length(device_type, model_id)
+        return default if length is None else length + 2
+
+    def _inverter_spans(self, device_info: Dict, now: float,
+                        probe: bool = False) -> List[ModelSpan]:
+        """
+        Model spans an inverter poll needs this cycle (blocks that are due).
+
+        Args:
+            probe: Only the inverter model (heartbeat of a sleeping inverter)
+        """
         unit_id = device_info['device_id']
+        model_id = device_info.get('model_id')
+        spans = []
+        location = self._model_location(device_info, model_id, self.DEVICE_ADDRESS,
+                                        self._device_length('inverter', model_id, self.INVERTER_LENGTH))
+        if location:
+            spans.append(ModelSpan('inverter', location[0], location[1], model_id=model_id))
+        if probe:
+            return spans
+
+        if self._block_due(unit_id, 'mppt', now):
+            location = self._model_location(device_info, 160, self.MPPT_ADDRESS, None)
+            if location:
+                # Module count as last reported by the device, else from the model length
+                modules = device_info.get('mppt_modules')
+                if modules is None and location[1] is not None:
+                    modules = (location[1] - self.MPPT_FIXED_LENGTH) // self.MPPT_MODULE_LENGTH
+                if modules is None:
+                    modules = self.DEFAULT_MPPT_MODULES
+                spans.append(ModelSpan('mppt', location[0], self.MPPT_FIXED_LENGTH, model_id=160,
+                                       repeat_size=self.MPPT_MODULE_LENGTH,
+                                       repeat_count=max(0, modules)))
+        if self._block_due(unit_id, 'controls', now):
+            location = self._model_location(device_info, 123, self.CONTROLS_ADDRESS, self.CONTROLS_LENGTH)
+            if location:
+                spans.append(ModelSpan('controls', location[0], location[1], model_id=123,
+                                       cached_tail=self._cached_scale_factors(
+                                           unit_id, 'controls', location[1], self.CONTROLS_LENGTH, now)))
+        if device_info.get('has_storage') and self._block_due(unit_id, 'storage', now):
+            location = self._model_location(device_info, 124, self.STORAGE_ADDRESS, self.STORAGE_LENGTH)
+            if location:
+                spans.append(ModelSpan('storage', location[0], location[1], model_id=124,
+                                       cached_tail=self._cached_scale_factors(
+                                           unit_id, 'storage', location[1], self.STORAGE_LENGTH, now)))
+        return spans
+
+    def _cached_scale_factors(self, unit_id: int, block: str, count: Optional[int],
+                              full_length: int, now: float) -> tuple:
+        """
+        Trailing scale factor registers of a block, if cached and fresh.
+
+        Args:
+            count: Registers the span covers; the cache is only used when
+                the whole model is read (full_length)
+
+        Returns:
+            Cached registers, or () when the scale factors must be read
+        """
+        if not self.sf_refresh or count != full_length:
+            return ()
+        cached = self._sf_cache.get((unit_id, block))
+        if cached is None or now - cached[1] >= self.sf_refresh:
+            return ()
+        return cached[0]
+
+    def _update_scale_factors(self, unit_id: int, span: ModelSpan, regs: List[int],
+                              data: Dict, now: float) -> bool:
+        """
+        Cache the scale factors of a block read in full, or check the
+        values decoded with cached ones.
+
+        Args:
+            span: The span as planned (cached_tail set if the cache was used)
+            regs: Block registers, model header included
+            data: Values decoded from regs
+
+        Returns:
+            False if the values are implausible and must not be published
+        """
+        key = (unit_id, span.name)
+        if not span.cached_tail:
+            if self.sf_refresh:
+                tail = tuple(regs[-self.SF_TAIL_LENGTH[span.name]:])
+                if key in self._sf_cache and self._sf_cache[key][0] != tail:
+                    self.log.info(f"Unit {unit_id}: {span.name} scale factors changed")
+                self._sf_cache[key] = (tail, now)
+                self.sf_refreshes += 1
+            return True
+
+        self.sf_cache_hits += 1
+        for field in self.SF_CHECK_FIELDS.get(span.name, ()):
+            value = data.get(field)
+            if value is not None and not 0 <= value <= 100:
+                self.log.debug(f"Unit {unit_id}: implausible {span.name} {field}={value}, "
+                               f"re-reading scale factors")
+                self._sf_cache.pop(key, None)
+                return False
+        return True
 
-        # Read main registers (40072-40120) with retry
+    def _skip_unchanged(self, unit_id: int, group: str, blocks: Dict[str, List[int]]) -> bool:
+        """
+        Compare raw blocks with the ones last parsed and published.
+
+        The last raw register list is kept per block: comparing lists is
+        a single C-level loop, as cheap as hashing them and without
+        collisions.
+
+        Args:
+            group: Name the forced refresh counter is kept under
+            blocks: Block name -> registers read this poll
+
+        Returns:
+            True if every block is identical to its last parsed version
+            and no forced refresh is due (parsing and publishing can be
+            skipped)
+        """
+        if not self.skip_unchanged or not blocks:
+            return False
+        key = (unit_id, group)
+        polls = self._unchanged_polls.get(key, 0) + 1
+        if (all(self._last_raw.get((unit_id, name)) == regs for name, regs in blocks.items())
+                and not (self.unchanged_refresh and polls >= self.unchanged_refresh)):
+            self._unchanged_polls[key] = polls
+            self.unchanged_hits += 1
+            return True
+
+        self._unchanged_polls[key] = 0
+        for name, regs in blocks.items():
+            self._last_raw[(unit_id, name)] = regs
+        self.unchanged_misses += 1
+        return False
+
+    def _read_request(self, unit_id: int, request: ReadRequest, spans: List[ModelSpan],
+                      max_retries: int = 3) -> Optional[List[int]]:
+        """
+        Execute one planned read with retry on failure.
+
+        Model IDs of the spans starting inside the request are verified;
+        a mismatch means the DataManager returned a stale buffer, which is
+        reported to the connection before retrying. Spans that still mismatch
+        after the last attempt are dropped from the result by the caller.
+
+        Retries are not delayed here: failed and stale reads make the
+        connection's pacer back off before the next request.
+        """
         regs = None
         for attempt in range(max_retries):
-            regs = self.connection.read_registers(40072, 49, unit_id)
-
-            if regs and len(regs) >= 49:
-                break  # Success
+            if self.commands:
+                self._run_commands()
+            regs = self.connection.read_registers(request.address, request.count, unit_id)
+            if regs and len(regs) >= request.count:
+                mismatch = self._model_mismatch(request, regs, spans)
+                if self.metrics is not None:
+                    self._observe_read(unit_id, request, 'stale' if mismatch else 'ok', attempt)
+                if not mismatch:
+                    return regs
+                if attempt < max_retries - 1:
+                    self.log.debug(f"Unit {unit_id}: model mismatch {mismatch} at {request.address}, "
+                                   f"retry {attempt + 1}/{max_retries}")
+                    self.connection.report_stale()
+                    continue
+                self.log.debug(f"Unit {unit_id}: model mismatch {mismatch} at {request.address} "
+                               f"after {max_retries} attempts")
+                return regs
 
+            if self.metrics is not None:
+                self._observe_read(unit_id, request, 'failed', attempt)
             if attempt < max_retries - 1:
-                self.log.debug(f"Inverter {unit_id}: main register read failed, retry {attempt + 1}/{max_retries}")
-                time.sleep(0.5)
+                self.log.debug(f"Unit {unit_id}: read {request.address}x{request.count} failed, "
+                               f"retry {attempt + 1}/{max_retries}")
             else:
-                self.log.debug(f"Inverter {unit_id}: main register read failed after {max_retries} attempts")
-                # Force reconnect on next read to clear any buffer issues
-                self.connection.connected = False
-                return False
+                self.log.debug(f"Unit {unit_id}: read {request.address}x{request.count} failed "
+                               f"after {max_retries} attempts")
+        return None
+
+    def _observe_read(self, unit_id: int, request: ReadRequest, result: str, attempt: int):
+        """Record a read_registers call; its own retries plus the poller's retry count."""
+        retries = self.connection.last_attempts - 1 + (1 if attempt else 0)
+        self.metrics.observe_read(unit_id, '+'.join(request.spans), self.connection.last_latency,
+                                  result, retries)
+
+    def _execute_plan(self, unit_id: int, spans: List[ModelSpan],
+                      max_retries: int = 3) -> Dict[str, List[int]]:
+        """
+        Read all spans using the fewest Modbus requests.
+
+        Coalesced requests that the device rejects are retried as one
+        request per span.
+
+        Returns:
+            Dict of span name -> registers, for spans that were read
+            completely and passed the model ID check
+        """
+        image = RegisterImage()
+        requests = self.planner.plan(spans)
+        for request in requests:
+            regs = self._read_request(unit_id, request, spans, max_retries)
+            if regs is None and len(request.spans) > 1:
+                self.log.debug(f"Unit {unit_id}: coalesced read {request.address}x{request.count} "
+                               f"failed, reading {request.spans} separately")
+                members = [s for s in spans if s.name in request.spans]
+                for fallback in self.planner.plan_unmerged(members):
+                    regs = self._read_request(unit_id, fallback, spans, max_retries)
+                    if regs is not None:
+                        image.add(fallback.address, regs)
+                continue
+            if regs is not None:
+                image.add(request.address, regs)
+
+        return self._collect_blocks(image, spans)
+
+    @staticmethod
+    def _model_mismatch(request: ReadRequest, regs: List[int],
+                        spans: List[ModelSpan]) -> List[tuple]:
+        """(span name, model ID read) for spans in the request with the wrong model ID."""
+        return [
+            (span.name, regs[span.address - request.address])
+            for span in spans
+            if span.model_id is not None
+            and request.address <= span.address < request.end
+            and regs[span.address - request.address] != span.model_id
+        ]
+
+    @staticmethod
+    def _collect_blocks(image: RegisterImage, spans: List[ModelSpan]) -> Dict[str, List[int]]:
+        """
+        Registers per span, for spans read completely with the right model ID.
 
-        # Parse data
+        A cached tail fills in the registers the plan left out; registers
+        that were read through anyway take precedence.
+        """
+        blocks = {}
+        for span in spans:
+            regs = image.get(span.address, span.count)
+            if regs is None and span.cached_tail:
+                regs = image.get(span.address, span.count - len(span.cached_tail))
+                if regs is not None:
+                    regs.extend(span.cached_tail)
+            if regs is None:
+                continue
+            if span.model_id is not None and regs[0] != span.model_id:
+                continue
+            blocks[span.name] = regs
+        return blocks
+
+    def _poll_inverter(self, device_info: Dict, max_retries: int = 3) -> bool:
+        """Poll a single inverter: all needed models in one read plan."""
+        unit_id = device_info['device_id']
+
+        # MPPT, controls and storage blocks are only included when their own
+        # interval has elapsed (controls don't change often). A sleeping
+        # inverter is only probed: its main model, without poller retries.
+        now = time.monotonic()
+        probe = unit_id in self._asleep
+        if probe:
+            max_retries = 1
+        spans = {span.name: span for span in self._inverter_spans(device_info, now, probe)}
+        blocks = self._execute_plan(unit_id, list(spans.values()), max_retries)
+
+        regs = blocks.get('inverter')
+        if not regs:
+            self.log.debug(f"Inverter {unit_id}: main register read failed")
+            self._inverter_silent(unit_id)
+            return False
+
+        # Nothing changed since the last publish (e.g. at night): only keep
+        # the block timers and the scale factor cache going
+        if self._skip_unchanged(unit_id, 'inverter', blocks):
+            self._inverter_state(unit_id, self._last_status.get(unit_id))
+            for name in blocks:
+                if name != 'inverter':
+                    self._last_block_read[(unit_id, name)] = now
+                if name in self.SF_TAIL_LENGTH:
+                    self._update_scale_factors(unit_id, spans[name], blocks[name], {}, now)
+            return True
+
+        # Parse data (registers after the model header, from 40072)
         model_id = device_info.get('model_id', 103)
-        data = self.parser.parse_inverter_measurements(regs, model_id)
+        data = self.parser.parse_inverter_measurements(regs[2:], model_id)
 
         if not data:
             return False
@@ -235,6 +936,8 @@ class DevicePoller(threading.Thread):
         # Parse status
         data['status'] = self.parser.parse_status(data.get('status_code', 0))
         data['is_active'] = data.get('status_code', 0) in self.ACTIVE_STATUS_CODES
+        self._last_status[unit_id] = data.get('status_code')
+        self._inverter_state(unit_id, data.get('status_code'))
 
         # Parse events
         inverter_type = device_info.get('inverter_type', 'all')
@@ -246,41 +949,36 @@ class DevicePoller(threading.Thread):
             inverter_type
         )
 
-        # Read MPPT Model 160 in single optimized query
-        # Force connection reset to clear DataManager buffer after main registers
-        self.connection.connected = False
-        time.sleep(0.3)
-        mppt_data = self._read_mppt_data(unit_id)
-        if mppt_data and mppt_data.get('modules'):
-            data['mppt'] = mppt_data
-            for i, mod in enumerate(mppt_data['modules']):
-                self.log.info(f"Inverter {unit_id} MPPT{i+1}: "
-                              f"V={mod.get('dc_voltage', 0):.1f}V, "
-                              f"I={mod.get('dc_current', 0):.2f}A, "
-                              f"P={mod.get('dc_power', 0):.0f}W")
-
-        # Read Model 123 - Immediate Controls (power limit, PF, connection status)
-        # Only read every CONTROLS_POLL_INTERVAL seconds (controls don't change often)
-        now = time.time()
-        last_read = self._last_controls_read.get(unit_id, 0)
-        if now - last_read >= self.CONTROLS_POLL_INTERVAL:
-            controls_data = self._read_immediate_controls(unit_id)
-            if controls_data:
+        # MPPT Model 160
+        if 'mppt' in blocks:
+            self._last_block_read[(unit_id, 'mppt')] = now
+            mppt_data = self.parser.parse_mppt_measurements(blocks['mppt'])
+            self._update_mppt_modules(device_info, mppt_data.get('num_modules'))
+            if mppt_data.get('modules'):
+                data['mppt'] = mppt_data
+                for mod in mppt_data['modules']:
+                    self.log.info(f"Inverter {unit_id} MPPT{mod['id']}: "
+                                  f"V={mod.get('dc_voltage') or 0:.1f}V, "
+                                  f"I={mod.get('dc_current') or 0:.2f}A, "
+                                  f"P={mod.get('dc_power') or 0:.0f}W")
+
+        if 'controls' in blocks:
+            controls_data = self._parse_immediate_controls(blocks['controls'])
+            if self._update_scale_factors(unit_id, spans['controls'], blocks['controls'],
+                                          controls_data, now):
                 data['controls'] = controls_data
-                self._last_controls_read[unit_id] = now
-                self.log.debug(f"Inverter {unit_id}: Controls - "
-                              f"Conn={controls_data.get('connected')}, "
-                              f"WMaxLim={controls_data.get('power_limit_pct')}%, "
-                              f"PF={controls_data.get('power_factor')}")
-
-        # Try to read storage registers if device has storage support
-        if device_info.get('has_storage'):
-            time.sleep(self.read_delay)
-            storage_regs = self.connection.read_registers(
-                self.STORAGE_ADDRESS, self.STORAGE_LENGTH, unit_id
-            )
-            if storage_regs and len(storage_regs) >= self.STORAGE_LENGTH:
-                storage_data = self.parser.parse_storage_measurements(storage_regs)
+                self._last_block_read[(unit_id, 'controls')] = now
+            self.log.debug(f"Inverter {unit_id}: Controls - "
+                          f"Conn={controls_data.get('connected')}, "
+                          f"WMaxLim={controls_data.get('power_limit_pct')}%, "
+                          f"PF={controls_data.get('power_factor')}")
+
+        # Storage Model 124 (registers after the model header, from 40343)
+        if 'storage' in blocks:
+            storage_data = self.parser.parse_storage_measurements(blocks['storage'][2:])
+            if self._update_scale_factors(unit_id, spans['storage'], blocks['storage'],
+                                          storage_data, now):
+                self._last_block_read[(unit_id, 'storage')] = now
                 if storage_data:
                     data['storage'] = storage_data
                     self.publish_callback(unit_id, 'storage', storage_data)
@@ -290,156 +988,118 @@ class DevicePoller(threading.Thread):
         self.log.debug(f"Inverter {unit_id}: published (W={data.get('ac_power', 0)})")
         return True
 
-    def _read_mppt_data(self, unit_id: int, max_retries: int = 3) -> Optional[Dict]:
-        """
-        Read MPPT Model 160 data in a single query with retry on failure.
-
-        Reads 40254-40301 (48 registers) as per SunSpec Model 160 spec:
-        - Header (40254-40255): 2 registers
-        - Scale factors (40256-40259): 4 registers
-        - Global data (40260-40263): 4 registers
-        - Module 1 (40264-40283): 20 registers
-        - Module 2 (40284-40301): 18 registers (partial, up to Tmp)
-
-        Total: 48 registers - within Fronius limit of ~50-55
-        """
-        for attempt in range(max_retries):
-            regs = self.connection.read_registers(40254, 48, unit_id)
-            if not regs or len(regs) < 48:
-                if attempt < max_retries - 1:
-                    self.log.debug(f"Inverter {unit_id}: MPPT read failed, retry {attempt + 1}/{max_retries}")
-                    time.sleep(1.0)  # Wait 1s before retry
-                    continue
-                self.log.debug(f"Inverter {unit_id}: MPPT read failed after {max_retries} attempts")
-                return None
-
-            # Verify model header (offset 0-1)
-            model_id = regs[0]
-            if model_id != 160:
-                if attempt < max_retries - 1:
-                    self.log.debug(f"Inverter {unit_id}: MPPT model mismatch (got {model_id}), retry {attempt + 1}/{max_retries}")
-                    time.sleep(1.0)  # Wait 1s before retry
-                    continue
-                self.log.debug(f"Inverter {unit_id}: MPPT model mismatch (got {model_id}, expected 160) after {max_retries} attempts")
-                return None
-
-            # Success - break out of retry loop
-            break
-
-        # Extract scale factors (offset 2-5, i.e., 40256-40259)
-        sf_dca = regs[2] if regs[2] < 32768 else regs[2] - 65536
-        sf_dcv = regs[3] if regs[3] < 32768 else regs[3] - 65536
-        sf_dcw = regs[4] if regs[4] < 32768 else regs[4] - 65536
-        sf_dcwh = regs[5] if regs[5] < 32768 else regs[5] - 65536
-
-        # Extract global data (offset 6-9, i.e., 40260-40263)
-        # Evt at offset 6-7, N at offset 8, TmsPer at offset 9
-        num_modules = regs[8]
-        self.log.debug(f"Inverter {unit_id}: MPPT has {num_modules} module(s)")
-
-        modules = []
-
-        # Module 1 data starts at offset 10 (40264 - 40254 = 10)
-        m1_regs = regs[10:30]  # 20 registers
-        if len(m1_regs) >= 17:
-            module1 = self._parse_mppt_module_optimized(m1_regs, 1, sf_dca, sf_dcv, sf_dcw, sf_dcwh)
-            if module1:
-                modules.append(module1)
-
-        # Module 2 data starts at offset 30 (40284 - 40254 = 30)
-        if num_modules >= 2:
-            m2_regs = regs[30:48]  # 18 registers (up to Tmp at offset 16)
-            if len(m2_regs) >= 17:
-                module2 = self._parse_mppt_module_optimized(m2_regs, 2, sf_dca, sf_dcv, sf_dcw, sf_dcwh)
-                if module2:
-                    modules.append(module2)
-
-        if not modules:
-            return None
-
+    def _probe_interval(self) -> float:
+        """Seconds between probes of a sleeping inverter (longer between sunset and sunrise)"""
+        cfg = self.devices_config
+        if self.daylight is None:
+            return cfg.sleep_probe_interval
+        until_day = self.daylight.until_day(time.time())
+        if until_day == 0.0:
+            return cfg.sleep_probe_interval
+        # Night: probe slowly, but be back at full probe rate when daylight starts
+        interval = cfg.night_probe_interval if until_day is None else min(
+            cfg.night_probe_interval, until_day)
+        return max(cfg.sleep_probe_interval, interval)
+
+    def _inverter_state(self, unit_id: int, status_code: Optional[int]):
+        """Follow the operating state (St) of an inverter that answered."""
+        if not self.sleep_backoff:
+            return
+        self._poll_failures[unit_id] = 0
+        if status_code in self.sleep_status_codes:
+            self._set_asleep(unit_id, f"status {status_code}")
+        else:
+            self._set_awake(unit_id, f"status {status_code}")
+
+    def _inverter_silent(self, unit_id: int):
+        """Count an unanswered poll; a silent inverter is treated as asleep."""
+        if not self.sleep_backoff:
+            return
+        failures = self._poll_failures.get(unit_id, 0) + 1
+        self._poll_failures[unit_id] = failures
+        # Between sunset and sunrise one unanswered poll is enough
+        limit = self.devices_config.sleep_after_failures
+        if self.daylight is not None and not self.daylight.is_day(time.time()):
+            limit = 1
+        if failures >= limit:
+            self._set_asleep(unit_id, f"no answer to {failures} poll(s)")
+
+    def _set_asleep(self, unit_id: int, reason: str):
+        """Switch an inverter to probing (also refreshes the probe interval)."""
+        interval = self._probe_interval()
+        task = self._inverter_tasks.get(unit_id)
+        if task is not None:
+            task.interval = interval
+        if unit_id in self._asleep:
+            return
+        self._asleep[unit_id] = time.monotonic()
+        self.sleep_transitions += 1
+        self.log.info(f"Inverter {unit_id}: asleep ({reason}), probing every {interval:.0f}s")
+        self._update_meter_intervals()
+
+    def _set_awake(self, unit_id: int, reason: str):
+        """Return an inverter to its full poll interval."""
+        since = self._asleep.pop(unit_id, None)
+        if since is None:
+            return
+        task = self._inverter_tasks.get(unit_id)
+        if task is not None:
+            task.interval = self.devices_config.inverter_poll_interval
+        self.log.info(f"Inverter {unit_id}: awake ({reason}) after "
+                      f"{time.monotonic() - since:.0f}s, polling at full rate")
+        self._update_meter_intervals()
+
+    def _update_meter_intervals(self):
+        """Give the meters a faster interval while every inverter sleeps."""
+        cfg = self.devices_config
+        interval = cfg.meter_poll_interval
+        if (cfg.meter_interval_asleep > 0 and self.inverters
+                and all(info['device_id'] in self._asleep for info in self.inverters)):
+            interval = min(interval, cfg.meter_interval_asleep)
+        for task in self._meter_tasks:
+            if task.interval != interval:
+                task.interval = interval
+                self.log.info(f"Scheduler: {task.name} every {interval}s")
+
+    def get_backoff_stats(self) -> Dict:
+        """Return the sleeping inverters and state transitions"""
+        now = time.monotonic()
         return {
-            'num_modules': num_modules,
-            'modules': modules
+            'enabled': self.sleep_backoff,
+            'asleep': {unit_id: round(now - since) for unit_id, since in list(self._asleep.items())},
+            'transitions': self.sleep_transitions,
+            'probe_interval': self._probe_interval() if self.sleep_backoff else None,
+            'daylight': self.daylight.is_day(time.time()) if self.daylight is not None else None,
         }
 
-    def _parse_mppt_module_optimized(self, regs: List[int], module_id: int,
-                                       sf_dca: int, sf_dcv: int, sf_dcw: int, sf_dcwh: int) -> Optional[Dict]:
-        """
-        Parse a single MPPT module's registers (optimized version without DCSt).
-
-        Offsets within module block:
-        0: ID, 1-8: IDStr, 9: DCA, 10: DCV, 11: DCW, 12-13: DCWH, 14-15: Tms, 16: Tmp
-        """
-        if len(regs) < 17:
-            return None
-
-        dca_raw = regs[9]
-        dcv_raw = regs[10]
-        dcw_raw = regs[11]
-        dcwh_raw = (regs[12] << 16) | regs[13]
-        tmp_raw = regs[16] if regs[16] < 32768 else regs[16] - 65536
-
-        # Check for not-implemented values (0xFFFF for uint16)
-        if dcv_raw == 0xFFFF:
-            return None
-
-        # Apply scale factors
-        dc_current = dca_raw * (10 ** sf_dca) if dca_raw != 0xFFFF else None
-        dc_voltage = dcv_raw * (10 ** sf_dcv) if dcv_raw != 0xFFFF else None
-        dc_power = dcw_raw * (10 ** sf_dcw) if dcw_raw != 0xFFFF else None
-        dc_energy = dcwh_raw * (10 ** sf_dcwh) if dcwh_raw != 0xFFFFFFFF else None
-        temperature = tmp_raw if tmp_raw != -32768 else None
-
-        return {
-            'id': module_id,
-            'dc_current': dc_current,
-            'dc_voltage': dc_voltage,
-            'dc_power': dc_power,
-            'dc_energy': dc_energy,
-            'temperature': temperature
-        }
+    def _update_mppt_modules(self, device_info: Dict, num_modules: Optional[int]):
+        """Resize the Model 160 span when the device reports a different module count."""
+        if num_modules is None:
+            return
+        # Model 160 must fit the 16-bit address space; ignore garbage counts
+        if num_modules > 100:
+            return
+        current = device_info.get('mppt_modules', self.DEFAULT_MPPT_MODULES)
+        if num_modules != current:
+            self.log.info(f"Inverter {device_info['device_id']}: MPPT reports {num_modules} module(s), "
+                          f"adjusting read plan (was {current})")
+            device_info['mppt_modules'] = num_modules
 
-    def _read_immediate_controls(self, unit_id: int, max_retries: int = 3) -> Optional[Dict]:
+    def _parse_immediate_controls(self, regs: List[int]) -> Dict:
         """
-        Read Model 123 - Immediate Controls with retry on failure.
+        Parse Model 123 - Immediate Controls.
 
-        Reads inverter control settings:
+        Inverter control settings:
         - Connection status
         - Power limit percentage
         - Power factor settings
         - Reactive power settings
 
+        Args:
+            regs: 26 registers starting at 40228 (model header included)
+
         Returns dict with control values, ready for future write operations.
         """
-        # Force connection reset before Model 123 to clear DataManager's buffer
-        # This prevents getting stale Model 160 data
-        self.connection.connected = False
-        time.sleep(0.5)  # Brief pause before reconnect
-
-        for attempt in range(max_retries):
-            regs = self.connection.read_registers(40228, 26, unit_id)
-
-            if not regs or len(regs) < 26:
-                if attempt < max_retries - 1:
-                    self.log.debug(f"Inverter {unit_id}: Model 123 read failed, retry {attempt + 1}/{max_retries}")
-                    time.sleep(1.0)  # Wait 1s before retry
-                    continue
-                self.log.debug(f"Inverter {unit_id}: Model 123 read failed after {max_retries} attempts")
-                return None
-
-            # Verify model ID
-            model_id = regs[0]
-            if model_id != 123:
-                if attempt < max_retries - 1:
-                    self.log.debug(f"Inverter {unit_id}: Model 123 mismatch (got {model_id}), retry {attempt + 1}/{max_retries}")
-                    time.sleep(1.0)  # Wait 1s before retry
-                    continue
-                self.log.debug(f"Inverter {unit_id}: Model 123 mismatch (got {model_id}) after {max_retries} attempts")
-                return None
-
-            # Success - break out of retry loop
-            break
-
         # Extract scale factors (at end of block)
         sf_wmax = regs[23] if regs[23] < 32768 else regs[23] - 65536  # WMaxLimPct_SF
         sf_pf = regs[24] if regs[24] < 32768 else regs[24] - 65536    # OutPFSet_SF
@@ -515,30 +1175,193 @@ class DevicePoller(threading.Thread):
             '_sf_var': sf_var
         }
 
-    # Future write methods placeholder:
-    # def write_power_limit(self, unit_id: int, limit_pct: float, ...) -> bool:
-    # def write_power_factor(self, unit_id: int, pf: float, ...) -> bool:
-    # def write_connection(self, unit_id: int, connect: bool, ...) -> bool:
+    def submit_command(self, command: ControlCommand):
+        """Queue a control command (any thread); it runs before the next request."""
+        self.commands.put(command)
+        self._wake.set()
+
+    def _run_commands(self):
+        """Execute all queued control commands (poller thread)."""
+        while True:
+            command = self.commands.pop()
+            if command is None:
+                return
+            result = self._execute_command(command)
+            latency = time.monotonic() - command.received
+            result['latency_ms'] = round(latency * 1000, 1)
+            self.commands_total += 1
+            if result['status'] == 'expired':
+                self.commands_expired += 1
+            elif result['status'] != 'ok':
+                self.commands_failed += 1
+            else:
+                self.command_latency_total += latency
+                self.command_latency_max = max(self.command_latency_max, latency)
+            level = self.log.info if result['status'] == 'ok' else self.log.warning
+            value = 'off' if command.value is None else f"{command.value:g}"
+            level(f"Inverter {command.unit_id}: {command.name} = {value} "
+                  f"{result['status']}" + (f" ({result['error']})" if result.get('error') else "")
+                  + f" after {result['latency_ms']}ms")
+            if self.metrics is not None:
+                self.metrics.observe_command(command.unit_id, command.name, latency,
+                                             result['status'])
+            if self.command_callback:
+                self.command_callback(command, result)
+
+    def _execute_command(self, command: ControlCommand) -> Dict:
+        """
+        Write a setpoint and read it back.
+
+        The value is scaled with the block's cached scale factors (read
+        first if not cached). An enable register (WMaxLim_Ena,
+        OutPFSet_Ena) is written after the value; a command without value
+        only clears it.
+
+        Returns:
+            Result dict: status ('ok', 'failed', 'unconfirmed', 'expired',
+            'rejected'), value, error
+        """
+        unit_id = command.unit_id
+        result = {'name': command.name, 'value': command.value, 'status': 'failed'}
+        if time.monotonic() - command.received > self.controls_config.command_timeout:
+            return dict(result, status='expired', error='not started in time')
+
+        point = CONTROL_POINTS[command.name]
+        device_info = next((d for d in self.inverters if d['device_id'] == unit_id), None)
+        if device_info is None:
+            return dict(result, status='rejected', error='no inverter with this ID')
+        if point.block == 'controls':
+            location = self._model_location(device_info, 123, self.CONTROLS_ADDRESS,
+                                            self.CONTROLS_LENGTH)
+        elif device_info.get('has_storage'):
+            location = self._model_location(device_info, 124, self.STORAGE_ADDRESS,
+                                            self.STORAGE_LENGTH)
+        else:
+            location = None
+        if not location or location[1] is None or location[1] <= point.offset:
+            return dict(result, status='rejected', error=f'device has no {point.block} model')
+        address = location[0]
+
+        writes = []
+        if command.value is not None:
+            tail = self._control_scale_factors(unit_id, point.block, location)
+            if tail is None:
+                return dict(result, error='scale factors not readable')
+            try:
+                writes.append((point.offset, encode_value(point, command.value, tail)))
+            except ValueError as e:
+                return dict(result, status='rejected', error=str(e))
+        if point.enable_offset is not None:
+            writes.append((point.enable_offset, 0 if command.value is None else 1))
+
+        for offset, raw in writes:
+            if not self.connection.write_registers(address + offset, [raw], unit_id):
+                return dict(result, error=f'write to {address + offset} failed')
+
+        # Next poll reads the block again, so the published state follows
+        self._last_block_read.pop((unit_id, point.block), None)
+
+        if self.controls_config.verify:
+            first = min(offset for offset, _ in writes)
+            last = max(offset for offset, _ in writes)
+            regs = self.connection.read_registers(address + first, last - first + 1, unit_id)
+            if regs is None:
+                return dict(result, status='unconfirmed', error='read-back failed')
+            mismatch = [address + offset for offset, raw in writes if regs[offset - first] != raw]
+            if mismatch:
+                return dict(result, status='unconfirmed',
+                            error=f'registers {mismatch} differ after write')
+        return dict(result, status='ok')
+
+    def _control_scale_factors(self, unit_id: int, block: str,
+                               location: tuple) -> Optional[tuple]:
+        """Scale factor tail of a control block, from the cache or read now."""
+        cached = self._sf_cache.get((unit_id, block))
+        if cached is not None:
+            return cached[0]
+        regs = self.connection.read_registers(location[0], location[1], unit_id)
+        if regs is None:
+            return None
+        tail = tuple(regs[-self.SF_TAIL_LENGTH[block]:])
+        self._sf_cache[(unit_id, block)] = (tail, time.monotonic())
+        return tail
+
+    def get_command_stats(self) -> Dict:
+        """Return control command counters and latency"""
+        succeeded = self.commands_total - self.commands_failed - self.commands_expired
+        return {
+            'total': self.commands_total,
+            'failed': self.commands_failed,
+            'expired': self.commands_expired,
+            'replaced': self.commands.replaced,
+            'queued': len(self.commands),
+            'avg_latency_ms': round(self.command_latency_total / succeeded * 1000, 1)
+            if succeeded else 0.0,
+            'max_latency_ms': round(self.command_latency_max * 1000, 1),
+        }
+
+    def _revalidate(self, device_info: Dict, device_type: str, task: PollTask):
+        """
+        Confirm the identity of a device that was started from the cache.
+
+        The device is re-identified on the polling connection. If serial
+        number or model changed, the cache entry is invalidated; if only
+        the model chain moved (e.g. after a firmware update), the read plan
+        follows. Either way the device info is replaced in place so the
+        next poll uses the new identity. The task is removed once the device
+        has answered.
+        """
+        unit_id = device_info['device_id']
+        info = self.connection.identify_device(unit_id)
+        if info is None:
+            self.log.debug(f"{device_type.capitalize()} {unit_id}: identity check failed, "
+                           f"retry in {self.REVALIDATE_RETRY:.0f}s")
+            return
+        if device_type == 'inverter':
+            info['has_storage'] = self.connection.check_storage_support(unit_id, info.get('models'))
+        self.scheduler.remove(task)
+
+        changed = any(info.get(key) != device_info.get(key)
+                      for key in ('serial_number', 'model', 'model_id'))
+        relocated = any(info.get(key) != device_info.get(key)
+                        for key in ('models', 'has_storage'))
+        if changed:
+            self.log.warning(f"{device_type.capitalize()} {unit_id}: identity changed "
+                             f"(SN {device_info.get('serial_number')} -> {info.get('serial_number')}), "
+                             f"cache entry replaced")
+        elif relocated:
+            self.log.info(f"{device_type.capitalize()} {unit_id}: model layout changed, "
+                          f"read plan updated")
+        if changed or relocated:
+            info['endpoint'] = device_info.get('endpoint')
+            device_info.clear()
+            device_info.update(info)
+            for key in [k for k in self._last_block_read if k[0] == unit_id]:
+                del self._last_block_read[key]
+
+        if self.identity_callback:
+            self.identity_callback(device_info, device_type, changed)
 
     def _poll_meter(self, device_info: Dict, max_retries: int = 3) -> bool:
         """Poll a single meter with retry on failure."""
         unit_id = device_info['device_id']
 
-        regs = None
-        for attempt in range(max_retries):
-            regs = self.connection.read_registers(40072, 53, unit_id)
-
-            if regs and len(regs) >= 53:
-                break  # Success
-
-            if attempt < max_retries - 1:
-                self.log.debug(f"Meter {unit_id}: read failed, retry {attempt + 1}/{max_retries}")
-                time.sleep(0.5)
-            else:
-                self.log.debug(f"Meter {unit_id}: read failed after {max_retries} attempts")
-                return False
+        model_id = device_info.get('model_id')
+        location = self._model_location(device_info, model_id, self.DEVICE_ADDRESS,
+                                        self._device_length('meter', model_id, self.METER_LENGTH))
+        if not location:
+            self.log.debug(f"Meter {unit_id}: model {model_id} not in model chain")
+            return False
+        spans = [ModelSpan('meter', location[0], location[1], model_id=model_id)]
+        regs = self._execute_plan(unit_id, spans, max_retries).get('meter')
+        if not regs:
+            self.log.debug(f"Meter {unit_id}: read failed")
+            return False
+        if self._skip_unchanged(unit_id, 'meter', {'meter': regs}):
+            return True
 
-        data = self.parser.parse_meter_measurements(regs)
+        # Registers after the model header, from 40072
+        data = self.parser.parse_meter_measurements(regs[2:], model_id)
         data['device_id'] = unit_id
         data['serial_number'] = device_info.get('serial_number', '')
         data['model'] = device_info.get('model', '')
@@ -552,33 +1375,30 @@ class DevicePoller(threading.Thread):
         inv_ids = [inv['device_id'] for inv in self.inverters]
         meter_ids = [m['device_id'] for m in self.meters]
         self.log.info(f"DevicePoller: started for inverters {inv_ids}, meters {meter_ids}")
-        self.log.info(f"DevicePoller: {self.poll_delay}s delay between devices")
+        self.log.info(f"DevicePoller: inverters every {self.devices_config.inverter_poll_interval}s, "
+                      f"meters every {self.devices_config.meter_poll_interval}s")
 
-        # Connect
+        # Connect; reads reconnect on their own, so polling starts anyway
+        # (e.g. devices taken from the cache while the gateway is down)
         if not self.connection.connect():
-            self.log.error("DevicePoller: Failed to connect to Modbus")
-            return
+            self.log.warning("DevicePoller: Failed to connect to Modbus, retrying while polling")
 
         while self.running:
-            # Poll all inverters
-            for device_info in self.inverters:
-                if not self.running:
-                    break
-                self._poll_inverter(device_info)
-                time.sleep(self.poll_delay)
-
-            # Poll all meters
-            for device_info in self.meters:
-                if not self.running:
-                    break
-                self._poll_meter(device_info)
-                time.sleep(self.poll_delay)
+            if self.commands:
+                self._run_commands()
+            task, delay = self.scheduler.next_task()
+            if task is None:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            self.scheduler.run_task(task)
 
         self.connection.disconnect()
         self.log.info("DevicePoller: stopped")
 
     def stop(self):
         self.running = False
+        self._wake.set()
 
 
 # Keep old class names for backward compatibility
@@ -599,115 +1419,389 @@ class MeterPoller(DevicePoller):
                         parser, publish_callback)
 
 
-class FroniusModbusClient:
-    """Main Modbus client managing connection and pollers."""
+class ModbusEndpoint:
+    """
+    One Modbus TCP endpoint (DataManager or directly attached inverter)
+    with its own devices, connection and poller thread.
+    """
 
-    def __init__(self, modbus_config: ModbusConfig, devices_config: DevicesConfig,
-                 register_map: Dict, publish_callback: Callable = None):
-        self.modbus_config = modbus_config
+    def __init__(self, endpoint_config: EndpointConfig, devices_config: DevicesConfig,
+                 parser: RegisterParser, publish_callback: Callable,
+                 device_cache: DeviceCache = None, metrics: MetricsRegistry = None,
+                 controls_config: ControlsConfig = None, command_callback: Callable = None):
+        self.name = endpoint_config.name
+        self.config = endpoint_config
+        self.modbus_config = endpoint_config.modbus
         self.devices_config = devices_config
-        self.parser = RegisterParser(register_map)
+        self.parser = parser
+        self.publish_callback = publish_callback
+        self.device_cache = device_cache
+        self.metrics = metrics
+        self.controls_config = controls_config
+        self.command_callback = command_callback
         self.log = get_logger()
 
-        # Discovery connection (separate from polling connections)
-        self.connection = ModbusConnection(modbus_config, self.parser)
-        self.publish_callback = publish_callback or (lambda *args: None)
-
-        # Single device poller
+        # Discovery connection (separate from the polling connection)
+        self.connection = ModbusConnection(self.modbus_config, parser)
         self.device_poller: DevicePoller = None
 
         self.inverters: List[Dict] = []
         self.meters: List[Dict] = []
+        self.revalidate: List[Dict] = []    # Devices started from the cache
         self.connected = False
 
+    def device_key(self, unit_id: int):
+        """Device ID used for publishing (prefixed for non-default endpoints)."""
+        if self.config.id_prefix:
+            return f"{self.config.id_prefix}{unit_id}"
+        return unit_id
+
+    def _publish(self, unit_id: int, device_type: str, data: Dict):
+        self.publish_callback(self.device_key(unit_id), device_type, data)
+
+    def unit_for(self, device_key) -> Optional[int]:
+        """Unit ID of a polled inverter by its published device ID, or None."""
+        for info in self.inverters:
+            if str(self.device_key(info['device_id'])) == str(device_key):
+                return info['device_id']
+        return None
+
     def connect(self) -> bool:
         self.connected = self.connection.connect()
+        if not self.connected:
+            self.log.error(f"Endpoint {self.name}: failed to connect to "
+                           f"{self.modbus_config.host}:{self.modbus_config.port}")
         return self.connected
 
     def disconnect(self):
-        # Stop poller
         if self.device_poller:
             self.device_poller.stop()
             self.device_poller.join(timeout=10)
-
-        # Disconnect discovery connection
         self.connection.disconnect()
         self.connected = False
 
-    def discover_devices(self, device_filter: str = 'all') -> tuple:
-        """Discover configured devices.
+    def discover_devices(self, device_filter: str = 'all', use_cache: bool = False) -> tuple:
+        """
+        Discover the devices configured on this endpoint.
 
         Args:
             device_filter: 'all', 'inverter', or 'meter' - which device types to discover
+            use_cache: Take identities from the device cache where available;
+                the poller confirms them in the background
+
+        Returns:
+            (inverters, meters) device info lists
         """
         self.inverters = []
         self.meters = []
+        self.revalidate = []
 
-        self.log.info("Discovering devices...")
-
-        # Discover inverters if filter allows
+        wanted = []
         if device_filter in ('all', 'inverter'):
-            for unit_id in self.devices_config.inverters:
-                info = self.connection.identify_device(unit_id)
-                if info:
-                    # Check if inverter has storage support (Model 124)
-                    info['has_storage'] = self.connection.check_storage_support(unit_id)
-                    self.inverters.append(info)
-                else:
-                    self.log.warning(f"No inverter at ID {unit_id}")
-                time.sleep(0.5)
-
-        # Discover meters if filter allows
+            wanted.extend((unit_id, 'inverter') for unit_id in self.config.inverters)
         if device_filter in ('all', 'meter'):
-            for unit_id in self.devices_config.meters:
-                info = self.connection.identify_device(unit_id)
-                if info:
-                    self.meters.append(info)
-                else:
-                    self.log.warning(f"No meter at ID {unit_id}")
-                time.sleep(0.5)
+            wanted.extend((unit_id, 'meter') for unit_id in self.config.meters)
+
+        for unit_id, device_type in wanted:
+            info = self._cached_device(unit_id, device_type) if use_cache else None
+            if info is not None:
+                self.revalidate.append(info)
+            elif self.connected:
+                info = self._identify_device(unit_id, device_type)
+            if info is None:
+                self.log.warning(f"Endpoint {self.name}: no {device_type} at ID {unit_id}")
+                continue
+            if device_type == 'inverter':
+                self.inverters.append(info)
+            else:
+                self.meters.append(info)
 
-        # Count devices with storage
-        storage_count = sum(1 for inv in self.inverters if inv.get('has_storage'))
-        self.log.info(f"Found: {len(self.inverters)} inverter(s), {len(self.meters)} meter(s), {storage_count} with storage")
         return self.inverters, self.meters
 
+    def _identify_device(self, unit_id: int, device_type: str) -> Optional[Dict]:
+        """Identify a device over Modbus and store it in the cache."""
+        info = self.connection.identify_device(unit_id)
+        if not info:
+            return None
+        if device_type == 'inverter':
+            # Check if inverter has storage support (Model 124)
+            info['has_storage'] = self.connection.check_storage_support(unit_id, info.get('models'))
+        info['endpoint'] = self.name
+        self._cache_device(info, device_type)
+        return info
+
+    def _cached_device(self, unit_id: int, device_type: str) -> Optional[Dict]:
+        """Device info from the cache, or None if missing or from another host."""
+        if self.device_cache is None:
+            return None
+        cached = self.device_cache.get_device(self.device_key(unit_id), device_type)
+        if not cached or cached.get('host') != self.modbus_config.host:
+            return None
+        info = {k: v for k, v in cached.items() if k not in ('host', 'cached_at')}
+        info['device_id'] = unit_id
+        info['endpoint'] = self.name
+        self.log.info(f"Endpoint {self.name}: {device_type} {unit_id} from cache: "
+                      f"{info.get('model', '')} (SN: {info.get('serial_number', '')})")
+        return info
+
+    def _cache_device(self, info: Dict, device_type: str):
+        if self.device_cache is not None:
+            self.device_cache.set_device(self.device_key(info['device_id']), device_type,
+                                         dict(info, host=self.modbus_config.host))
+
+    def _identity_checked(self, device_info: Dict, device_type: str, changed: bool):
+        """Poller callback after a background identity check."""
+        if self.device_cache is None:
+            return
+        if changed:
+            self.device_cache.invalidate(self.device_key(device_info['device_id']), device_type)
+        # Also refreshes values learned while polling (e.g. MPPT module count)
+        self._cache_device(device_info, device_type)
+
     def start_polling(self):
-        """Start single polling thread for all devices."""
+        """Start the poller thread for this endpoint's devices."""
         # Close discovery connection before starting poller
         self.connection.disconnect()
 
-        # Start single device poller for all inverters and meters
-        if self.inverters or self.meters:
-            self.device_poller = DevicePoller(
-                modbus_config=self.modbus_config,
-                inverters=self.inverters,
-                meters=self.meters,
-                poll_delay=self.devices_config.inverter_poll_delay,
-                read_delay_ms=self.devices_config.inverter_read_delay_ms,
-                parser=self.parser,
-                publish_callback=self.publish_callback
-            )
-            self.device_poller.start()
-            self.log.info("Started single DevicePoller thread for all devices")
+        if not self.inverters and not self.meters:
+            return
 
-    def poll_all_devices(self) -> Dict:
-        """For compatibility - data is published via callback."""
-        return {'inverters': {}, 'meters': {}, 'timestamp': time.time()}
+        poller_class = DevicePoller
+        if self.modbus_config.transport == 'pipelined':
+            from .async_modbus import PipelinedDevicePoller
+            poller_class = PipelinedDevicePoller
+        self.device_poller = poller_class(
+            modbus_config=self.modbus_config,
+            inverters=self.inverters,
+            meters=self.meters,
+            poll_delay=self.devices_config.inverter_poll_delay,
+            read_delay_ms=self.devices_config.inverter_read_delay_ms,
+            parser=self.parser,
+            publish_callback=self._publish,
+            devices_config=self.devices_config,
+            revalidate=self.revalidate,
+            identity_callback=self._identity_checked,
+            metrics=self.metrics.poller(self.name) if self.metrics is not None else None,
+            controls_config=self.controls_config,
+            command_callback=self.command_callback
+        )
+        self.device_poller.name = f"{poller_class.__name__}-{self.name}"
+        self.device_poller.start()
+        self.log.info(f"Endpoint {self.name}: started {poller_class.__name__} "
+                      f"({self.modbus_config.transport} transport)")
 
     def get_stats(self) -> Dict:
-        # Aggregate stats from all connections
         successful = self.connection.successful_reads
         failed = self.connection.failed_reads
+        reconnects = self.connection.reconnects
+        pacing = self.connection.get_stats()['pacing']
+        scheduler = {}
+        scale_factors = {}
+        unchanged = {}
+        commands = {}
+        backoff = {}
 
         if self.device_poller and self.device_poller.connection:
             successful += self.device_poller.connection.successful_reads
             failed += self.device_poller.connection.failed_reads
+            reconnects += self.device_poller.connection.reconnects
+            pacing = self.device_poller.connection.get_stats()['pacing']
+            scheduler = self.device_poller.scheduler.get_stats()
+            scale_factors = {
+                'cache_hits': self.device_poller.sf_cache_hits,
+                'refreshes': self.device_poller.sf_refreshes,
+            }
+            unchanged = {
+                'hits': self.device_poller.unchanged_hits,
+                'misses': self.device_poller.unchanged_misses,
+            }
+            commands = self.device_poller.get_command_stats()
+            backoff = self.device_poller.get_backoff_stats()
 
         return {
+            'host': self.modbus_config.host,
+            'transport': self.modbus_config.transport,
             'connected': self.connected,
             'successful_reads': successful,
             'failed_reads': failed,
+            'reconnects': reconnects,
+            'inverters': len(self.inverters),
+            'meters': len(self.meters),
+            'pacing': pacing,
+            'scheduler': scheduler,
+            'scale_factors': scale_factors,
+            'unchanged_polls': unchanged,
+            'commands': commands,
+            'backoff': backoff,
+            'deadline_misses': sum(s['misses'] for s in scheduler.values()),
+        }
+
+
+class FroniusModbusClient:
+    """
+    Main Modbus client managing endpoints and their pollers.
+
+    Each endpoint has its own connection and poller thread, so independent
+    gateways poll in parallel and a slow one does not stall the others.
+    """
+
+    def __init__(self, modbus_config: ModbusConfig, devices_config: DevicesConfig,
+                 register_map: Dict, publish_callback: Callable = None,
+                 endpoints: List[EndpointConfig] = None, metrics: MetricsRegistry = None,
+                 controls_config: ControlsConfig = None, command_callback: Callable = None):
+        """
+        Args:
+            modbus_config: Connection settings (used when no endpoints are given)
+            devices_config: Device IDs (used when no endpoints are given) and
+                poll intervals
+            register_map: Register definitions loaded from registers.json
+            publish_callback: Called as (device_id, device_type, data)
+            endpoints: Modbus endpoints with their device IDs
+            metrics: Registry for per-request read metrics (None = off)
+            controls_config: Timeout and read-back of control commands
+            command_callback: Called as (device_id, command, result) after
+                a control command finished
+        """
+        self.modbus_config = modbus_config
+        self.devices_config = devices_config
+        self.parser = RegisterParser(register_map)
+        self.log = get_logger()
+        self.publish_callback = publish_callback or (lambda *args: None)
+        self.command_callback = command_callback
+
+        # Persistent device identities for warm starts
+        self.device_cache: Optional[DeviceCache] = None
+        if devices_config.device_cache:
+            self.device_cache = DeviceCache(devices_config.cache_file or None)
+
+        if not endpoints:
+            endpoints = [EndpointConfig(
+                name='default',
+                modbus=modbus_config,
+                inverters=list(devices_config.inverters),
+                meters=list(devices_config.meters)
+            )]
+        self.endpoints = [
+            ModbusEndpoint(ep, devices_config, self.parser, self.publish_callback,
+                           self.device_cache, metrics, controls_config,
+                           self._command_done)
+            for ep in endpoints
+        ]
+
+        self.inverters: List[Dict] = []
+        self.meters: List[Dict] = []
+        self.connected = False
+
+    @property
+    def connection(self) -> ModbusConnection:
+        """Discovery connection of the first endpoint (backward compatibility)"""
+        return self.endpoints[0].connection
+
+    @property
+    def device_poller(self) -> Optional[DevicePoller]:
+        """Poller of the first endpoint (backward compatibility)"""
+        return self.endpoints[0].device_poller
+
+    @property
+    def warm_start(self) -> bool:
+        """True if discovery can take device identities from the cache."""
+        return (self.device_cache is not None and
+                self.device_cache.is_cache_valid(self.devices_config.rescan_interval))
+
+    def connect(self) -> bool:
+        """Connect all endpoints; succeeds if at least one is reachable."""
+        results = [endpoint.connect() for endpoint in self.endpoints]
+        self.connected = any(results)
+        return self.connected
+
+    def disconnect(self):
+        for endpoint in self.endpoints:
+            endpoint.disconnect()
+        self.connected = False
+
+    def discover_devices(self, device_filter: str = 'all') -> tuple:
+        """Discover configured devices on all endpoints.
+
+        Cached identities are used while the cache is younger than
+        rescan_interval, so polling can start without scanning; devices
+        missing from the cache are identified over Modbus as usual.
+
+        Args:
+            device_filter: 'all', 'inverter', or 'meter' - which device types to discover
+        """
+        self.inverters = []
+        self.meters = []
+
+        use_cache = self.warm_start
+        self.log.info("Discovering devices..." + (" (warm start from cache)" if use_cache else ""))
+
+        for endpoint in self.endpoints:
+            inverters, meters = endpoint.discover_devices(device_filter, use_cache)
+            self.inverters.extend(inverters)
+            self.meters.extend(meters)
+
+        if self.device_cache is not None and not use_cache:
+            self.device_cache.set_discovery_complete()
+
+        # Count devices with storage
+        storage_count = sum(1 for inv in self.inverters if inv.get('has_storage'))
+        cached_count = sum(len(endpoint.revalidate) for endpoint in self.endpoints)
+        self.log.info(f"Found: {len(self.inverters)} inverter(s), {len(self.meters)} meter(s), "
+                      f"{storage_count} with storage on {len(self.endpoints)} endpoint(s)"
+                      + (f", {cached_count} from cache" if cached_count else ""))
+        return self.inverters, self.meters
+
+    def start_polling(self):
+        """Start one polling thread per endpoint."""
+        for endpoint in self.endpoints:
+            endpoint.start_polling()
+
+    def submit_command(self, device_id, name: str, value: Optional[float],
+                       received: float = None) -> Optional[str]:
+        """
+        Queue a control command for an inverter.
+
+        Args:
+            device_id: Published device ID (with endpoint prefix)
+            name: Control name (key of commands.CONTROL_POINTS)
+            value: Setpoint, None to disable the control
+            received: Monotonic arrival time (default: now)
+
+        Returns:
+            None if queued, else the reason it was not
+        """
+        for endpoint in self.endpoints:
+            unit_id = endpoint.unit_for(device_id)
+            if unit_id is None:
+                continue
+            if endpoint.device_poller is None or not endpoint.device_poller.is_alive():
+                return f"endpoint {endpoint.name} is not polling"
+            command = ControlCommand(unit_id, name, value, source=str(device_id))
+            if received is not None:
+                command.received = received
+            endpoint.device_poller.submit_command(command)
+            return None
+        return f"no inverter {device_id}"
+
+    def _command_done(self, command: ControlCommand, result: Dict):
+        if self.command_callback:
+            self.command_callback(command.source, command, result)
+
+    def poll_all_devices(self) -> Dict:
+        """For compatibility - data is published via callback."""
+        return {'inverters': {}, 'meters': {}, 'timestamp': time.time()}
+
+    def get_stats(self) -> Dict:
+        # Aggregate stats from all endpoints
+        endpoints = {endpoint.name: endpoint.get_stats() for endpoint in self.endpoints}
+
+        return {
+            'connected': self.connected,
+            'successful_reads': sum(s['successful_reads'] for s in endpoints.values()),
+            'failed_reads': sum(s['failed_reads'] for s in endpoints.values()),
+            'reconnects': sum(s['reconnects'] for s in endpoints.values()),
             'inverters': len(self.inverters),
             'meters': len(self.meters),
+            'deadline_misses': sum(s['deadline_misses'] for s in endpoints.values()),
+            'endpoints': endpoints,
         }
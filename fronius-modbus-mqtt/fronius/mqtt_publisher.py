@@ -3,11 +3,77 @@
 import time
 import json
 import threading
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, Callable, List, Optional, Sequence, Set, Tuple
 import paho.mqtt.client as mqtt
 
+from .change_filter import ChangeFilter
 from .config import MQTTConfig
 from .logging_setup import get_logger
+from .rollup import Rollup
+
+
+# Last value of a topic that was never published
+_UNSET = object()
+
+
+class PublishPlan:
+    """
+    Pre-built topics and last published values of one device.
+
+    Each cycle the publisher passes the device's values in topic order;
+    change detection is one loop over lists indexed by field position
+    (last value, last publish time, deadband), with no topic strings
+    built or hashed.
+    """
+
+    __slots__ = ('topics', 'bands', 'last', 'sent')
+
+    def __init__(self, topics: Sequence[str], bands: Sequence[tuple]):
+        self.topics: List[str] = []
+        self.bands: List[tuple] = []
+        self.last: List[Any] = []
+        self.sent: List[float] = []
+        self.extend(topics, bands)
+
+    def extend(self, topics: Sequence[str], bands: Sequence[tuple]):
+        """Append topics (e.g. for MPPT modules reported later)"""
+        self.topics.extend(topics)
+        self.bands.extend(bands)
+        self.last.extend([_UNSET] * len(topics))
+        self.sent.extend([0.0] * len(topics))
+
+    def changes(self, values: Sequence[Any], change_filter: ChangeFilter, now: float,
+                publish_all: bool = False) -> Tuple[List[Tuple[str, Any]], int]:
+        """
+        Pick the values to publish and record them as published.
+
+        Not thread-safe; the publisher calls it under its lock.
+
+        Args:
+            values: Values in topic order; None values are skipped
+            change_filter: Deadbands, precision and heartbeat
+            now: Current time (seconds)
+            publish_all: Publish every value, changed or not
+
+        Returns:
+            ([(topic, value), ...] to publish, number of unchanged values)
+        """
+        changes = []
+        last = self.last
+        sent = self.sent
+        bands = self.bands
+        changed = change_filter.changed
+        silence = change_filter.max_silence
+        for index, (value, old) in enumerate(zip(values, last)):
+            if value is None or (old == value and not publish_all and not silence):
+                continue
+            if (publish_all or (old != value and changed(old, value, bands[index]))
+                    or (silence and now - sent[index] >= silence)):
+                last[index] = value
+                sent[index] = now
+                changes.append((self.topics[index], value))
+        unchanged = len(values) - values.count(None) - len(changes)
+        return changes, unchanged
 
 
 class MQTTPublisher:
@@ -21,6 +87,10 @@ class MQTTPublisher:
     - JSON payload formatting
     - Retained messages support
     - SunSpec-compatible topic names
+    - One JSON document per device and poll (publish_format json/both)
+    - Home Assistant MQTT discovery for the JSON documents
+    - Rollup documents per closed window ({prefix}/<type>/<id>/rollup/<window>)
+    - History request/response topics ({prefix}/<type>/<id>/history/get)
     """
 
     # Mapping from Python field names to SunSpec register names
@@ -130,22 +200,94 @@ class MQTTPublisher:
         'grid_charging_code': 'ChaGriSet',
     }
 
-    def __init__(self, config: MQTTConfig, publish_mode: str = 'changed'):
+    # MPPT module fields (Model 160), per string in JSON documents
+    MPPT_FIELD_MAP = {
+        'dc_current': 'DCA',
+        'dc_voltage': 'DCV',
+        'dc_power': 'DCW',
+        'dc_energy': 'DCWH',
+        'temperature': 'Tmp',
+    }
+
+    # Immediate controls fields (Model 123) included in JSON documents
+    CONTROLS_FIELDS = ('connected', 'power_limit_pct', 'power_limit_enabled',
+                       'power_factor', 'power_factor_enabled', 'var_enabled')
+
+    # (topic name, data field) in publish plan order (see publish_*_data)
+    METER_TOPIC_FIELDS = tuple((name, field) for field, name in METER_FIELD_MAP.items()) + (
+        ('model', 'model'), ('serial_number', 'serial_number'))
+    STORAGE_TOPIC_FIELDS = tuple((name, field) for field, name in STORAGE_FIELD_MAP.items()) + (
+        ('status', 'charge_status'), ('status_description', 'charge_status'),
+        ('grid_charging', 'grid_charging'), ('charge_limit_active', 'charge_limit_active'),
+        ('discharge_limit_active', 'discharge_limit_active'))
+
+    # Home Assistant (unit, device_class, state_class) per SunSpec name
+    HA_SENSOR_GROUPS = (
+        (('A', 'AphA', 'AphB', 'AphC', 'DCA'), 'A', 'current', 'measurement'),
+        (('PPV', 'PPVphAB', 'PPVphBC', 'PPVphCA', 'PhV', 'PhVphA', 'PhVphB', 'PhVphC',
+          'DCV', 'InBatV'), 'V', 'voltage', 'measurement'),
+        (('W', 'WphA', 'WphB', 'WphC', 'DCW', 'WChaMax'), 'W', 'power', 'measurement'),
+        (('VA', 'VAphA', 'VAphB', 'VAphC'), 'VA', 'apparent_power', 'measurement'),
+        (('VAr', 'VAR', 'VARphA', 'VARphB', 'VARphC'), 'var', 'reactive_power', 'measurement'),
+        (('PF', 'PFphA', 'PFphB', 'PFphC'), '%', 'power_factor', 'measurement'),
+        (('Hz',), 'Hz', 'frequency', 'measurement'),
+        (('WH', 'DCWH', 'TotWhExp', 'TotWhExpPhA', 'TotWhExpPhB', 'TotWhExpPhC',
+          'TotWhImp', 'TotWhImpPhA', 'TotWhImpPhB', 'TotWhImpPhC'),
+         'Wh', 'energy', 'total_increasing'),
+        (('TmpCab', 'TmpSnk', 'TmpTrns', 'TmpOt', 'Tmp'), '°C', 'temperature', 'measurement'),
+        (('ChaState',), '%', 'battery', 'measurement'),
+        (('MinRsvPct', 'OutWRte', 'InWRte', 'power_limit_pct'), '%', None, 'measurement'),
+    )
+    HA_SENSORS = {
+        name: (unit, device_class, state_class)
+        for names, unit, device_class, state_class in HA_SENSOR_GROUPS
+        for name in names
+    }
+
+    # JSON document key -> data field per device type (selects the deadband)
+    DOCUMENT_FIELDS = {
+        'inverter': {name: field for field, name in INVERTER_FIELD_MAP.items()},
+        'meter': {name: field for field, name in METER_FIELD_MAP.items()},
+        'storage': {name: field for field, name in STORAGE_FIELD_MAP.items()},
+        'mppt': {name: field for field, name in MPPT_FIELD_MAP.items()},
+    }
+
+    def __init__(self, config: MQTTConfig, publish_mode: str = 'changed',
+                 change_filter: ChangeFilter = None):
         """
         Initialize MQTT publisher.
 
         Args:
             config: MQTT configuration
             publish_mode: 'changed' (only publish changes) or 'all' (always publish)
+            change_filter: Deadbands and heartbeat for 'changed' mode
+                (defaults to the built-in deadbands, no heartbeat)
         """
         self.config = config
         self.publish_mode = publish_mode
+        self.change_filter = change_filter or ChangeFilter()
         self.client: mqtt.Client = None
         self.connected = False
         self.last_values: Dict[str, Any] = {}
+        self.last_sent: Dict[str, float] = {}
         self.lock = threading.Lock()
         self.log = get_logger()
 
+        # (device_type, device_id) -> compiled per-field publish plan
+        self._plans: Dict[tuple, PublishPlan] = {}
+
+        # (device_type, document key path) -> deadband of a JSON document value
+        self._document_bands: Dict[tuple, tuple] = {}
+
+        # State topic -> document paths announced to Home Assistant
+        self._discovered: Dict[str, Set[tuple]] = {}
+
+        # Control command and history request topics (subscribed on every connect once set)
+        self._command_handler: Optional[Callable] = None
+        self._history_handler: Optional[Callable] = None
+        self.commands_received = 0
+        self.history_requests = 0
+
         # Stats
         self.messages_published = 0
         self.messages_skipped = 0
@@ -166,6 +308,7 @@ class MQTTPublisher:
 
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
         self.client.reconnect_delay_set(min_delay=1, max_delay=60)
 
     def _on_connect(self, client, userdata, flags, reason_code, properties=None):
@@ -176,6 +319,10 @@ class MQTTPublisher:
             self.log.info(
                 f"MQTT connected to {self.config.broker}:{self.config.port}"
             )
+            if self._command_handler is not None:
+                client.subscribe(self._command_topic(), qos=1)
+            if self._history_handler is not None:
+                client.subscribe(self._history_topic(), qos=1)
         else:
             self.connected = False
             self.log.error(f"MQTT connection failed: {reason_code}")
@@ -186,6 +333,83 @@ class MQTTPublisher:
         if reason_code != 0:
             self.log.warning(f"MQTT disconnected unexpectedly: {reason_code}")
 
+    def _command_topic(self) -> str:
+        return f"{self.config.topic_prefix}/inverter/+/set/+"
+
+    def subscribe_commands(self, handler: Callable):
+        """
+        Receive control commands on {prefix}/inverter/{id}/set/{control}.
+
+        Retained messages are ignored, so an old setpoint left on the
+        broker is never applied on startup.
+
+        Args:
+            handler: Called as (device_id, control, payload) from the MQTT thread
+        """
+        self._command_handler = handler
+        if self.connected:
+            self.client.subscribe(self._command_topic(), qos=1)
+        self.log.info(f"MQTT: accepting control commands on {self._command_topic()}")
+
+    def _history_topic(self) -> str:
+        return f"{self.config.topic_prefix}/+/+/history/get"
+
+    def subscribe_history(self, handler: Callable):
+        """
+        Receive history requests on {prefix}/{device_type}/{id}/history/get.
+
+        Args:
+            handler: Called as (device_type, device_id, payload) from the MQTT thread
+        """
+        self._history_handler = handler
+        if self.connected:
+            self.client.subscribe(self._history_topic(), qos=1)
+        self.log.info(f"MQTT: answering history requests on {self._history_topic()}")
+
+    def _on_message(self, client, userdata, message):
+        """Dispatch a control command or history request"""
+        parts = message.topic.split('/')
+        if message.retain or len(parts) < 4:
+            return
+        try:
+            payload = message.payload.decode('utf-8')
+        except UnicodeDecodeError:
+            return
+        try:
+            if parts[-2] == 'set' and self._command_handler is not None:
+                self.commands_received += 1
+                self._command_handler(parts[-3], parts[-1], payload)
+            elif parts[-2:] == ['history', 'get'] and self._history_handler is not None:
+                self.history_requests += 1
+                self._history_handler(parts[-4], parts[-3], payload)
+        except Exception as e:
+            self.log.error(f"MQTT: request {message.topic} failed: {e}")
+
+    def publish_command_result(self, device_id: str, control: str, result: Dict):
+        """Publish the outcome of a control command (not retained)."""
+        topic = self._build_topic('inverter', device_id, f"set/{control}/result")
+        self.publish(topic, result, retain=False)
+
+    def publish_history(self, device_type: str, device_id: str, response: Dict,
+                        reply_to: str = None):
+        """
+        Publish a history response (not retained) to reply_to, or to
+        {prefix}/{device_type}/{id}/history/result.
+        """
+        topic = reply_to or self._build_topic(device_type, device_id, 'history/result')
+        self._publish(topic, json.dumps(response, separators=(',', ':')), retain=False)
+
+    def publish_rollup(self, rollup: Rollup):
+        """
+        Publish one closed rollup window as a JSON document to
+        {prefix}/<device type>/<id>/rollup/<window>.
+        """
+        doc = {'start': rollup.start, 'end': rollup.start + rollup.window,
+               'samples': rollup.samples}
+        doc.update((name, self._json_value(value)) for name, value in rollup.values.items())
+        topic = self._build_topic(rollup.device_type, rollup.device_id, f"rollup/{rollup.label}")
+        self._publish(topic, json.dumps(doc, separators=(',', ':')))
+
     def connect(self) -> bool:
         """
         Connect to MQTT broker.
@@ -257,13 +481,15 @@ class MQTTPublisher:
         if self.publish_mode == 'all':
             return True
 
+        # Compare what the payload will show, not float noise below it
+        value = self.change_filter.quantize(value)
+        now = time.time()
+        silence = self.change_filter.max_silence
         with self.lock:
-            if topic not in self.last_values:
-                self.last_values[topic] = value
-                return True
-
-            if self.last_values[topic] != value:
+            if (topic not in self.last_values or self.last_values[topic] != value
+                    or (silence and now - self.last_sent.get(topic, 0.0) >= silence)):
                 self.last_values[topic] = value
+                self.last_sent[topic] = now
                 return True
 
         return False
@@ -316,8 +542,8 @@ class MQTTPublisher:
         Returns:
             True if published successfully
         """
-        # Convert to JSON if dict/list
-        if isinstance(value, (dict, list)):
+        # Convert to JSON if dict/list/tuple
+        if isinstance(value, (dict, list, tuple)):
             payload = json.dumps(value)
         elif isinstance(value, float):
             payload = str(round(value, 3))
@@ -345,10 +571,264 @@ class MQTTPublisher:
         self.messages_skipped += 1
         return False
 
+    @staticmethod
+    def _json_value(value: Any) -> Any:
+        """Round floats like the per-field payloads"""
+        return round(value, 3) if isinstance(value, float) else value
+
+    def _mapped_values(self, data: Dict, field_map: Dict[str, str]) -> Dict:
+        """SunSpec name -> value for the mapped fields present in data"""
+        return {name: self._json_value(data[field])
+                for field, name in field_map.items() if field in data}
+
+    def _inverter_document(self, data: Dict) -> Dict:
+        """
+        Build the JSON document for an inverter poll.
+
+        Keys match the per-field topic names; MPPT strings and controls
+        are nested objects (mppt.string1.DCA, controls.power_limit_pct).
+        """
+        doc = self._mapped_values(data, self.INVERTER_FIELD_MAP)
+        if 'status' in data:
+            status = data['status']
+            doc['status'] = status.get('description', 'Unknown')
+            doc['St'] = status.get('code', 0)
+            doc['alarm'] = status.get('alarm', False)
+        if 'is_active' in data:
+            doc['active'] = data['is_active']
+        if 'events' in data:
+            doc['events'] = data['events'] or []
+        for field in ['model', 'manufacturer', 'serial_number']:
+            if data.get(field):
+                doc[field] = data[field]
+
+        mppt = data.get('mppt')
+        if mppt:
+            section = {}
+            if 'num_modules' in mppt:
+                section['num_modules'] = mppt['num_modules']
+            for i, module in enumerate(mppt.get('modules', []), 1):
+                section[f'string{i}'] = self._mapped_values(module, self.MPPT_FIELD_MAP)
+            doc['mppt'] = section
+
+        ctrl = data.get('controls')
+        if ctrl:
+            doc['controls'] = {k: self._json_value(ctrl[k]) for k in self.CONTROLS_FIELDS if k in ctrl}
+        return doc
+
+    def _meter_document(self, data: Dict) -> Dict:
+        """Build the JSON document for a meter poll."""
+        doc = self._mapped_values(data, self.METER_FIELD_MAP)
+        for field in ['model', 'serial_number']:
+            if data.get(field):
+                doc[field] = data[field]
+        return doc
+
+    def _storage_document(self, data: Dict) -> Dict:
+        """Build the JSON document for a storage (Model 124) poll."""
+        doc = self._mapped_values(data, self.STORAGE_FIELD_MAP)
+        if data.get('charge_status'):
+            doc['status'] = data['charge_status'].get('name', 'UNKNOWN')
+            doc['status_description'] = data['charge_status'].get('description', '')
+        for field in ['grid_charging', 'charge_limit_active', 'discharge_limit_active']:
+            if field in data:
+                doc[field] = data[field]
+        return doc
+
+    def _publish_document(self, device_type: str, device_id: str, doc: Dict) -> bool:
+        """
+        Publish a device document as compact JSON on {prefix}/{type}/{id}/state.
+
+        The document is published when any value left its deadband (as for
+        the per-field topics), a key appeared or disappeared, or the
+        heartbeat is due. With ha_discovery enabled, Home Assistant configs
+        are published for document keys not announced before.
+
+        Returns:
+            True if published, False if skipped or failed
+        """
+        topic = self._build_topic(device_type, device_id, 'state')
+        if self.config.ha_discovery:
+            self._publish_discovery(device_type, device_id, topic, doc)
+        if not self._document_changed(device_type, topic, doc):
+            self.messages_skipped += 1
+            return False
+        return self._publish(topic, json.dumps(doc, separators=(',', ':')))
+
+    def _document_changed(self, device_type: str, topic: str, doc: Dict) -> bool:
+        """Compare a document value by value with the last published one"""
+        if self.publish_mode == 'all':
+            return True
+
+        values = dict(self._document_items(doc))
+        changed = self.change_filter.changed
+        now = time.time()
+        silence = self.change_filter.max_silence
+        with self.lock:
+            last = self.last_values.get(topic)
+            if (last is not None and last.keys() == values.keys()
+                    and not (silence and now - self.last_sent.get(topic, 0.0) >= silence)
+                    and not any(last[path] != value
+                                and changed(last[path], value, self._document_band(device_type, path))
+                                for path, value in values.items())):
+                return False
+            self.last_values[topic] = values
+            self.last_sent[topic] = now
+        return True
+
+    def _document_band(self, device_type: str, path: tuple) -> tuple:
+        """Deadband of the document value at a key path (cached)"""
+        key = (device_type, path)
+        band = self._document_bands.get(key)
+        if band is None:
+            if path[0] == 'controls':
+                field = 'controls.' + path[-1]
+            elif path[0] == 'mppt':
+                field = self.DOCUMENT_FIELDS['mppt'].get(path[-1])
+            else:
+                field = self.DOCUMENT_FIELDS.get(device_type, {}).get(path[-1])
+            band = self.change_filter.band(field) if field else ChangeFilter.NO_DEADBAND
+            self._document_bands[key] = band
+        return band
+
+    @classmethod
+    def _document_items(cls, doc: Dict, prefix: tuple = ()) -> List[Tuple[tuple, Any]]:
+        """(key path, value) of every leaf in a (nested) document, lists included"""
+        items = []
+        for key, value in doc.items():
+            if isinstance(value, dict):
+                items.extend(cls._document_items(value, prefix + (key,)))
+            else:
+                items.append((prefix + (key,), value))
+        return items
+
+    @classmethod
+    def _document_paths(cls, doc: Dict, prefix: tuple = ()) -> List[tuple]:
+        """Key paths of the scalar values in a (nested) document"""
+        paths = []
+        for key, value in doc.items():
+            if isinstance(value, dict):
+                paths.extend(cls._document_paths(value, prefix + (key,)))
+            elif not isinstance(value, list):
+                paths.append(prefix + (key,))
+        return paths
+
+    def _publish_discovery(self, device_type: str, device_id: str,
+                           state_topic: str, doc: Dict):
+        """
+        Announce the document keys as Home Assistant entities.
+
+        Each scalar becomes a sensor (booleans a binary_sensor) reading
+        the state topic through a value_template. Configs are retained and
+        only published for keys not announced yet, e.g. once per device
+        and again when an MPPT module appears.
+        """
+        announced = self._discovered.setdefault(state_topic, set())
+        paths = [p for p in self._document_paths(doc) if p not in announced]
+        if not paths:
+            return
+
+        node_id = f"{self.config.topic_prefix}_{device_type}_{device_id}".replace('/', '_')
+        device = {
+            'identifiers': [node_id],
+            'name': f"Fronius {device_type} {device_id}",
+            'manufacturer': doc.get('manufacturer', 'Fronius'),
+        }
+        if doc.get('model'):
+            device['model'] = doc['model']
+
+        for path in paths:
+            object_id = '_'.join(path)
+            value = doc
+            for key in path:
+                value = value[key]
+            template = 'value_json' + ''.join(f"['{key}']" for key in path)
+            config = {
+                'name': ' '.join(path),
+                'unique_id': f"{node_id}_{object_id}",
+                'state_topic': state_topic,
+                'device': device,
+            }
+            if isinstance(value, bool):
+                component = 'binary_sensor'
+                config['value_template'] = f"{{{{ 'ON' if {template} else 'OFF' }}}}"
+            else:
+                component = 'sensor'
+                config['value_template'] = f"{{{{ {template} }}}}"
+                unit, device_class, state_class = self.HA_SENSORS.get(path[-1], (None, None, None))
+                if unit:
+                    config['unit_of_measurement'] = unit
+                if device_class:
+                    config['device_class'] = device_class
+                if state_class:
+                    config['state_class'] = state_class
+            topic = f"{self.config.ha_discovery_prefix}/{component}/{node_id}/{object_id}/config"
+            if self._publish(topic, json.dumps(config), retain=True):
+                announced.add(path)
+
+    def _publish_planned(self, device_type: str, device_id: str, values: List[Any],
+                         names: Callable[[], Sequence[Tuple[str, str]]]) -> int:
+        """
+        Publish the changed values of a device through its publish plan.
+
+        The plan is compiled on the first publish of the device and grows
+        when a cycle brings more values than it has topics (e.g. MPPT
+        modules reported later); fewer values leave the trailing topics
+        untouched. Change detection runs under a single lock acquisition.
+
+        Args:
+            values: Values for this cycle in plan order (None = not
+                available, skipped)
+            names: Returns (topic name below the device topic, data field)
+                pairs for these values; the field selects the deadband.
+                Only called when the plan is (re)compiled.
+
+        Returns:
+            Number of messages published
+        """
+        key = (device_type, device_id)
+        plan = self._plans.get(key)
+        if plan is None or len(plan.topics) < len(values):
+            base = self._build_topic(device_type, device_id)
+            start = len(plan.topics) if plan else 0
+            added = names()[start:]
+            topics = [f"{base}/{name}" for name, _ in added]
+            bands = [self.change_filter.band(field) for _, field in added]
+            if plan is None:
+                plan = self._plans[key] = PublishPlan(topics, bands)
+            else:
+                plan.extend(topics, bands)
+
+        now = time.time()
+        with self.lock:
+            changes, skipped = plan.changes(values, self.change_filter, now,
+                                            self.publish_mode == 'all')
+        self.messages_skipped += skipped
+
+        published = 0
+        for topic, value in changes:
+            if self.publish(topic, value):
+                published += 1
+        return published
+
+    def _inverter_topic_fields(self, modules: int) -> List[Tuple[str, str]]:
+        """Plan (topic name, data field) pairs of an inverter with the given MPPT module count"""
+        names = [(name, field) for field, name in self.INVERTER_FIELD_MAP.items()]
+        names += [('status', 'status'), ('alarm', 'status'), ('active', 'is_active'),
+                  ('model', 'model'), ('manufacturer', 'manufacturer'),
+                  ('serial_number', 'serial_number'), ('mppt/num_modules', 'num_modules')]
+        names += [(f'controls/{field}', f'controls.{field}') for field in self.CONTROLS_FIELDS]
+        for i in range(1, modules + 1):
+            names += [(f'mppt/string{i}/{name}', field) for field, name in self.MPPT_FIELD_MAP.items()]
+        return names
+
     def publish_inverter_data(self, device_id: str, data: Dict):
         """
         Publish all inverter data fields using SunSpec names.
 
+        With publish_format 'json' or 'both' the fields are (also) sent as
+        one JSON document on the device's state topic.
+
         Args:
             device_id: Device identifier
             data: Parsed inverter data dictionary
@@ -358,31 +838,34 @@ class MQTTPublisher:
 
         device_type = 'inverter'
 
-        # Publish measurement fields with SunSpec names
-        for py_field, sunspec_name in self.INVERTER_FIELD_MAP.items():
-            if py_field in data and data[py_field] is not None:
-                topic = self._build_topic(device_type, device_id, sunspec_name)
-                self.publish_if_changed(topic, data[py_field])
-
-        # Status info
-        if 'status' in data:
-            status = data['status']
-            # Status description
-            topic = self._build_topic(device_type, device_id, 'status')
-            self.publish_if_changed(topic, status.get('description', 'Unknown'))
-
-            # Status code (St)
-            topic = self._build_topic(device_type, device_id, 'St')
-            self.publish_if_changed(topic, status.get('code', 0))
-
-            # Alarm flag
-            topic = self._build_topic(device_type, device_id, 'alarm')
-            self.publish_if_changed(topic, status.get('alarm', False))
-
-        # Is active (producing power)
-        if 'is_active' in data:
-            topic = self._build_topic(device_type, device_id, 'active')
-            self.publish_if_changed(topic, data['is_active'])
+        if self.config.publish_format != 'fields':
+            self._publish_document(device_type, device_id, self._inverter_document(data))
+            if self.config.publish_format == 'json':
+                return
+
+        # Values in plan order: SunSpec fields, status, device info,
+        # controls (Model 123), then per-string MPPT data (Model 160)
+        status = data.get('status')
+        mppt = data.get('mppt') or {}
+        ctrl = data.get('controls') or {}
+        modules = mppt.get('modules') or []
+
+        values = list(map(data.get, self.INVERTER_FIELD_MAP))
+        values += [
+            status.get('description', 'Unknown') if status else None,
+            status.get('alarm', False) if status else None,
+            data.get('is_active'),
+            data.get('model') or None,
+            data.get('manufacturer') or None,
+            data.get('serial_number') or None,
+            mppt.get('num_modules'),
+        ]
+        values.extend(map(ctrl.get, self.CONTROLS_FIELDS))
+        for module in modules:
+            values.extend(map(module.get, self.MPPT_FIELD_MAP))
+
+        self._publish_planned(device_type, device_id, values,
+                              lambda: self._inverter_topic_fields(len(modules)))
 
         # Events (always publish if any exist, don't retain)
         if 'events' in data and data['events']:
@@ -393,71 +876,6 @@ class MQTTPublisher:
             topic = self._build_topic(device_type, device_id, 'events')
             self.publish_if_changed(topic, [])
 
-        # Device info fields
-        for field in ['model', 'manufacturer', 'serial_number']:
-            if field in data and data[field]:
-                topic = self._build_topic(device_type, device_id, field)
-                self.publish_if_changed(topic, data[field])
-
-        # MPPT string data (DC per string)
-        if 'mppt' in data and data['mppt']:
-            mppt = data['mppt']
-            # Global MPPT info
-            if 'num_modules' in mppt:
-                topic = self._build_topic(device_type, device_id, 'mppt/num_modules')
-                self.publish_if_changed(topic, mppt['num_modules'])
-
-            # Per-module data
-            if 'modules' in mppt:
-                for i, module in enumerate(mppt['modules'], 1):
-                    base = f'mppt/string{i}'
-                    if 'dc_current' in module:
-                        topic = self._build_topic(device_type, device_id, f'{base}/DCA')
-                        self.publish_if_changed(topic, module['dc_current'])
-                    if 'dc_voltage' in module:
-                        topic = self._build_topic(device_type, device_id, f'{base}/DCV')
-                        self.publish_if_changed(topic, module['dc_voltage'])
-                    if 'dc_power' in module:
-                        topic = self._build_topic(device_type, device_id, f'{base}/DCW')
-                        self.publish_if_changed(topic, module['dc_power'])
-                    if 'dc_energy' in module:
-                        topic = self._build_topic(device_type, device_id, f'{base}/DCWH')
-                        self.publish_if_changed(topic, module['dc_energy'])
-                    if 'temperature' in module and module['temperature'] is not None:
-                        topic = self._build_topic(device_type, device_id, f'{base}/Tmp')
-                        self.publish_if_changed(topic, module['temperature'])
-
-        # Controls data (Model 123 - Immediate Controls)
-        if 'controls' in data and data['controls']:
-            ctrl = data['controls']
-            base = 'controls'
-
-            # Connection status
-            if 'connected' in ctrl:
-                topic = self._build_topic(device_type, device_id, f'{base}/connected')
-                self.publish_if_changed(topic, ctrl['connected'])
-
-            # Power limit
-            if 'power_limit_pct' in ctrl and ctrl['power_limit_pct'] is not None:
-                topic = self._build_topic(device_type, device_id, f'{base}/power_limit_pct')
-                self.publish_if_changed(topic, ctrl['power_limit_pct'])
-            if 'power_limit_enabled' in ctrl:
-                topic = self._build_topic(device_type, device_id, f'{base}/power_limit_enabled')
-                self.publish_if_changed(topic, ctrl['power_limit_enabled'])
-
-            # Power factor
-            if 'power_factor' in ctrl and ctrl['power_factor'] is not None:
-                topic = self._build_topic(device_type, device_id, f'{base}/power_factor')
-                self.publish_if_changed(topic, ctrl['power_factor'])
-            if 'power_factor_enabled' in ctrl:
-                topic = self._build_topic(device_type, device_id, f'{base}/power_factor_enabled')
-                self.publish_if_changed(topic, ctrl['power_factor_enabled'])
-
-            # VAR control
-            if 'var_enabled' in ctrl:
-                topic = self._build_topic(device_type, device_id, f'{base}/var_enabled')
-                self.publish_if_changed(topic, ctrl['var_enabled'])
-
     def publish_meter_data(self, device_id: str, data: Dict):
         """
         Publish all meter data fields using SunSpec names.
@@ -471,17 +889,14 @@ class MQTTPublisher:
 
         device_type = 'meter'
 
-        # Publish measurement fields with SunSpec names
-        for py_field, sunspec_name in self.METER_FIELD_MAP.items():
-            if py_field in data and data[py_field] is not None:
-                topic = self._build_topic(device_type, device_id, sunspec_name)
-                self.publish_if_changed(topic, data[py_field])
+        if self.config.publish_format != 'fields':
+            self._publish_document(device_type, device_id, self._meter_document(data))
+            if self.config.publish_format == 'json':
+                return
 
-        # Device info fields
-        for field in ['model', 'serial_number']:
-            if field in data and data[field]:
-                topic = self._build_topic(device_type, device_id, field)
-                self.publish_if_changed(topic, data[field])
+        values = list(map(data.get, self.METER_FIELD_MAP))
+        values += [data.get('model') or None, data.get('serial_number') or None]
+        self._publish_planned(device_type, device_id, values, lambda: self.METER_TOPIC_FIELDS)
 
     def publish_storage_data(self, device_id: str, data: Dict):
         """
@@ -496,34 +911,22 @@ class MQTTPublisher:
 
         device_type = 'storage'
 
-        # Publish measurement fields with SunSpec names
-        for py_field, sunspec_name in self.STORAGE_FIELD_MAP.items():
-            if py_field in data and data[py_field] is not None:
-                topic = self._build_topic(device_type, device_id, sunspec_name)
-                self.publish_if_changed(topic, data[py_field])
-
-        # Charge status as human-readable string
-        if 'charge_status' in data and data['charge_status']:
-            status = data['charge_status']
-            topic = self._build_topic(device_type, device_id, 'status')
-            self.publish_if_changed(topic, status.get('name', 'UNKNOWN'))
-
-            topic = self._build_topic(device_type, device_id, 'status_description')
-            self.publish_if_changed(topic, status.get('description', ''))
-
-        # Grid charging as human-readable string
-        if 'grid_charging' in data:
-            topic = self._build_topic(device_type, device_id, 'grid_charging')
-            self.publish_if_changed(topic, data['grid_charging'])
-
-        # Control mode flags
-        if 'charge_limit_active' in data and data['charge_limit_active'] is not None:
-            topic = self._build_topic(device_type, device_id, 'charge_limit_active')
-            self.publish_if_changed(topic, data['charge_limit_active'])
-
-        if 'discharge_limit_active' in data and data['discharge_limit_active'] is not None:
-            topic = self._build_topic(device_type, device_id, 'discharge_limit_active')
-            self.publish_if_changed(topic, data['discharge_limit_active'])
+        if self.config.publish_format != 'fields':
+            self._publish_document(device_type, device_id, self._storage_document(data))
+            if self.config.publish_format == 'json':
+                return
+
+        # Charge status and grid charging as human-readable strings
+        status = data.get('charge_status')
+        values = list(map(data.get, self.STORAGE_FIELD_MAP))
+        values += [
+            status.get('name', 'UNKNOWN') if status else None,
+            status.get('description', '') if status else None,
+            data.get('grid_charging'),
+            data.get('charge_limit_active'),
+            data.get('discharge_limit_active'),
+        ]
+        self._publish_planned(device_type, device_id, values, lambda: self.STORAGE_TOPIC_FIELDS)
 
     def publish_status(self, status: str):
         """
@@ -544,6 +947,9 @@ class MQTTPublisher:
             'port': self.config.port,
             'messages_published': self.messages_published,
             'messages_skipped': self.messages_skipped,
+            'commands_received': self.commands_received,
+            'history_requests': self.history_requests,
             'publish_mode': self.publish_mode,
+            'publish_format': self.config.publish_format,
             'connection_count': self.connection_count
         }
@@ -0,0 +1,126 @@
+"""Adaptive request pacing for the Modbus link to the Fronius DataManager"""
+
+import time
+from typing import Dict
+
+
+class AdaptivePacer:
+    """
+    Tune the gap between Modbus requests from observed link behaviour.
+
+    The DataManager drops or mixes up responses when it is polled too
+    fast, but the safe rate varies between installations and with load.
+    Instead of fixed sleeps the gap is adjusted at runtime (AIMD):
+
+    - after CLEAN_STREAK successful responses in a row the gap shrinks
+      by DECREASE_FACTOR, as long as latency is not climbing
+    - every error, timeout or stale response multiplies the gap by
+      INCREASE_FACTOR (at least backoff_floor), so the link backs off fast
+
+    Not thread-safe on its own; ModbusConnection calls it under its lock.
+    """
+
+    DECREASE_FACTOR = 0.8    # Gap multiplier after a clean streak
+    INCREASE_FACTOR = 2.0    # Gap multiplier on failure
+    CLEAN_STREAK = 3         # Successes needed before speeding up
+    LATENCY_ALPHA = 0.2      # EWMA weight for latency and error rate
+    LATENCY_RISE = 2.0       # Hold the gap while latency > baseline * this
+    MIN_STEP = 0.005         # Gaps below this snap to min_gap (seconds)
+
+    def __init__(self, min_gap: float = 0.0, max_gap: float = 2.0,
+                 initial_gap: float = 0.2, backoff_floor: float = 0.1):
+        """
+        Args:
+            min_gap: Smallest gap between requests (seconds)
+            max_gap: Largest gap between requests (seconds)
+            initial_gap: Starting gap; adapted from the first response on
+            backoff_floor: Minimum gap after a failure (seconds)
+        """
+        self.min_gap = max(0.0, min_gap)
+        self.max_gap = max(self.min_gap, max_gap)
+        self.backoff_floor = min(max(backoff_floor, self.min_gap), self.max_gap)
+        self.gap = min(max(initial_gap, self.min_gap), self.max_gap)
+
+        self.latency = None            # EWMA response latency (seconds)
+        self.latency_baseline = None   # Lowest latency EWMA seen
+        self.error_rate = 0.0          # EWMA of failures (0..1)
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.stale = 0
+        self.backoffs = 0
+        self.waited = 0.0              # Total time spent pacing (seconds)
+        self._streak = 0
+        self._last_done = 0.0
+
+    def wait(self):
+        """Sleep until the current gap has passed since the last response."""
+        remaining = self._last_done + self.gap - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+            self.waited += remaining
+
+    def record_success(self, latency: float):
+        """
+        Record a successful response.
+
+        Args:
+            latency: Request round-trip time in seconds
+        """
+        self._last_done = time.monotonic()
+        self.successes += 1
+        self.error_rate *= 1 - self.LATENCY_ALPHA
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.LATENCY_ALPHA * (latency - self.latency)
+        if self.latency_baseline is None or self.latency < self.latency_baseline:
+            self.latency_baseline = self.latency
+
+        self._streak += 1
+        if self._streak < self.CLEAN_STREAK:
+            return
+        self._streak = 0
+
+        # DataManager queueing shows up as rising latency before errors do
+        if self.latency > self.latency_baseline * self.LATENCY_RISE:
+            return
+
+        gap = self.gap * self.DECREASE_FACTOR
+        if gap - self.min_gap < self.MIN_STEP:
+            gap = self.min_gap
+        self.gap = gap
+
+    def record_failure(self, timeout: bool = False, stale: bool = False):
+        """
+        Record a failed request and back off.
+
+        Args:
+            timeout: No response (connection error or timeout)
+            stale: Response belonged to an earlier request
+        """
+        self._last_done = time.monotonic()
+        self.failures += 1
+        if timeout:
+            self.timeouts += 1
+        if stale:
+            self.stale += 1
+        self.error_rate += self.LATENCY_ALPHA * (1.0 - self.error_rate)
+        self._streak = 0
+        self.backoffs += 1
+        self.gap = min(max(self.gap * self.INCREASE_FACTOR, self.backoff_floor), self.max_gap)
+
+    def get_stats(self) -> Dict:
+        """Return current pacing state"""
+        return {
+            'gap_ms': round(self.gap * 1000, 1),
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'successes': self.successes,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'stale': self.stale,
+            'backoffs': self.backoffs,
+            'waited_s': round(self.waited, 1),
+        }
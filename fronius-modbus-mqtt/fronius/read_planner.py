@@ -0,0 +1,184 @@
+"""Read planning for SunSpec models: coalesce and split register reads per device"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+# Modbus limit for Read Holding Registers (function code 0x03)
+MODBUS_MAX_REGISTERS = 125
+
+
+@dataclass
+class ModelSpan:
+    """
+    A SunSpec model (or part of one) that a device poll needs.
+
+    Repeating models (e.g. Model 160 MPPT) are described by a fixed part
+    followed by repeat_count blocks of repeat_size registers. The planner
+    only ever splits such a span at block boundaries, so every read holds
+    whole modules.
+
+    cached_tail holds the last registers of the span (usually scale
+    factors) as known from an earlier read. The planner leaves them out of
+    the reads, unless reading through them is cheaper than a new request.
+    """
+    name: str
+    address: int                      # First register (usually the model ID)
+    length: int                       # Fixed part length in registers
+    model_id: Optional[int] = None    # Expected value at address (None = no check)
+    repeat_size: int = 0              # Registers per repeating block
+    repeat_count: int = 0             # Number of repeating blocks
+    cached_tail: Tuple[int, ...] = () # Known trailing registers (not read)
+
+    @property
+    def count(self) -> int:
+        """Total register count including repeating blocks"""
+        return self.length + self.repeat_size * self.repeat_count
+
+    @property
+    def end(self) -> int:
+        """First register after the span"""
+        return self.address + self.count
+
+    def segments(self) -> List[Tuple[int, int]]:
+        """Atomic (address, count) pieces that must not be split"""
+        segments = [(self.address, self.length)]
+        address = self.address + self.length
+        for _ in range(self.repeat_count):
+            segments.append((address, self.repeat_size))
+            address += self.repeat_size
+        if self.cached_tail:
+            address, count = segments[-1]
+            segments[-1] = (address, max(0, count - len(self.cached_tail)))
+        return segments
+
+
+@dataclass
+class ReadRequest:
+    """A single Modbus read covering one or more spans"""
+    address: int
+    count: int
+    spans: List[str] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+
+class ReadPlanner:
+    """
+    Turn the spans a device needs into the fewest Modbus reads.
+
+    Atomic segments are sorted by address and merged greedily: a segment
+    joins the current read when the gap to it is at most max_gap registers
+    and the read stays within max_registers. Segments larger than
+    max_registers (e.g. a repeating block wider than the limit) are
+    chunked.
+    """
+
+    def __init__(self, max_registers: int = MODBUS_MAX_REGISTERS, max_gap: int = 16):
+        """
+        Args:
+            max_registers: Maximum registers per read (1-125)
+            max_gap: Largest run of unneeded registers worth reading through
+                instead of starting a new request
+        """
+        self.max_registers = max(1, min(max_registers, MODBUS_MAX_REGISTERS))
+        self.max_gap = max(0, max_gap)
+        self._cache: Dict[tuple, List[ReadRequest]] = {}
+
+    def plan(self, spans: List[ModelSpan]) -> List[ReadRequest]:
+        """
+        Build the read plan for a set of spans.
+
+        Plans are cached per span layout, so calling this every poll cycle
+        is cheap.
+
+        Args:
+            spans: Model spans the device needs this cycle
+
+        Returns:
+            Read requests ordered by address
+        """
+        key = tuple((s.name, s.address, s.length, s.repeat_size, s.repeat_count,
+                     len(s.cached_tail)) for s in spans)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        segments = []
+        for span in spans:
+            for address, count in span.segments():
+                if count > 0:
+                    segments.append((address, count, span.name))
+        segments.sort()
+
+        requests: List[ReadRequest] = []
+        current: Optional[ReadRequest] = None
+        for address, count, name in segments:
+            end = address + count
+            if (current is not None
+                    and address - current.end <= self.max_gap
+                    and max(end, current.end) - current.address <= self.max_registers):
+                current.count = max(end, current.end) - current.address
+                if name not in current.spans:
+                    current.spans.append(name)
+                continue
+
+            # Start a new request, chunking segments above the limit
+            while end - address > self.max_registers:
+                requests.append(ReadRequest(address, self.max_registers, [name]))
+                address += self.max_registers
+            current = ReadRequest(address, end - address, [name])
+            requests.append(current)
+
+        if len(self._cache) >= 64:
+            self._cache.clear()
+        self._cache[key] = requests
+        return requests
+
+    def plan_unmerged(self, spans: List[ModelSpan]) -> List[ReadRequest]:
+        """
+        Build a plan that never reads through gaps or across spans.
+
+        Used as a fallback when a coalesced read is rejected by the device.
+        """
+        requests: List[ReadRequest] = []
+        for span in spans:
+            planner = ReadPlanner(self.max_registers, 0)
+            requests.extend(planner.plan([span]))
+        return requests
+
+
+class RegisterImage:
+    """Registers collected from the reads of one plan, addressable by register"""
+
+    def __init__(self):
+        self._blocks: List[Tuple[int, List[int]]] = []
+
+    def add(self, address: int, registers: List[int]):
+        """Store the result of a read starting at address"""
+        self._blocks.append((address, registers))
+
+    def get(self, address: int, count: int) -> Optional[List[int]]:
+        """
+        Get count registers starting at address.
+
+        Ranges that span adjacent reads are stitched together.
+
+        Returns:
+            Register list, or None if any register in the range was not read
+        """
+        result: List[int] = []
+        wanted = address
+        end = address + count
+        while wanted < end:
+            for start, registers in self._blocks:
+                if start <= wanted < start + len(registers):
+                    chunk = registers[wanted - start:end - start]
+                    result.extend(chunk)
+                    wanted += len(chunk)
+                    break
+            else:
+                return None
+        return result
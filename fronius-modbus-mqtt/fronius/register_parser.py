@@ -4,15 +4,27 @@ import struct
 import json
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
+from .block_decoder import BlockDecoder, compile_section, compile_sections
 from .logging_setup import get_logger
 
 
+class FrozenDict(dict):
+    """Read-only dict for results shared between calls (still JSON serializable)."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("shared parser result is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
 class RegisterParser:
     """
     Parse Modbus register values with SunSpec conventions.
 
     Features:
     - Scale factor application
+    - Table-driven block decoding compiled from registers.json
     - Data type conversion (int16, uint16, int32, uint32, string, etc.)
     - Event flag bitmask parsing
     - State code translation
@@ -24,6 +36,24 @@ class RegisterParser:
     NOT_IMPLEMENTED_UINT32 = 0xFFFFFFFF
     NOT_IMPLEMENTED_INT32 = 0x80000000
 
+    # Model 160 layout: 10 fixed registers, then 20 per module
+    MPPT_FIXED_LENGTH = 10
+    MPPT_MODULE_LENGTH = 20
+
+    EVENT_REGISTERS = ('EvtVnd1', 'EvtVnd2', 'EvtVnd3', 'EvtVnd4')
+    EVENT_CACHE_SIZE = 1024     # Distinct event flag combinations kept
+
+    # Storage charge status enumeration (Model 124 ChaSt)
+    CHARGE_STATUS = {
+        1: {'name': 'OFF', 'description': 'Storage is off'},
+        2: {'name': 'EMPTY', 'description': 'Storage is empty'},
+        3: {'name': 'DISCHARGING', 'description': 'Storage is discharging'},
+        4: {'name': 'CHARGING', 'description': 'Storage is charging'},
+        5: {'name': 'FULL', 'description': 'Storage is full'},
+        6: {'name': 'HOLDING', 'description': 'Storage is holding charge'},
+        7: {'name': 'TESTING', 'description': 'Storage is in test mode'},
+    }
+
     def __init__(self, register_map: Dict):
         """
         Initialize parser with register map.
@@ -37,6 +67,44 @@ class RegisterParser:
         self.status_codes = register_map.get('status_codes', {})
         self.state_codes = register_map.get('state_codes', {})
 
+        # Event flags: bit -> event tables per inverter type, decoded
+        # combinations of the four EvtVnd registers memoized
+        self._event_tables: Dict[str, tuple] = {}
+        self._event_cache: Dict[tuple, tuple] = {}
+
+        # Compile measurement blocks once; parsing is then a table lookup.
+        # Int+SF and float models have their own block per model ID.
+        inverter = register_map.get('inverter', {})
+        self.inverter_decoders: Dict[int, BlockDecoder] = {}
+        for types, section in (('model_types', 'measurements'),
+                               ('model_types_float', 'measurements_float')):
+            for model_id in inverter.get(types, {}):
+                decoder = compile_section(inverter.get(section), int(model_id))
+                if decoder:
+                    self.inverter_decoders[int(model_id)] = decoder
+
+        meter = register_map.get('meter', {})
+        self.meter_decoder = compile_section(meter.get('measurements_int_sf'))
+        self.meter_decoders: Dict[int, BlockDecoder] = {}
+        for model_id in meter.get('model_types', {}):
+            if self.meter_decoder:
+                self.meter_decoders[int(model_id)] = self.meter_decoder
+        meter_float_decoder = compile_section(meter.get('measurements_float'))
+        for model_id in meter.get('model_types_float', {}):
+            if meter_float_decoder:
+                self.meter_decoders[int(model_id)] = meter_float_decoder
+        self.storage_decoder = compile_section(
+            register_map.get('storage', {}).get('measurements')
+        )
+
+        # Model 160: fixed part (header, scale factors, global data) and one
+        # decoder shared by all repeating module blocks
+        mppt = register_map.get('mppt', {})
+        self.mppt_decoder = compile_sections('MPPT Model 160', [
+            mppt.get('model_header'), mppt.get('scale_factors'), mppt.get('global')
+        ])
+        self.mppt_module_decoder = compile_section(mppt.get('module1'))
+
     def _load_event_flags(self) -> Dict:
         """Load event flags from FroniusEventFlags.json"""
         try:
@@ -173,97 +241,50 @@ class RegisterParser:
         except (OverflowError, ValueError):
             return None
 
+    def is_float_model(self, model_id: int) -> bool:
+        """Check whether a model ID uses the float register map (111-113, 211-214)."""
+        return (str(model_id) in self.register_map.get('inverter', {}).get('model_types_float', {}) or
+                str(model_id) in self.register_map.get('meter', {}).get('model_types_float', {}))
+
+    def measurement_length(self, device_type: str, model_id: int) -> Optional[int]:
+        """
+        Registers after the model header that a measurement block needs.
+
+        Args:
+            device_type: 'inverter' or 'meter'
+            model_id: SunSpec model ID
+
+        Returns:
+            Block length in registers, or None for unknown models
+        """
+        decoders = self.inverter_decoders if device_type == 'inverter' else self.meter_decoders
+        decoder = decoders.get(model_id)
+        return decoder.length if decoder else None
+
     def parse_inverter_measurements(self, registers: List[int], model_id: int = 103) -> Dict:
         """
-        Parse inverter measurement registers with scale factors.
+        Parse inverter measurement registers (int+SF or float model).
 
         Args:
             registers: Raw register values starting at address 40072
-            model_id: SunSpec model ID (101=single, 102=split, 103=three-phase)
+            model_id: SunSpec model ID (101-103 int+SF, 111-113 float;
+                single/split/three-phase)
 
         Returns:
             Dictionary of parsed measurements with units
         """
-        data = {}
-
-        # Validate minimum register count
-        if len(registers) < 49:
-            self.log.warning(f"Inverter data incomplete: got {len(registers)} registers, expected 49")
-            return data
-
-        # Extract scale factors (relative offsets from 40072)
-        sf_a = self.decode_sunssf(registers[4])      # A_SF at 40076
-        sf_v = self.decode_sunssf(registers[11])     # V_SF at 40083
-        sf_w = self.decode_sunssf(registers[13])     # W_SF at 40085
-        sf_hz = self.decode_sunssf(registers[15])    # Hz_SF at 40087
-        sf_va = self.decode_sunssf(registers[17])    # VA_SF at 40089
-        sf_var = self.decode_sunssf(registers[19])   # VAr_SF at 40091
-        sf_pf = self.decode_sunssf(registers[21])    # PF_SF at 40093
-        sf_wh = self.decode_sunssf(registers[24])    # WH_SF at 40096
-        sf_dca = self.decode_sunssf(registers[26])   # DCA_SF at 40098
-        sf_dcv = self.decode_sunssf(registers[28])   # DCV_SF at 40100
-        sf_dcw = self.decode_sunssf(registers[30])   # DCW_SF at 40102
-        sf_tmp = self.decode_sunssf(registers[35])   # Tmp_SF at 40107
-
-        # AC Current
-        data['ac_current'] = self.apply_scale_factor(self.decode_uint16(registers[0]), sf_a)
-        data['ac_current_a'] = self.apply_scale_factor(self.decode_uint16(registers[1]), sf_a)
-        if model_id in [102, 103]:
-            data['ac_current_b'] = self.apply_scale_factor(self.decode_uint16(registers[2]), sf_a)
-        if model_id == 103:
-            data['ac_current_c'] = self.apply_scale_factor(self.decode_uint16(registers[3]), sf_a)
-
-        # AC Voltage
-        data['ac_voltage_ab'] = self.apply_scale_factor(self.decode_uint16(registers[5]), sf_v)
-        if model_id == 103:
-            data['ac_voltage_bc'] = self.apply_scale_factor(self.decode_uint16(registers[6]), sf_v)
-            data['ac_voltage_ca'] = self.apply_scale_factor(self.decode_uint16(registers[7]), sf_v)
-        data['ac_voltage_an'] = self.apply_scale_factor(self.decode_uint16(registers[8]), sf_v)
-        if model_id in [102, 103]:
-            data['ac_voltage_bn'] = self.apply_scale_factor(self.decode_uint16(registers[9]), sf_v)
-        if model_id == 103:
-            data['ac_voltage_cn'] = self.apply_scale_factor(self.decode_uint16(registers[10]), sf_v)
-
-        # AC Power
-        data['ac_power'] = self.apply_scale_factor(self.decode_int16(registers[12]), sf_w)
-
-        # AC Frequency
-        data['ac_frequency'] = self.apply_scale_factor(self.decode_uint16(registers[14]), sf_hz)
-
-        # Apparent/Reactive Power
-        data['apparent_power'] = self.apply_scale_factor(self.decode_int16(registers[16]), sf_va)
-        data['reactive_power'] = self.apply_scale_factor(self.decode_int16(registers[18]), sf_var)
-        data['power_factor'] = self.apply_scale_factor(self.decode_int16(registers[20]), sf_pf)
-
-        # Lifetime Energy
-        data['lifetime_energy'] = self.apply_scale_factor(
-            self.decode_acc32(registers[22:24]), sf_wh
-        )
+        decoder = self.inverter_decoders.get(model_id) or self.inverter_decoders.get(103)
+        if decoder is None:
+            self.log.warning("Inverter register map not loaded")
+            return {}
 
-        # DC Side
-        data['dc_current'] = self.apply_scale_factor(self.decode_uint16(registers[25]), sf_dca)
-        data['dc_voltage'] = self.apply_scale_factor(self.decode_uint16(registers[27]), sf_dcv)
-        data['dc_power'] = self.apply_scale_factor(self.decode_int16(registers[29]), sf_dcw)
-
-        # Temperatures
-        data['temp_cabinet'] = self.apply_scale_factor(self.decode_int16(registers[31]), sf_tmp)
-        data['temp_heatsink'] = self.apply_scale_factor(self.decode_int16(registers[32]), sf_tmp)
-        data['temp_transformer'] = self.apply_scale_factor(self.decode_int16(registers[33]), sf_tmp)
-        data['temp_other'] = self.apply_scale_factor(self.decode_int16(registers[34]), sf_tmp)
-
-        # Operating State
-        data['status_code'] = registers[36]
-        data['status_vendor'] = registers[37]
-
-        # Event Flags
-        data['evt1'] = self.decode_uint32(registers[38:40])
-        data['evt2'] = self.decode_uint32(registers[40:42])
-        data['evt_vnd1'] = self.decode_uint32(registers[42:44])
-        data['evt_vnd2'] = self.decode_uint32(registers[44:46])
-        data['evt_vnd3'] = self.decode_uint32(registers[46:48])
-        data['evt_vnd4'] = self.decode_uint32(registers[48:50]) if len(registers) > 48 else 0
+        # Validate minimum register count (the last event register may be cut)
+        expected = decoder.length - 1
+        if len(registers) < expected:
+            self.log.warning(f"Inverter data incomplete: got {len(registers)} registers, expected {expected}")
+            return {}
 
-        return data
+        return decoder.decode(registers)
 
     def parse_mppt_measurements(self, registers: List[int]) -> Dict:
         """
@@ -292,6 +313,10 @@ class RegisterParser:
             +17: DCSt
             +18-19: DCEvt (32-bit)
 
+        Any number of modules is supported; modules beyond the supplied
+        registers are skipped, as are modules whose DC voltage is not
+        implemented (e.g. the unused second input of single-MPPT devices).
+
         Args:
             registers: Raw register values starting at address 40254
 
@@ -300,7 +325,7 @@ class RegisterParser:
         """
         data = {}
 
-        if len(registers) < 10:
+        if len(registers) < self.MPPT_FIXED_LENGTH:
             return data
 
         model_id = registers[0]
@@ -309,64 +334,29 @@ class RegisterParser:
             self.log.debug(f"MPPT: Expected model 160, got {model_id}")
             return data
 
-        model_length = registers[1]
-        self.log.debug(f"MPPT: Model 160 found, length={model_length}")
-
-        # Extract scale factors (offsets 2-5)
-        sf_dca = self.decode_sunssf(registers[2])
-        sf_dcv = self.decode_sunssf(registers[3])
-        sf_dcw = self.decode_sunssf(registers[4])
-        sf_dcwh = self.decode_sunssf(registers[5])
+        if self.mppt_decoder is None or self.mppt_module_decoder is None:
+            self.log.warning("MPPT register map not loaded")
+            return data
 
-        self.log.debug(f"MPPT scale factors: DCA={sf_dca}, DCV={sf_dcv}, DCW={sf_dcw}, DCWH={sf_dcwh}")
+        fixed = registers[:self.MPPT_FIXED_LENGTH]
+        data.update(self.mppt_decoder.decode(fixed))
+        scale_factors = self.mppt_decoder.decode_scale_factors(fixed)
 
-        # Global MPPT data
-        data['dc_events'] = self.decode_uint32(registers[6:8])
-        data['num_modules'] = self.decode_uint16(registers[8])
-        data['timestamp_period'] = self.decode_uint16(registers[9])
+        num_modules = data.get('num_modules') or 0
+        self.log.debug(f"MPPT: Model 160 length={registers[1]}, num_modules={num_modules}")
 
-        # Per-module data starts at offset 10
-        # Each module has 20 registers
-        module_offset = 10
-        module_size = 20
         modules = []
-
-        num_modules = data.get('num_modules', 0) or 0
-        self.log.debug(f"MPPT: num_modules={num_modules}")
-
-        for i in range(min(num_modules, 4)):  # Max 4 MPPT strings typically
-            mod_start = module_offset + (i * module_size)
-            if mod_start + module_size > len(registers):
-                self.log.debug(f"MPPT: Not enough registers for module {i+1}, need {mod_start + module_size}, have {len(registers)}")
+        for i in range(num_modules):
+            mod_start = self.MPPT_FIXED_LENGTH + i * self.MPPT_MODULE_LENGTH
+            block = registers[mod_start:mod_start + self.MPPT_MODULE_LENGTH]
+            if len(block) <= 10:  # DCV at offset 10 not covered
+                self.log.debug(f"MPPT: Not enough registers for module {i+1}, have {len(registers)}")
                 break
 
-            # Module structure:
-            # +0: ID
-            # +1-8: IDStr (string, 8 registers)
-            # +9: DCA
-            # +10: DCV
-            # +11: DCW
-            # +12-13: DCWH
-            # +14-15: Tms
-            # +16: Tmp
-            # +17: DCSt
-            # +18-19: DCEvt
-            module = {
-                'id': registers[mod_start],
-                'dc_current': self.apply_scale_factor(
-                    self.decode_uint16(registers[mod_start + 9]), sf_dca
-                ),
-                'dc_voltage': self.apply_scale_factor(
-                    self.decode_uint16(registers[mod_start + 10]), sf_dcv
-                ),
-                'dc_power': self.apply_scale_factor(
-                    self.decode_uint16(registers[mod_start + 11]), sf_dcw
-                ),
-                'dc_energy': self.apply_scale_factor(
-                    self.decode_acc32(registers[mod_start + 12:mod_start + 14]), sf_dcwh
-                ),
-                'operating_state': self.decode_uint16(registers[mod_start + 17])
-            }
+            # Every reported module is kept (values not implemented are None),
+            # so MQTT topics by position and InfluxDB string tags stay aligned
+            module = self.mppt_module_decoder.decode(block, scale_factors)
+            module['id'] = i + 1
             modules.append(module)
             self.log.debug(f"MPPT Module {i+1}: V={module['dc_voltage']}, I={module['dc_current']}, P={module['dc_power']}")
 
@@ -374,106 +364,29 @@ class RegisterParser:
 
         return data
 
-    def parse_meter_measurements(self, registers: List[int]) -> Dict:
+    def parse_meter_measurements(self, registers: List[int], model_id: int = None) -> Dict:
         """
-        Parse meter measurement registers (int + scale factor format).
+        Parse meter measurement registers (int+SF or float model).
 
         Args:
             registers: Raw register values starting at address 40072
+            model_id: SunSpec model ID (201-204 int+SF, 211-214 float;
+                default int+SF)
 
         Returns:
             Dictionary of parsed measurements with units
         """
-        data = {}
+        decoder = self.meter_decoders.get(model_id) or self.meter_decoder
+        if decoder is None:
+            self.log.warning("Meter register map not loaded")
+            return {}
 
         # Validate minimum register count
-        if len(registers) < 53:
-            self.log.warning(f"Meter data incomplete: got {len(registers)} registers, expected 53")
-            return data
-
-        # Extract scale factors
-        sf_a = self.decode_sunssf(registers[4])      # A_SF at 40076
-        sf_v = self.decode_sunssf(registers[13])     # V_SF at 40085
-        sf_hz = self.decode_sunssf(registers[15])    # Hz_SF at 40087
-        sf_w = self.decode_sunssf(registers[20])     # W_SF at 40092
-        sf_va = self.decode_sunssf(registers[25])    # VA_SF at 40097
-        sf_var = self.decode_sunssf(registers[30])   # VAR_SF at 40102
-        sf_pf = self.decode_sunssf(registers[35])    # PF_SF at 40107
-        sf_wh = self.decode_sunssf(registers[52])    # TotWh_SF at 40124
-
-        # Currents
-        data['current_total'] = self.apply_scale_factor(self.decode_int16(registers[0]), sf_a)
-        data['current_a'] = self.apply_scale_factor(self.decode_int16(registers[1]), sf_a)
-        data['current_b'] = self.apply_scale_factor(self.decode_int16(registers[2]), sf_a)
-        data['current_c'] = self.apply_scale_factor(self.decode_int16(registers[3]), sf_a)
-
-        # Voltages LN
-        data['voltage_ln_avg'] = self.apply_scale_factor(self.decode_int16(registers[5]), sf_v)
-        data['voltage_an'] = self.apply_scale_factor(self.decode_int16(registers[6]), sf_v)
-        data['voltage_bn'] = self.apply_scale_factor(self.decode_int16(registers[7]), sf_v)
-        data['voltage_cn'] = self.apply_scale_factor(self.decode_int16(registers[8]), sf_v)
-
-        # Voltages LL
-        data['voltage_ll_avg'] = self.apply_scale_factor(self.decode_int16(registers[9]), sf_v)
-        data['voltage_ab'] = self.apply_scale_factor(self.decode_int16(registers[10]), sf_v)
-        data['voltage_bc'] = self.apply_scale_factor(self.decode_int16(registers[11]), sf_v)
-        data['voltage_ca'] = self.apply_scale_factor(self.decode_int16(registers[12]), sf_v)
-
-        # Frequency
-        data['frequency'] = self.apply_scale_factor(self.decode_int16(registers[14]), sf_hz)
-
-        # Power
-        data['power_total'] = self.apply_scale_factor(self.decode_int16(registers[16]), sf_w)
-        data['power_a'] = self.apply_scale_factor(self.decode_int16(registers[17]), sf_w)
-        data['power_b'] = self.apply_scale_factor(self.decode_int16(registers[18]), sf_w)
-        data['power_c'] = self.apply_scale_factor(self.decode_int16(registers[19]), sf_w)
-
-        # Apparent Power
-        data['va_total'] = self.apply_scale_factor(self.decode_int16(registers[21]), sf_va)
-        data['va_a'] = self.apply_scale_factor(self.decode_int16(registers[22]), sf_va)
-        data['va_b'] = self.apply_scale_factor(self.decode_int16(registers[23]), sf_va)
-        data['va_c'] = self.apply_scale_factor(self.decode_int16(registers[24]), sf_va)
-
-        # Reactive Power
-        data['var_total'] = self.apply_scale_factor(self.decode_int16(registers[26]), sf_var)
-        data['var_a'] = self.apply_scale_factor(self.decode_int16(registers[27]), sf_var)
-        data['var_b'] = self.apply_scale_factor(self.decode_int16(registers[28]), sf_var)
-        data['var_c'] = self.apply_scale_factor(self.decode_int16(registers[29]), sf_var)
-
-        # Power Factor
-        data['pf_avg'] = self.apply_scale_factor(self.decode_int16(registers[31]), sf_pf)
-        data['pf_a'] = self.apply_scale_factor(self.decode_int16(registers[32]), sf_pf)
-        data['pf_b'] = self.apply_scale_factor(self.decode_int16(registers[33]), sf_pf)
-        data['pf_c'] = self.apply_scale_factor(self.decode_int16(registers[34]), sf_pf)
-
-        # Energy (exported = to grid, imported = from grid)
-        data['energy_exported'] = self.apply_scale_factor(
-            self.decode_acc32(registers[36:38]), sf_wh
-        )
-        data['energy_exported_a'] = self.apply_scale_factor(
-            self.decode_acc32(registers[38:40]), sf_wh
-        )
-        data['energy_exported_b'] = self.apply_scale_factor(
-            self.decode_acc32(registers[40:42]), sf_wh
-        )
-        data['energy_exported_c'] = self.apply_scale_factor(
-            self.decode_acc32(registers[42:44]), sf_wh
-        )
-
-        data['energy_imported'] = self.apply_scale_factor(
-            self.decode_acc32(registers[44:46]), sf_wh
-        )
-        data['energy_imported_a'] = self.apply_scale_factor(
-            self.decode_acc32(registers[46:48]), sf_wh
-        )
-        data['energy_imported_b'] = self.apply_scale_factor(
-            self.decode_acc32(registers[48:50]), sf_wh
-        )
-        data['energy_imported_c'] = self.apply_scale_factor(
-            self.decode_acc32(registers[50:52]), sf_wh
-        )
+        if len(registers) < decoder.length:
+            self.log.warning(f"Meter data incomplete: got {len(registers)} registers, expected {decoder.length}")
+            return {}
 
-        return data
+        return decoder.decode(registers)
 
     def decode_state_codes(self, codes_str: str) -> List[Dict]:
         """
@@ -499,54 +412,74 @@ class RegisterParser:
                 })
         return decoded
 
+    def _event_definitions(self, inverter_type: str) -> Optional[Dict]:
+        """Flag definitions for an inverter type, falling back to 'all'."""
+        evt_def = None
+        for device in self.event_flags.get('devices', []):
+            if inverter_type in device:
+                return device[inverter_type]
+            elif 'all' in device:
+                evt_def = device['all']
+        return evt_def
+
+    def _event_table(self, inverter_type: str) -> Tuple[Tuple[Tuple[int, 'FrozenDict'], ...], ...]:
+        """
+        Per EvtVnd register: (bit mask, event) pairs for an inverter type,
+        compiled once from FroniusEventFlags.json.
+        """
+        table = self._event_tables.get(inverter_type)
+        if table is not None:
+            return table
+        evt_def = self._event_definitions(inverter_type) or {}
+        table = tuple(
+            tuple(
+                (flag['dec'], FrozenDict(
+                    register=evt_name,
+                    bit_value=flag['dec'],
+                    codes=flag.get('codes', ''),
+                    codes_decoded=tuple(FrozenDict(code) for code in
+                                        self.decode_state_codes(flag.get('codes', ''))),
+                    **{'class': flag.get('class', 'Unknown')},
+                    hex=flag.get('hex', 0)
+                ))
+                for flag in evt_def.get(evt_name, [])
+            )
+            for evt_name in self.EVENT_REGISTERS
+        )
+        self._event_tables[inverter_type] = table
+        return table
+
     def parse_event_flags(self, evt_vnd1: int, evt_vnd2: int, evt_vnd3: int,
-                          evt_vnd4: int = 0, inverter_type: str = 'all') -> List[Dict]:
+                          evt_vnd4: int = 0, inverter_type: str = 'all') -> Tuple[Dict, ...]:
         """
         Parse vendor event flags into human-readable format.
 
+        Results are memoized per (inverter_type, evt_vnd1..4); the returned
+        tuple and its events are shared between calls and read-only.
+
         Args:
             evt_vnd1-4: Event flag register values
             inverter_type: Model type for event lookup (symo, primo, galvo, igplus, all)
 
         Returns:
-            List of active event dictionaries with class, codes, and decoded descriptions
+            Active events (dicts with register, class, codes and decoded descriptions)
         """
-        events = []
-
-        # Get event flag definitions
-        devices = self.event_flags.get('devices', [])
-        evt_def = None
-
-        # Find matching device definition
-        for device in devices:
-            if inverter_type in device:
-                evt_def = device[inverter_type]
-                break
-            elif 'all' in device:
-                evt_def = device['all']
-
-        if not evt_def:
+        if not (evt_vnd1 or evt_vnd2 or evt_vnd3 or evt_vnd4):
+            return ()
+        key = (inverter_type, evt_vnd1, evt_vnd2, evt_vnd3, evt_vnd4)
+        events = self._event_cache.get(key)
+        if events is not None:
             return events
 
-        # Parse each EvtVnd register
-        for evt_name, evt_value in [('EvtVnd1', evt_vnd1), ('EvtVnd2', evt_vnd2),
-                                     ('EvtVnd3', evt_vnd3), ('EvtVnd4', evt_vnd4)]:
-            if evt_value is None or evt_value == 0:
-                continue
-
-            flags = evt_def.get(evt_name, [])
-            for flag in flags:
-                if evt_value & flag['dec']:
-                    codes_str = flag.get('codes', '')
-                    events.append({
-                        'register': evt_name,
-                        'bit_value': flag['dec'],
-                        'codes': codes_str,
-                        'codes_decoded': self.decode_state_codes(codes_str),
-                        'class': flag.get('class', 'Unknown'),
-                        'hex': flag.get('hex', 0)
-                    })
-
+        table = self._event_table(inverter_type)
+        events = tuple(
+            event
+            for flags, value in zip(table, key[1:]) if value
+            for bit, event in flags if value & bit
+        )
+        if len(self._event_cache) >= self.EVENT_CACHE_SIZE:
+            self._event_cache.clear()
+        self._event_cache[key] = events
         return events
 
     def parse_status(self, status_value: int) -> Dict:
@@ -638,78 +571,26 @@ class RegisterParser:
         Returns:
             Dictionary of parsed storage measurements
         """
-        data = {}
-
         if len(registers) < 24:
             self.log.warning(f"Storage data incomplete: got {len(registers)} registers, expected 24")
-            return data
+            return {}
 
-        # Extract scale factors (offsets 16-23)
-        sf_wcha_max = self.decode_sunssf(registers[16])
-        sf_wcha_gra = self.decode_sunssf(registers[17])
-        sf_vacha_max = self.decode_sunssf(registers[18])
-        sf_min_rsv = self.decode_sunssf(registers[19])
-        sf_cha_state = self.decode_sunssf(registers[20])
-        sf_stor_aval = self.decode_sunssf(registers[21])
-        sf_in_bat_v = self.decode_sunssf(registers[22])
-        sf_in_out_w_rte = self.decode_sunssf(registers[23])
-
-        # Control/Setpoint registers (writable)
-        data['max_charge_power'] = self.apply_scale_factor(
-            self.decode_uint16(registers[0]), sf_wcha_max
-        )
-        data['charge_ramp_rate'] = self.apply_scale_factor(
-            self.decode_uint16(registers[1]), sf_wcha_gra
-        )
-        data['discharge_ramp_rate'] = self.apply_scale_factor(
-            self.decode_uint16(registers[2]), sf_wcha_gra
-        )
+        if self.storage_decoder is None:
+            self.log.warning("Storage register map not loaded")
+            return {}
+
+        data = self.storage_decoder.decode(registers)
 
         # Storage control mode (bitfield)
-        stor_ctl_mod = self.decode_uint16(registers[3])
-        data['storage_control_mode'] = stor_ctl_mod
+        stor_ctl_mod = data.get('storage_control_mode')
         data['charge_limit_active'] = bool(stor_ctl_mod & 0x01) if stor_ctl_mod is not None else None
         data['discharge_limit_active'] = bool(stor_ctl_mod & 0x02) if stor_ctl_mod is not None else None
 
-        data['max_charge_va'] = self.apply_scale_factor(
-            self.decode_uint16(registers[4]), sf_vacha_max
-        )
-        data['min_reserve_pct'] = self.apply_scale_factor(
-            self.decode_uint16(registers[5]), sf_min_rsv
-        )
-
-        # Status registers (read-only)
-        data['charge_state_pct'] = self.apply_scale_factor(
-            self.decode_uint16(registers[6]), sf_cha_state
-        )
-        data['available_storage_ah'] = self.apply_scale_factor(
-            self.decode_uint16(registers[7]), sf_stor_aval
-        )
-        data['battery_voltage'] = self.apply_scale_factor(
-            self.decode_uint16(registers[8]), sf_in_bat_v
-        )
-
         # Charge status enumeration
-        cha_st = self.decode_uint16(registers[9])
-        data['charge_status_code'] = cha_st
-        data['charge_status'] = self._decode_charge_status(cha_st)
-
-        # Rate setpoints
-        data['discharge_rate_pct'] = self.apply_scale_factor(
-            self.decode_int16(registers[10]), sf_in_out_w_rte
-        )
-        data['charge_rate_pct'] = self.apply_scale_factor(
-            self.decode_int16(registers[11]), sf_in_out_w_rte
-        )
-
-        # Timing parameters
-        data['rate_window_secs'] = self.decode_uint16(registers[12])
-        data['rate_revert_secs'] = self.decode_uint16(registers[13])
-        data['rate_ramp_secs'] = self.decode_uint16(registers[14])
+        data['charge_status'] = self._decode_charge_status(data.get('charge_status_code'))
 
         # Grid charging setting
-        cha_gri_set = self.decode_uint16(registers[15])
-        data['grid_charging_code'] = cha_gri_set
+        cha_gri_set = data.get('grid_charging_code')
         data['grid_charging'] = 'GRID' if cha_gri_set == 1 else 'PV' if cha_gri_set == 0 else 'UNKNOWN'
 
         return data
@@ -724,20 +605,10 @@ class RegisterParser:
         Returns:
             Dictionary with status name and description
         """
-        status_map = {
-            1: {'name': 'OFF', 'description': 'Storage is off'},
-            2: {'name': 'EMPTY', 'description': 'Storage is empty'},
-            3: {'name': 'DISCHARGING', 'description': 'Storage is discharging'},
-            4: {'name': 'CHARGING', 'description': 'Storage is charging'},
-            5: {'name': 'FULL', 'description': 'Storage is full'},
-            6: {'name': 'HOLDING', 'description': 'Storage is holding charge'},
-            7: {'name': 'TESTING', 'description': 'Storage is in test mode'},
-        }
-
         if status_code is None:
             return {'name': 'UNKNOWN', 'description': 'Status not available'}
 
-        return status_map.get(status_code, {
+        return self.CHARGE_STATUS.get(status_code, {
             'name': 'UNKNOWN',
             'description': f'Unknown status code: {status_code}'
         })
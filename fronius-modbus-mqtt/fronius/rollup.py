@@ -0,0 +1,322 @@
+"""Streaming rollups: per-field aggregates over fixed time windows
+
+Architecture:
+- RollupEngine: tumbling windows aligned to the wall clock (full minute,
+  quarter hour, ...) per device and window length
+- Gauges get min/max/mean/last; the mean is weighted by how long each
+  value held, so polls skipped as unchanged (skip_unchanged) do not bias it
+- Energy counters get the delta over the window (counter resets ignored)
+- Every sample updates a fixed set of accumulators per window - O(1) per
+  field, no samples are kept
+- Closed windows go to the sinks (InfluxDB measurements, MQTT topics) as
+  Rollup records
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .config import RollupConfig
+from .logging_setup import get_logger
+
+
+# Fields aggregated by default per device type
+DEFAULT_FIELDS = {
+    'inverter': (
+        'ac_power', 'ac_current', 'ac_voltage_an', 'ac_voltage_bn', 'ac_voltage_cn',
+        'ac_frequency', 'dc_power', 'dc_voltage', 'dc_current',
+        'power_factor', 'apparent_power', 'reactive_power', 'temp_cabinet',
+        'lifetime_energy',
+    ),
+    'meter': (
+        'power_total', 'power_a', 'power_b', 'power_c', 'current_total',
+        'voltage_ln_avg', 'voltage_an', 'voltage_bn', 'voltage_cn', 'frequency',
+        'va_total', 'var_total', 'pf_avg',
+        'energy_exported', 'energy_imported',
+    ),
+    'storage': (
+        'charge_state_pct', 'battery_voltage', 'available_storage_ah',
+    ),
+}
+
+# Monotonic counters: aggregated as delta + last instead of min/max/mean
+COUNTER_FIELDS = frozenset((
+    'lifetime_energy',
+    'energy_exported', 'energy_exported_a', 'energy_exported_b', 'energy_exported_c',
+    'energy_imported', 'energy_imported_a', 'energy_imported_b', 'energy_imported_c',
+))
+
+
+def window_label(seconds: int) -> str:
+    """Short window name used in measurement and topic names ('1m', '15m', '1h')"""
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+@dataclass
+class Rollup:
+    """Aggregates of one device over one closed window"""
+    device_type: str
+    device_id: str
+    window: int                 # Window length in seconds
+    label: str                  # window_label(window)
+    start: int                  # Window start (epoch seconds)
+    samples: int                # Samples received inside the window
+    values: Dict[str, float]    # '<field>_min/_max/_mean/_last', '<field>_delta'
+    tags: Dict[str, str]        # model / serial_number of the device
+
+
+class _Window:
+    """Accumulators of one window length for one device (lists indexed by field)"""
+
+    __slots__ = ('length', 'start', 'end', 'samples',
+                 'mins', 'maxs', 'lasts', 'integral', 'covered', 'delta')
+
+    def __init__(self, length: int, count: int):
+        self.length = length
+        self.start = 0
+        self.end = 0
+        self.samples = 0
+        self.mins: List[Optional[float]] = [None] * count
+        self.maxs: List[Optional[float]] = [None] * count
+        self.lasts: List[Optional[float]] = [None] * count
+        self.integral = [0.0] * count
+        self.covered = [0.0] * count
+        self.delta = [0.0] * count
+
+
+class _Series:
+    """Rollup state of one device: last sample per field plus one _Window per length"""
+
+    __slots__ = ('device_type', 'device_id', 'fields', 'counters', 'tags',
+                 'values', 'times', 'windows')
+
+    def __init__(self, device_type: str, device_id: str, fields: Sequence[str],
+                 lengths: Sequence[int]):
+        self.device_type = device_type
+        self.device_id = device_id
+        self.fields = tuple(fields)
+        self.counters = tuple(name in COUNTER_FIELDS for name in self.fields)
+        self.tags: Dict[str, str] = {}
+        # Last sample per field, held until the next one (at most max_gap seconds)
+        self.values: List[Optional[float]] = [None] * len(self.fields)
+        self.times = [0.0] * len(self.fields)
+        self.windows = [_Window(length, len(self.fields)) for length in lengths]
+
+
+class RollupEngine:
+    """
+    Streaming min/max/mean/last and energy-delta aggregates per device field.
+
+    Samples come from the poller threads (add), window closes from add and
+    from the main loop (close_due), so windows of devices that stopped
+    reporting still close on time. Sinks are called outside the lock.
+    """
+
+    def __init__(self, config: RollupConfig, sinks: Sequence[Callable[[Rollup], None]] = ()):
+        """
+        Args:
+            config: Rollup settings (window lengths, max_gap, field overrides)
+            sinks: Callables receiving every closed Rollup
+        """
+        self.config = config
+        self.sinks = list(sinks)
+        self.windows = sorted(set(int(w) for w in config.windows))
+        self.max_gap = config.max_gap
+        self.fields = {device_type: tuple(config.fields.get(device_type, fields))
+                       for device_type, fields in DEFAULT_FIELDS.items()}
+        self._series: Dict[tuple, _Series] = {}
+        self._lock = threading.Lock()
+        self.log = get_logger()
+
+        # Stats
+        self.samples_total = 0
+        self.rollups_emitted = 0
+        self.sink_errors = 0
+
+    def add(self, device_type: str, device_id: str, data: Dict, now: float = None):
+        """
+        Feed one parsed poll result.
+
+        Args:
+            device_type: 'inverter', 'meter' or 'storage'
+            device_id: Device identifier (as used in topics and tags)
+            data: Parsed device data
+            now: Sample time (epoch seconds, defaults to time.time())
+        """
+        fields = self.fields.get(device_type)
+        if not fields:
+            return
+        now = time.time() if now is None else now
+        key = (device_type, device_id)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(device_type, device_id, fields,
+                                                     self.windows)
+                for window in series.windows:
+                    self._open(series, window, now)
+            for name in ('model', 'serial_number'):
+                if data.get(name):
+                    series.tags[name] = data[name]
+
+            closed = self._close_windows(series, now)
+            self._sample(series, data, now)
+            self.samples_total += 1
+
+        self._emit(closed)
+
+    def close_due(self, now: float = None):
+        """Close the windows that ended before now (called periodically)"""
+        now = time.time() if now is None else now
+        closed = []
+        with self._lock:
+            for series in self._series.values():
+                closed.extend(self._close_windows(series, now))
+        self._emit(closed)
+
+    def _sample(self, series: _Series, data: Dict, now: float):
+        """Update all windows of a device with one sample (lock held)"""
+        get = data.get
+        max_gap = self.max_gap
+        values = series.values
+        times = series.times
+        windows = series.windows
+        for index, name in enumerate(series.fields):
+            value = get(name)
+            if value is None or value is True or value is False:
+                continue
+            value = float(value)
+            if value - value != 0.0:  # inf / NaN
+                continue
+            last = values[index]
+            if last is not None and series.counters[index]:
+                step = value - last if value >= last else 0.0
+                for window in windows:
+                    window.delta[index] += step
+                    window.lasts[index] = value
+            else:
+                # The previous value held from its sample until now (at most max_gap)
+                since = times[index]
+                held_end = since + max_gap if since + max_gap < now else now
+                for window in windows:
+                    low = high = value
+                    if last is not None:
+                        begin = since if since > window.start else window.start
+                        if held_end > begin:
+                            window.integral[index] += last * (held_end - begin)
+                            window.covered[index] += held_end - begin
+                            if last < low:
+                                low = last
+                            else:
+                                high = last if last > high else high
+                    current = window.mins[index]
+                    if current is None or low < current:
+                        window.mins[index] = low
+                    current = window.maxs[index]
+                    if current is None or high > current:
+                        window.maxs[index] = high
+                    window.lasts[index] = value
+
+            values[index] = value
+            times[index] = now
+
+        for window in windows:
+            window.samples += 1
+
+    @staticmethod
+    def _hold(window: _Window, index: int, value: float, since: float, until: float,
+              max_gap: float):
+        """Credit a held gauge value to the window's mean, min and max"""
+        begin = max(since, window.start)
+        end = min(until, since + max_gap, window.end)
+        if end > begin:
+            window.integral[index] += value * (end - begin)
+            window.covered[index] += end - begin
+            if window.mins[index] is None or value < window.mins[index]:
+                window.mins[index] = value
+            if window.maxs[index] is None or value > window.maxs[index]:
+                window.maxs[index] = value
+
+    def _open(self, series: _Series, window: _Window, start: float):
+        """Reset a window to the period containing start, seeded with held values"""
+        window.start = int(start // window.length) * window.length
+        window.end = window.start + window.length
+        window.samples = 0
+        count = len(series.fields)
+        window.integral = [0.0] * count
+        window.covered = [0.0] * count
+        window.delta = [0.0] * count
+        window.mins = [None] * count
+        window.maxs = [None] * count
+        for index in range(count):
+            value = series.values[index]
+            held = value is not None and series.times[index] + self.max_gap > window.start
+            window.lasts[index] = value if held else None
+
+    def _close_windows(self, series: _Series, now: float) -> List[Rollup]:
+        """Close and reopen every window of a device that ended by now (lock held)"""
+        closed = []
+        for window in series.windows:
+            while window.end <= now:
+                rollup = self._close(series, window)
+                if rollup is not None:
+                    closed.append(rollup)
+                # Step through windows a held value still reaches, skip the rest
+                held_until = max(series.times) + self.max_gap
+                self._open(series, window, window.end if held_until > window.end else now)
+        return closed
+
+    def _close(self, series: _Series, window: _Window) -> Optional[Rollup]:
+        """Aggregates of a window, or None if it saw no samples and held no values"""
+        values: Dict[str, float] = {}
+        for index, name in enumerate(series.fields):
+            last = series.values[index]
+            if series.counters[index]:
+                if window.lasts[index] is not None:
+                    values[name + '_delta'] = window.delta[index]
+                    values[name + '_last'] = window.lasts[index]
+                continue
+            if last is not None:
+                self._hold(window, index, last, series.times[index], window.end, self.max_gap)
+            if window.lasts[index] is None or window.mins[index] is None:
+                continue
+            covered = window.covered[index]
+            values[name + '_min'] = window.mins[index]
+            values[name + '_max'] = window.maxs[index]
+            values[name + '_mean'] = (window.integral[index] / covered if covered > 0
+                                      else window.lasts[index])
+            values[name + '_last'] = window.lasts[index]
+
+        if not values:
+            return None
+        return Rollup(series.device_type, series.device_id, window.length,
+                      window_label(window.length), window.start, window.samples,
+                      values, dict(series.tags))
+
+    def _emit(self, rollups: List[Rollup]):
+        """Hand closed windows to the sinks"""
+        for rollup in rollups:
+            self.rollups_emitted += 1
+            for sink in self.sinks:
+                try:
+                    sink(rollup)
+                except Exception as e:
+                    self.sink_errors += 1
+                    self.log.error(f"Rollup {rollup.device_type}/{rollup.device_id} "
+                                   f"{rollup.label}: sink failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Return rollup statistics"""
+        return {
+            'windows': [window_label(w) for w in self.windows],
+            'devices': len(self._series),
+            'samples_total': self.samples_total,
+            'rollups_emitted': self.rollups_emitted,
+            'sink_errors': self.sink_errors,
+        }
@@ -0,0 +1,147 @@
+"""Deadline-based scheduling of device polls on the shared Modbus connection"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logging_setup import get_logger
+
+
+class PollTask:
+    """A periodic job (usually one device poll) with its own interval and priority."""
+
+    def __init__(self, name: str, interval: float, callback: Callable,
+                 priority: int = 0, deadline: float = 0.0):
+        """
+        Args:
+            name: Task name (used in stats and log messages)
+            interval: Target seconds between runs
+            callback: Called with no arguments on each run
+            priority: Lower value runs first when several tasks are due
+            deadline: Monotonic time of the first run
+        """
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.priority = priority
+        self.deadline = deadline
+
+        self.runs = 0
+        self.misses = 0              # Runs that started too late
+        self.skipped = 0             # Whole intervals lost while behind
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.last_duration = 0.0
+
+    def get_stats(self) -> Dict:
+        """Return timing statistics for this task"""
+        return {
+            'interval': self.interval,
+            'priority': self.priority,
+            'runs': self.runs,
+            'misses': self.misses,
+            'skipped': self.skipped,
+            'avg_lateness_ms': round(self.total_lateness / self.runs * 1000, 1) if self.runs else 0.0,
+            'max_lateness_ms': round(self.max_lateness * 1000, 1),
+            'last_duration_ms': round(self.last_duration * 1000, 1),
+        }
+
+
+class DeadlineScheduler:
+    """
+    Run periodic tasks by deadline on a single thread.
+
+    Each task has its own interval. Of the tasks that are due, the one
+    with the best (lowest) priority runs first, and among equal
+    priorities the most overdue one. A run that starts more than
+    MISS_FRACTION of its interval late counts as a deadline miss.
+
+    When a task falls a whole interval behind it is not run back to back
+    to catch up: its next deadline is one interval after the late run
+    started, and the lost intervals are counted as skipped.
+    """
+
+    MISS_FRACTION = 0.5
+
+    def __init__(self):
+        self.tasks: List[PollTask] = []
+        self.log = get_logger()
+        # Called as (task, lateness, duration) after each run
+        self.observer: Optional[Callable] = None
+
+    def add(self, name: str, interval: float, callback: Callable,
+            priority: int = 0, start_delay: float = 0.0) -> PollTask:
+        """
+        Register a periodic task.
+
+        Args:
+            name: Task name
+            interval: Target seconds between runs
+            callback: Called with no arguments on each run
+            priority: Lower value runs first when several tasks are due
+            start_delay: Seconds until the first run
+
+        Returns:
+            The created PollTask
+        """
+        task = PollTask(name, interval, callback, priority, time.monotonic() + start_delay)
+        self.tasks.append(task)
+        return task
+
+    def remove(self, task: PollTask):
+        """Unregister a task (may be called from within its own callback)."""
+        if task in self.tasks:
+            self.tasks.remove(task)
+
+    def next_task(self, now: float = None) -> Tuple[Optional[PollTask], float]:
+        """
+        Pick the task to run now.
+
+        Returns:
+            (task, 0.0) if a task is due, otherwise (None, seconds until
+            the next deadline)
+        """
+        if not self.tasks:
+            return None, 1.0
+        if now is None:
+            now = time.monotonic()
+
+        best = None
+        for task in self.tasks:
+            if task.deadline <= now and (
+                    best is None or (task.priority, task.deadline) < (best.priority, best.deadline)):
+                best = task
+        if best is not None:
+            return best, 0.0
+        return None, min(t.deadline for t in self.tasks) - now
+
+    def run_task(self, task: PollTask):
+        """Run a task and schedule its next deadline."""
+        started = time.monotonic()
+        lateness = max(0.0, started - task.deadline)
+        try:
+            task.callback()
+        except Exception as e:
+            self.log.error(f"Scheduler: task {task.name} failed: {e}")
+        finished = time.monotonic()
+
+        task.runs += 1
+        task.last_duration = finished - started
+        task.total_lateness += lateness
+        task.max_lateness = max(task.max_lateness, lateness)
+        if lateness > task.interval * self.MISS_FRACTION:
+            task.misses += 1
+            self.log.debug(f"Scheduler: {task.name} missed its deadline by {lateness:.2f}s")
+
+        next_deadline = task.deadline + task.interval
+        if next_deadline < finished:
+            lost = int((finished - task.deadline) // task.interval) if task.interval > 0 else 0
+            task.skipped += lost
+            next_deadline = started + task.interval
+        task.deadline = next_deadline
+
+        if self.observer is not None:
+            self.observer(task, lateness, task.last_duration)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Return per-task timing statistics"""
+        return {task.name: task.get_stats() for task in self.tasks}
@@ -0,0 +1,666 @@
+"""Local SunSpec Modbus TCP simulator for development and benchmarking
+
+Serves register images of Fronius inverters and meters over Modbus TCP, so
+the poller can be run and timed without hardware. Images are either loaded
+from register dumps or built from registers.json, and can be animated with
+a synthetic day curve.
+
+The DataManager quirks the poller has to cope with can be switched on:
+- connection limit: a new connection beyond the limit drops the oldest one
+- stale buffer: after a unit ID switch the first answer may carry the
+  registers of the previously addressed unit
+- per-request latency with jitter, requests served one at a time
+
+Architecture:
+- RegisterBank: sparse register image of one unit
+- SimulatedDevice: bank plus model chain, animates live values
+- ModbusSimulator: asyncio MBAP server (function codes 3, 6 and 16)
+"""
+
+import asyncio
+import json
+import math
+import random
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .block_decoder import BlockDecoder
+from .logging_setup import get_logger
+
+
+class RegisterBank:
+    """Sparse holding register image of one Modbus unit (1-based addresses)."""
+
+    def __init__(self):
+        self.registers: Dict[int, int] = {}
+
+    def load(self, address: int, values: List[int]):
+        """Store a contiguous block of registers starting at address."""
+        for offset, value in enumerate(values):
+            self.registers[address + offset] = value & 0xFFFF
+
+    def read(self, address: int, count: int) -> Optional[List[int]]:
+        """Registers address..address+count-1, or None if any is not mapped."""
+        registers = self.registers
+        try:
+            return [registers[a] for a in range(address, address + count)]
+        except KeyError:
+            return None
+
+    def write(self, address: int, values: List[int]) -> bool:
+        """Overwrite mapped registers; False if any address is not mapped."""
+        if any(a not in self.registers for a in range(address, address + len(values))):
+            return False
+        self.load(address, values)
+        return True
+
+    def copy(self) -> 'RegisterBank':
+        bank = RegisterBank()
+        bank.registers = dict(self.registers)
+        return bank
+
+
+def load_dump(path: str) -> Dict[int, RegisterBank]:
+    """
+    Load register images from a dump file.
+
+    Two layouts are accepted:
+    - scan_registers.py output: {"device_<id>": {"raw_blocks":
+      {"<start>-<end>": [registers]}}}
+    - plain dumps: {"<unit_id>": {"<start address>": [registers]}}
+
+    Units without any register block (failed scans) are skipped.
+
+    Returns:
+        Unit ID -> register bank
+    """
+    log = get_logger()
+    with open(path) as f:
+        data = json.load(f)
+
+    banks = {}
+    for key, entry in data.items():
+        if not isinstance(entry, dict):
+            continue
+        if 'raw_blocks' in entry or 'device_id' in entry:
+            unit_id = int(entry.get('device_id', key.rsplit('_', 1)[-1]))
+            blocks = {k.split('-')[0]: v for k, v in entry.get('raw_blocks', {}).items()}
+        else:
+            unit_id = int(key)
+            blocks = entry
+        if not blocks:
+            log.warning(f"Simulator: {path}: unit {unit_id} has no register blocks, skipped")
+            continue
+        bank = RegisterBank()
+        for start, values in blocks.items():
+            bank.load(int(start), values)
+        banks[unit_id] = bank
+    return banks
+
+
+# Scale factors and physical values of the synthetic images
+# (Symo 8.2-3-M at about a third of its rating, Smart Meter TS 65A-3)
+INVERTER_SCALE_FACTORS = {
+    'A_SF': -2, 'V_SF': -1, 'W_SF': 0, 'Hz_SF': -2, 'VA_SF': 0, 'VAr_SF': 0,
+    'PF_SF': -1, 'WH_SF': 0, 'DCA_SF': -2, 'DCV_SF': -1, 'DCW_SF': 0, 'Tmp_SF': -1,
+}
+INVERTER_VALUES = {
+    'A': 12.0, 'AphA': 4.0, 'AphB': 4.0, 'AphC': 4.0,
+    'PPVphAB': 399.5, 'PPVphBC': 400.2, 'PPVphCA': 398.9,
+    'PhVphA': 230.4, 'PhVphB': 231.1, 'PhVphC': 229.8,
+    'W': 2760, 'Hz': 50.0, 'VA': 2770, 'VAr': -52, 'PF': 99.6,
+    'WH': 12345678, 'DCA': 6.8, 'DCV': 415.0, 'DCW': 2850,
+    'TmpCab': 38.5, 'St': 4, 'StVnd': 4,
+    'Evt1': 0, 'Evt2': 0, 'EvtVnd1': 0, 'EvtVnd2': 0, 'EvtVnd3': 0, 'EvtVnd4': 0,
+}
+METER_SCALE_FACTORS = {
+    'A_SF': -2, 'V_SF': -1, 'Hz_SF': -2, 'W_SF': 0, 'VA_SF': 0, 'VAR_SF': 0,
+    'PF_SF': -3, 'TotWh_SF': 0,
+}
+METER_VALUES = {
+    'A': 15.6, 'AphA': 5.2, 'AphB': 5.3, 'AphC': 5.1,
+    'PhV': 230.3, 'PhVphA': 230.4, 'PhVphB': 231.1, 'PhVphC': 229.5,
+    'PPV': 399.6, 'PPVphAB': 399.5, 'PPVphBC': 400.2, 'PPVphCA': 399.1,
+    'Hz': 50.0, 'W': 1200, 'WphA': 400, 'WphB': 410, 'WphC': 390,
+    'VA': 1250, 'VAphA': 415, 'VAphB': 425, 'VAphC': 410,
+    'VAR': -180, 'VARphA': -60, 'VARphB': -62, 'VARphC': -58,
+    'PF': 0.96, 'PFphA': 0.96, 'PFphB': 0.96, 'PFphC': 0.95,
+    'TotWhExp': 4567890, 'TotWhExpPhA': 1522630, 'TotWhExpPhB': 1522630, 'TotWhExpPhC': 1522630,
+    'TotWhImp': 3210987, 'TotWhImpPhA': 1070329, 'TotWhImpPhB': 1070329, 'TotWhImpPhC': 1070329,
+}
+STORAGE_VALUES = {
+    'WChaMax': 5000, 'WChaGra': 100, 'WDisChaGra': 100, 'StorCtl_Mod': 0,
+    'MinRsvPct': 10.0, 'ChaState': 65.0, 'ChaSt': 4, 'OutWRte': 100.0, 'InWRte': 100.0,
+    'InOutWRte_WinTms': 0, 'InOutWRte_RvrtTms': 0, 'ChaGriSet': 1,
+    'WChaMax_SF': 0, 'WChaDisChaGra_SF': 0, 'MinRsvPct_SF': -2, 'ChaState_SF': -2,
+    'InOutWRte_SF': -2,
+}
+CONTROLS_VALUES = {
+    'Conn_WinTms': 0, 'Conn_RvrtTms': 0, 'Conn': 1,
+    'WMaxLimPct': 100.0, 'WMaxLimPct_WinTms': 0, 'WMaxLimPct_RvrtTms': 0,
+    'WMaxLimPct_RmpTms': 0, 'WMaxLim_Ena': 0,
+    'OutPFSet': 1.0, 'OutPFSet_WinTms': 0, 'OutPFSet_RvrtTms': 0,
+    'OutPFSet_RmpTms': 0, 'OutPFSet_Ena': 0,
+    'VArWMaxPct': 0, 'VArPct_WinTms': 0, 'VArPct_RvrtTms': 0, 'VArPct_RmpTms': 0,
+    'VArPct_Mod': 2, 'VArPct_Ena': 0,
+    'WMaxLimPct_SF': -2, 'OutPFSet_SF': -3, 'VArPct_SF': 0,
+}
+MPPT_SCALE_FACTORS = {'DCA_SF': -2, 'DCV_SF': -1, 'DCW_SF': 0, 'DCWH_SF': 0}
+
+# Filler models between the inverter and Model 123 on Fronius devices
+# (nameplate, basic settings, extended measurements)
+FILLER_MODELS = ((120, 26), (121, 30), (122, 44))
+
+
+def _register_definitions(section: Dict, base: int, model_id: int = None) -> List[Tuple[int, Dict]]:
+    """
+    (address, definition) pairs of a registers.json section placed at base.
+
+    Offsets count from base; absolute addresses are moved so that the first
+    register of the section lands on base.
+
+    Args:
+        model_id: Skip registers whose "models" list does not include it
+    """
+    registers = section.get('registers', [])
+    addresses = [r['address'] for r in registers if 'address' in r]
+    origin = min(addresses) if addresses else 0
+    return [
+        (base + reg['offset'] if 'offset' in reg else base + reg['address'] - origin, reg)
+        for reg in registers
+        if not (model_id and reg.get('models') and str(model_id) not in reg['models'])
+    ]
+
+
+def encode_value(reg: Dict, value, scale_factors: Dict[str, int]) -> List[int]:
+    """
+    Encode a physical value as SunSpec registers.
+
+    Args:
+        reg: Register definition from registers.json
+        value: Physical value (None = not implemented); scale factor
+            registers take the exponent itself
+        scale_factors: Scale factor name -> exponent for scaled fields
+
+    Returns:
+        Register values (count of the definition)
+    """
+    reg_type = reg.get('type', 'uint16')
+    count = reg.get('count', 1)
+    if reg_type.startswith('string'):
+        raw = str(value or '').encode('ascii')[:count * 2].ljust(count * 2, b'\x00')
+        return list(struct.unpack(f'>{count}H', raw))
+    if reg_type == 'float32':
+        return list(struct.unpack('>HH', struct.pack('>f', math.nan if value is None else value)))
+
+    _, size, not_impl = BlockDecoder.TYPES[reg_type]
+    if value is None:
+        raw = not_impl
+    else:
+        sf = scale_factors.get(reg.get('scale_factor'), 0)
+        raw = int(round(value / 10.0 ** sf))
+    raw &= (1 << (16 * size)) - 1
+    if size == 2:
+        return [raw >> 16, raw & 0xFFFF]
+    return [raw]
+
+
+def encode_section(bank: RegisterBank, definitions: List[Tuple[int, Dict]],
+                   values: Dict, scale_factors: Dict[str, int]):
+    """Write every register of a section; names missing from values are not implemented."""
+    for address, reg in definitions:
+        name = reg['name']
+        value = scale_factors.get(name, values.get(name)) if reg.get('type') == 'sunssf' else values.get(name)
+        bank.load(address, encode_value(reg, value, scale_factors))
+
+
+def build_common_block(bank: RegisterBank, unit_id: int, manufacturer: str, model: str,
+                       version: str, serial_number: str, register_map: Dict):
+    """Common model (40001-40069) with the SunSpec marker."""
+    values = {
+        'SunSpec_ID': int(register_map.get('sunspec_id', '0x53756E53'), 16),
+        'SunSpec_DID': 1, 'SunSpec_Length': 65,
+        'Manufacturer': manufacturer, 'Model': model, 'Options': '',
+        'Version': version, 'SerialNumber': serial_number, 'DeviceAddress': unit_id,
+    }
+    encode_section(bank, _register_definitions(register_map['common_block'], 40001), values, {})
+
+
+def build_inverter_image(unit_id: int, register_map: Dict, float_format: bool = False,
+                         mppt_modules: int = 2, storage: bool = False) -> RegisterBank:
+    """
+    Register image of a three-phase Symo following the Fronius model chain:
+    inverter (103/113), 120, 121, 122, 123, 160 and optionally 124.
+    """
+    bank = RegisterBank()
+    build_common_block(bank, unit_id, 'Fronius', 'Symo 8.2-3-M', '0.3.30.2',
+                       f"3422{unit_id:04d}", register_map)
+
+    section = register_map['inverter']['measurements_float' if float_format else 'measurements']
+    model_id = 113 if float_format else 103
+    definitions = _register_definitions(section, 40072, model_id)
+    length = max(a + r.get('count', 1) for a, r in definitions) - 40072
+    bank.load(40070, [model_id, length])
+    encode_section(bank, definitions, INVERTER_VALUES, INVERTER_SCALE_FACTORS)
+    address = 40072 + length
+
+    for filler_id, filler_length in FILLER_MODELS:
+        bank.load(address, [filler_id, filler_length] + [0xFFFF] * filler_length)
+        address += 2 + filler_length
+
+    controls = register_map['immediate_controls']
+    bank.load(address, [123, 24])
+    for name, section in controls.items():
+        if isinstance(section, dict) and 'address' in section and name != 'model_header':
+            base = address + section['address'] - controls['model_header']['address']
+            encode_section(bank, _register_definitions(section, base), CONTROLS_VALUES,
+                           CONTROLS_VALUES)
+    address += 26
+
+    mppt = register_map['mppt']
+    origin = mppt['model_header']['address']
+    bank.load(address, [160, 8 + 20 * mppt_modules])
+    encode_section(bank, _register_definitions(mppt['scale_factors'],
+                                               address + mppt['scale_factors']['address'] - origin),
+                   MPPT_SCALE_FACTORS, MPPT_SCALE_FACTORS)
+    encode_section(bank, _register_definitions(mppt['global'],
+                                               address + mppt['global']['address'] - origin),
+                   {'Evt': 0, 'N': mppt_modules, 'TmsPer': 0}, {})
+    module_offset = mppt['module1']['address'] - origin
+    for index in range(mppt_modules):
+        share = 1.0 / mppt_modules
+        values = {
+            'ID': index + 1, 'IDStr': f"String {index + 1}",
+            'DCA': INVERTER_VALUES['DCA'] * share, 'DCV': INVERTER_VALUES['DCV'],
+            'DCW': INVERTER_VALUES['DCW'] * share, 'DCWH': 6000000 // mppt_modules,
+            'Tms': 0, 'DCSt': 4, 'DCEvt': 0,
+        }
+        base = address + module_offset + index * 20
+        encode_section(bank, _register_definitions(mppt['module1'], base), values,
+                       MPPT_SCALE_FACTORS)
+    address += 10 + 20 * mppt_modules
+
+    if storage:
+        bank.load(address, [124, 24])
+        encode_section(bank, _register_definitions(register_map['storage']['measurements'],
+                                                   address + 2),
+                       STORAGE_VALUES, STORAGE_VALUES)
+        address += 26
+
+    bank.load(address, [0xFFFF, 0])
+    return bank
+
+
+def build_meter_image(unit_id: int, register_map: Dict, float_format: bool = False) -> RegisterBank:
+    """Register image of a Smart Meter TS 65A-3 (model 203/213)."""
+    bank = RegisterBank()
+    build_common_block(bank, unit_id, 'Fronius', 'Smart Meter TS 65A-3', '1.3',
+                       f"1955{unit_id:04d}", register_map)
+
+    meter = register_map['meter']
+    section = meter['measurements_float' if float_format else 'measurements_int_sf']
+    model_id = 213 if float_format else 203
+    definitions = _register_definitions(section, 40072, model_id)
+    # Full SunSpec model length (events follow the measurements)
+    length = 124 if float_format else 105
+    bank.load(40070, [model_id, length] + [0] * length)
+    encode_section(bank, definitions, METER_VALUES, METER_SCALE_FACTORS)
+    bank.load(40072 + length, [0xFFFF, 0])
+    return bank
+
+
+@dataclass
+class _LiveField:
+    """A register animated by SimulatedDevice.update()"""
+    address: int
+    reg_type: str
+    kind: str            # 'power', 'voltage', 'frequency', 'energy_in', 'energy_out'
+    base: float = 0.0    # Raw value in the original image
+    sf_address: Optional[int] = None
+
+
+class SimulatedDevice:
+    """
+    A simulated unit: register bank plus the model chain found in it.
+
+    With animate=True the live registers of the inverter/meter model and of
+    Model 160 follow a synthetic day: power and currents scale with the
+    sun (inverters) or a load curve (meters), voltages and frequency get
+    noise, and energy counters integrate power. Values change at most once
+    per update_interval, so quick successive reads see identical registers
+    like on the real device.
+    """
+
+    POWER_FIELDS = {'A', 'AphA', 'AphB', 'AphC', 'W', 'WphA', 'WphB', 'WphC',
+                    'VA', 'VAphA', 'VAphB', 'VAphC', 'VAr', 'VAR', 'VARphA', 'VARphB',
+                    'VARphC', 'DCA', 'DCW'}
+    VOLTAGE_FIELDS = {'PPVphAB', 'PPVphBC', 'PPVphCA', 'PhVphA', 'PhVphB', 'PhVphC',
+                      'PhV', 'PPV', 'DCV'}
+    INVERTER_MODELS = (101, 102, 103, 111, 112, 113)
+    METER_MODELS = (201, 202, 203, 204, 211, 212, 213, 214)
+
+    ST_SLEEPING = 2
+    ST_MPPT = 4
+
+    def __init__(self, unit_id: int, bank: RegisterBank, register_map: Dict,
+                 animate: bool = False, day_length: float = 600.0,
+                 update_interval: float = 1.0, seed: int = None):
+        self.unit_id = unit_id
+        self.bank = bank
+        self.animate = animate
+        self.day_length = day_length
+        self.update_interval = update_interval
+        self.random = random.Random(seed if seed is None else seed + unit_id)
+        self.models = self._walk_models()
+        self.device_type = None
+        self._fields: List[_LiveField] = []
+        self._status_address: Optional[int] = None
+        self._power_field: Optional[_LiveField] = None
+        self._energy: Dict[int, float] = {}
+        self._started = time.monotonic()
+        self._last_update = None
+        if animate:
+            self._index_live_fields(register_map)
+
+    def _walk_models(self) -> List[Tuple[int, int, int]]:
+        """(model_id, address, length) of the models in the bank."""
+        models = []
+        address = 40070
+        while True:
+            header = self.bank.read(address, 2)
+            if not header or header[0] == 0xFFFF:
+                return models
+            models.append((header[0], address, header[1]))
+            address += 2 + header[1]
+
+    def _read_value(self, address: int, reg_type: str) -> float:
+        regs = self.bank.read(address, 2 if reg_type in ('float32', 'acc32', 'uint32') else 1)
+        if reg_type == 'float32':
+            return struct.unpack('>f', struct.pack('>HH', *regs))[0]
+        if reg_type in ('acc32', 'uint32'):
+            return (regs[0] << 16) | regs[1]
+        if reg_type == 'int16' or reg_type == 'sunssf':
+            return regs[0] - 0x10000 if regs[0] >= 0x8000 else regs[0]
+        return regs[0]
+
+    def _write_value(self, address: int, reg_type: str, value: float):
+        if reg_type == 'float32':
+            self.bank.load(address, list(struct.unpack('>HH', struct.pack('>f', value))))
+        elif reg_type in ('acc32', 'uint32'):
+            raw = int(value) & 0xFFFFFFFF
+            self.bank.load(address, [raw >> 16, raw & 0xFFFF])
+        else:
+            self.bank.load(address, [int(round(value)) & 0xFFFF])
+
+    def _index_live_fields(self, register_map: Dict):
+        """Locate the animated registers through the model chain."""
+        for model_id, address, _ in self.models:
+            if model_id in self.INVERTER_MODELS:
+                self.device_type = 'inverter'
+                float_format = model_id >= 111
+                section = register_map['inverter']['measurements_float' if float_format
+                                                   else 'measurements']
+                self._add_fields(_register_definitions(section, address + 2, model_id),
+                                 energy={'WH': 'energy_in'})
+                self._status_address = next(
+                    (a for a, r in _register_definitions(section, address + 2) if r['name'] == 'St'),
+                    None)
+            elif model_id in self.METER_MODELS:
+                self.device_type = 'meter'
+                float_format = model_id >= 211
+                section = register_map['meter']['measurements_float' if float_format
+                                                else 'measurements_int_sf']
+                self._add_fields(_register_definitions(section, address + 2, model_id),
+                                 energy={'TotWhImp': 'energy_in', 'TotWhExp': 'energy_out'})
+            elif model_id == 160:
+                modules = self.bank.read(address + 8, 1)
+                mppt = register_map['mppt']
+                origin = mppt['model_header']['address']
+                sf = {n: address + mppt['scale_factors']['address'] - origin + i
+                      for i, n in enumerate(('DCA_SF', 'DCV_SF', 'DCW_SF', 'DCWH_SF'))}
+                for index in range(modules[0] if modules else 0):
+                    base = address + mppt['module1']['address'] - origin + index * 20
+                    for reg_address, reg in _register_definitions(mppt['module1'], base):
+                        if reg['name'] in ('DCA', 'DCW'):
+                            self._add(reg_address, reg['type'], 'power', sf.get(f"{reg['name']}_SF"))
+                        elif reg['name'] == 'DCV':
+                            self._add(reg_address, reg['type'], 'voltage')
+
+    def _add_fields(self, definitions: List[Tuple[int, Dict]], energy: Dict[str, str]):
+        sf_addresses = {r['name']: a for a, r in definitions if r.get('type') == 'sunssf'}
+        for address, reg in definitions:
+            name = reg['name']
+            sf_address = sf_addresses.get(reg.get('scale_factor'))
+            if name in self.POWER_FIELDS:
+                field = self._add(address, reg['type'], 'power', sf_address)
+                if name == 'W':
+                    self._power_field = field
+            elif name in self.VOLTAGE_FIELDS:
+                self._add(address, reg['type'], 'voltage', sf_address)
+            elif name == 'Hz':
+                self._add(address, reg['type'], 'frequency', sf_address)
+            elif name in energy:
+                self._add(address, reg['type'], energy[name], sf_address)
+
+    def _add(self, address: int, reg_type: str, kind: str, sf_address: int = None) -> _LiveField:
+        field = _LiveField(address, reg_type, kind, self._read_value(address, reg_type), sf_address)
+        self._fields.append(field)
+        return field
+
+    def _scale(self, field: _LiveField) -> float:
+        """Multiplier turning a raw register value into a physical value."""
+        if field.sf_address is None or field.reg_type == 'float32':
+            return 1.0
+        sf = self._read_value(field.sf_address, 'sunssf')
+        return 10.0 ** sf if -10 <= sf <= 10 else 1.0
+
+    def sun(self, now: float) -> float:
+        """Fraction of the recorded output: a sine over the first half of each day."""
+        phase = ((now - self._started) / self.day_length + 0.25) % 1.0
+        return max(0.0, math.sin(2 * math.pi * phase))
+
+    def load(self, now: float) -> float:
+        """Household load relative to the recorded meter power."""
+        return 1.0 + 0.5 * math.sin(2 * math.pi * (now - self._started) / (self.day_length / 7))
+
+    def update(self, now: float):
+        """Advance the animated registers to now (no-op within update_interval)."""
+        if not self.animate or not self._fields:
+            return
+        if self._last_update is not None and now - self._last_update < self.update_interval:
+            return
+        elapsed = 0.0 if self._last_update is None else now - self._last_update
+        self._last_update = now
+
+        factor = self.sun(now) if self.device_type == 'inverter' else self.load(now)
+        noise = self.random.uniform
+        power = 0.0
+        for field in self._fields:
+            if field.kind == 'power':
+                value = field.base * factor * (noise(0.97, 1.03) if factor else 1.0)
+                self._write_value(field.address, field.reg_type, value)
+                if field is self._power_field:
+                    power = value * self._scale(field)
+            elif field.kind == 'voltage':
+                self._write_value(field.address, field.reg_type, field.base * noise(0.997, 1.003))
+            elif field.kind == 'frequency':
+                self._write_value(field.address, field.reg_type, field.base * noise(0.9996, 1.0004))
+
+        # Energy counters integrate the power written above
+        for field in self._fields:
+            if field.kind not in ('energy_in', 'energy_out'):
+                continue
+            energy = power if field.kind == 'energy_in' else -power
+            if energy <= 0 or not elapsed:
+                continue
+            total = self._energy.get(field.address, field.base) + energy * elapsed / 3600.0 / self._scale(field)
+            self._energy[field.address] = total
+            self._write_value(field.address, field.reg_type, total)
+
+        if self._status_address is not None:
+            self._write_value(self._status_address, 'enum16',
+                              self.ST_MPPT if factor > 0.01 else self.ST_SLEEPING)
+
+
+@dataclass
+class SimulatorQuirks:
+    """DataManager behaviour to mimic (defaults: well-behaved server)"""
+    max_connections: int = 0         # 0 = unlimited; beyond it the oldest is dropped
+    stale_rate: float = 0.0          # Probability of a stale answer after a unit switch
+    latency_ms: float = 0.0          # Fixed delay per request
+    jitter_ms: float = 0.0           # Random extra delay per request (0..jitter)
+    concurrent: bool = False         # Serve requests in parallel (GEN24) or one at a time
+
+
+class ModbusSimulator:
+    """Asyncio Modbus TCP server answering from SimulatedDevice images."""
+
+    READ_HOLDING_REGISTERS = 0x03
+    WRITE_SINGLE_REGISTER = 0x06
+    WRITE_MULTIPLE_REGISTERS = 0x10
+
+    ILLEGAL_FUNCTION = 0x01
+    ILLEGAL_ADDRESS = 0x02
+    ILLEGAL_VALUE = 0x03
+    TARGET_FAILED = 0x0B             # Gateway: no device at this unit ID
+
+    _HEADER = struct.Struct('>HHHB')  # Transaction, protocol, length, unit
+
+    def __init__(self, devices: Dict[int, SimulatedDevice], host: str = '127.0.0.1',
+                 port: int = 5020, quirks: SimulatorQuirks = None, seed: int = None):
+        self.devices = devices
+        self.host = host
+        self.port = port
+        self.quirks = quirks or SimulatorQuirks()
+        self.log = get_logger()
+        self.random = random.Random(seed)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._connections: List[asyncio.StreamWriter] = []
+        self._busy: Optional[asyncio.Lock] = None
+        self._last_unit: Optional[int] = None
+
+        self.requests = 0
+        self.exceptions = 0
+        self.stale_responses = 0
+        self.dropped_connections = 0
+        self.connections_total = 0
+
+    async def start(self):
+        self._busy = asyncio.Lock()
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.log.info(f"Simulator listening on {self.host}:{self.port} "
+                      f"(units {sorted(self.devices)})")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for writer in list(self._connections):
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections_total += 1
+        limit = self.quirks.max_connections
+        while limit and len(self._connections) >= limit:
+            # DataManager: a new client takes over, the old one is cut off
+            oldest = self._connections.pop(0)
+            oldest.close()
+            self.dropped_connections += 1
+        self._connections.append(writer)
+
+        tasks = set()
+        try:
+            while True:
+                header = await reader.readexactly(self._HEADER.size)
+                transaction_id, protocol, length, unit_id = self._HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                if self.quirks.concurrent:
+                    task = asyncio.ensure_future(
+                        self._respond(writer, transaction_id, protocol, unit_id, pdu))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    async with self._busy:
+                        await self._respond(writer, transaction_id, protocol, unit_id, pdu)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            if writer in self._connections:
+                self._connections.remove(writer)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, transaction_id: int,
+                       protocol: int, unit_id: int, pdu: bytes):
+        delay = self.quirks.latency_ms + self.random.uniform(0, self.quirks.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        response = self.handle(unit_id, pdu)
+        if writer.is_closing():
+            return
+        writer.write(self._HEADER.pack(transaction_id, protocol, len(response) + 1, unit_id) + response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _exception(self, function_code: int, code: int) -> bytes:
+        self.exceptions += 1
+        return bytes((function_code | 0x80, code))
+
+    def handle(self, unit_id: int, pdu: bytes) -> bytes:
+        """Build the response PDU for a request PDU."""
+        self.requests += 1
+        function_code = pdu[0] if pdu else 0
+        device = self.devices.get(unit_id)
+        if device is None:
+            return self._exception(function_code, self.TARGET_FAILED)
+
+        previous, self._last_unit = self._last_unit, unit_id
+        device.update(time.monotonic())
+
+        if function_code == self.READ_HOLDING_REGISTERS and len(pdu) >= 5:
+            address, count = struct.unpack('>HH', pdu[1:5])
+            if not 1 <= count <= 125:
+                return self._exception(function_code, self.ILLEGAL_VALUE)
+            source = device
+            if (previous is not None and previous != unit_id and previous in self.devices
+                    and self.quirks.stale_rate and self.random.random() < self.quirks.stale_rate):
+                # Answer from the buffer of the unit addressed before
+                source = self.devices[previous]
+                self.stale_responses += 1
+            registers = source.bank.read(address + 1, count)
+            if registers is None and source is not device:
+                registers = device.bank.read(address + 1, count)
+            if registers is None:
+                return self._exception(function_code, self.ILLEGAL_ADDRESS)
+            return struct.pack(f'>BB{count}H', function_code, count * 2, *registers)
+
+        if function_code == self.WRITE_SINGLE_REGISTER and len(pdu) >= 5:
+            address, value = struct.unpack('>HH', pdu[1:5])
+            if not device.bank.write(address + 1, [value]):
+                return self._exception(function_code, self.ILLEGAL_ADDRESS)
+            return pdu[:5]
+
+        if function_code == self.WRITE_MULTIPLE_REGISTERS and len(pdu) >= 6:
+            address, count, byte_count = struct.unpack('>HHB', pdu[1:6])
+            if byte_count != count * 2 or len(pdu) < 6 + byte_count:
+                return self._exception(function_code, self.ILLEGAL_VALUE)
+            values = list(struct.unpack(f'>{count}H', pdu[6:6 + byte_count]))
+            if not device.bank.write(address + 1, values):
+                return self._exception(function_code, self.ILLEGAL_ADDRESS)
+            return pdu[:5]
+
+        return self._exception(function_code, self.ILLEGAL_FUNCTION)
+
+    def get_stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'exceptions': self.exceptions,
+            'stale_responses': self.stale_responses,
+            'connections': self.connections_total,
+            'dropped_connections': self.dropped_connections,
+        }
@@ -0,0 +1,206 @@
+"""Append-only on-disk spool for line protocol batches during InfluxDB outages"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .logging_setup import get_logger
+
+
+class LineSpool:
+    """
+    Segmented, size-capped spool of line protocol lines.
+
+    Batches that could not be written are appended to the newest segment
+    file (spool-00000001.lp, ...). A segment is closed once it grows past
+    segment_bytes and a new one is started. When the spool exceeds
+    max_bytes the oldest segment is deleted, so an outage longer than the
+    spool can hold loses its oldest data first.
+
+    Replay reads the oldest segment from a byte offset and deletes the
+    segment once it is fully written back. The offset is kept in memory
+    only: after a restart a partly replayed segment is sent again, which
+    is harmless because every line carries its own timestamp and InfluxDB
+    overwrites identical points.
+
+    Thread-safe; appends come from the batch flush, replay from the same
+    or another thread.
+    """
+
+    PREFIX = 'spool-'
+    SUFFIX = '.lp'
+
+    def __init__(self, directory: str = None, segment_bytes: int = 1024 * 1024,
+                 max_bytes: int = 100 * 1024 * 1024):
+        """
+        Args:
+            directory: Spool directory (default: data/influx_spool)
+            segment_bytes: Size at which the current segment is closed
+            max_bytes: Total size above which the oldest segments are dropped
+        """
+        self.directory = Path(directory or self._default_directory())
+        self.segment_bytes = max(1, segment_bytes)
+        self.max_bytes = max(self.segment_bytes, max_bytes)
+        self.log = get_logger()
+        self.lock = threading.Lock()
+
+        self.segments: List[Tuple[int, int]] = []   # (sequence, size) oldest first
+        self.replay_offset = 0                      # Bytes of the oldest segment already replayed
+        self.lines_spooled = 0
+        self.lines_replayed = 0
+        self.lines_dropped = 0
+        self.segments_dropped = 0
+        self._load_segments()
+
+    def _default_directory(self) -> str:
+        """Get default spool directory relative to package"""
+        return str(Path(__file__).parent.parent / "data" / "influx_spool")
+
+    def _path(self, sequence: int) -> Path:
+        return self.directory / f"{self.PREFIX}{sequence:08d}{self.SUFFIX}"
+
+    def _load_segments(self):
+        """Pick up segments left over from a previous run"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for entry in os.scandir(self.directory):
+                name = entry.name
+                if not (name.startswith(self.PREFIX) and name.endswith(self.SUFFIX)):
+                    continue
+                try:
+                    sequence = int(name[len(self.PREFIX):-len(self.SUFFIX)])
+                except ValueError:
+                    continue
+                self.segments.append((sequence, entry.stat().st_size))
+        except OSError as e:
+            self.log.warning(f"Could not open InfluxDB spool {self.directory}: {e}")
+        self.segments.sort()
+        if self.segments:
+            self.log.info(f"InfluxDB spool: {len(self.segments)} segment(s), "
+                          f"{self.size_bytes // 1024} KiB pending replay")
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes not yet replayed"""
+        return sum(size for _, size in self.segments) - self.replay_offset
+
+    def append(self, lines: List[str]) -> bool:
+        """
+        Append lines to the newest segment.
+
+        Args:
+            lines: Encoded line protocol lines
+
+        Returns:
+            True if written, False on I/O errors (the lines are lost)
+        """
+        if not lines:
+            return True
+        payload = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self.lock:
+            if not self.segments or self.segments[-1][1] >= self.segment_bytes:
+                sequence = self.segments[-1][0] + 1 if self.segments else 1
+                self.segments.append((sequence, 0))
+            sequence, size = self.segments[-1]
+            try:
+                with open(self._path(sequence), 'ab') as f:
+                    f.write(payload)
+            except OSError as e:
+                if size == 0:
+                    self.segments.pop()
+                self.lines_dropped += len(lines)
+                self.log.error(f"InfluxDB spool write failed: {e}")
+                return False
+            self.segments[-1] = (sequence, size + len(payload))
+            self.lines_spooled += len(lines)
+            self._enforce_limit()
+        return True
+
+    def _enforce_limit(self):
+        """Drop the oldest segments while the spool is over max_bytes (lock held)"""
+        while len(self.segments) > 1 and self.size_bytes > self.max_bytes:
+            sequence, _ = self.segments.pop(0)
+            self.replay_offset = 0
+            self.segments_dropped += 1
+            dropped = self._remove(sequence)
+            self.lines_dropped += dropped
+            self.log.warning(f"InfluxDB spool full, dropped oldest segment ({dropped} lines)")
+
+    def _remove(self, sequence: int) -> int:
+        """Delete a segment file, returning the number of lines it held"""
+        path = self._path(sequence)
+        lines = 0
+        try:
+            with open(path, 'rb') as f:
+                lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(65536), b''))
+            path.unlink()
+        except OSError as e:
+            self.log.warning(f"Could not remove spool segment {path.name}: {e}")
+        return lines
+
+    def peek(self, max_lines: int) -> Optional[Tuple[int, int, List[str]]]:
+        """
+        Read up to max_lines from the oldest segment without consuming them.
+
+        Returns:
+            (sequence, end offset, lines) for commit(), or None if empty
+        """
+        with self.lock:
+            if not self.segments or max_lines <= 0:
+                return None
+            sequence, size = self.segments[0]
+            offset = self.replay_offset
+            try:
+                with open(self._path(sequence), 'rb') as f:
+                    f.seek(offset)
+                    raw = [f.readline() for _ in range(max_lines)]
+            except OSError as e:
+                self.log.error(f"InfluxDB spool read failed, dropping segment: {e}")
+                self.segments.pop(0)
+                self.replay_offset = 0
+                self.segments_dropped += 1
+                return None
+
+            raw = [line for line in raw if line.endswith(b'\n')]
+            end = offset + sum(len(line) for line in raw)
+            if not raw and end < size:
+                # Unterminated tail left by a crash mid-append: skip it
+                end = size
+            lines = [line.decode('utf-8', errors='replace').rstrip('\n') for line in raw]
+            return sequence, end, [line for line in lines if line]
+
+    def commit(self, sequence: int, end: int, count: int):
+        """
+        Mark lines returned by peek() as replayed.
+
+        Args:
+            sequence: Segment from peek()
+            end: End offset from peek()
+            count: Number of lines that were written
+        """
+        with self.lock:
+            if not self.segments or self.segments[0][0] != sequence:
+                return
+            self.lines_replayed += count
+            if end >= self.segments[0][1]:
+                self.segments.pop(0)
+                self.replay_offset = 0
+                try:
+                    self._path(sequence).unlink()
+                except OSError as e:
+                    self.log.warning(f"Could not remove spool segment {sequence}: {e}")
+            else:
+                self.replay_offset = end
+
+    def get_stats(self) -> Dict:
+        """Return spool depth and counters"""
+        return {
+            'directory': str(self.directory),
+            'segments': len(self.segments),
+            'pending_bytes': self.size_bytes,
+            'lines_spooled': self.lines_spooled,
+            'lines_replayed': self.lines_replayed,
+            'lines_dropped': self.lines_dropped,
+            'segments_dropped': self.segments_dropped,
+        }
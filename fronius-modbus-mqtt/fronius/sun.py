@@ -0,0 +1,89 @@
+"""Local sunrise and sunset from latitude/longitude, for night-time poll backoff
+
+Architecture:
+- sun_times: sunrise and sunset of a UTC day (NOAA general solar position
+  approximation, accurate to a minute or two - plenty for scheduling)
+- Daylight: daylight periods with a margin around sunrise/sunset;
+  answers "is it day now" and "how long until the next day starts"
+
+No network or ephemeris data is needed; everything is computed locally.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+DAY = 86400.0
+
+# Sun center 0.833 degrees below the horizon at sunrise/sunset (refraction + disc)
+ZENITH = math.radians(90.833)
+
+
+def sun_times(day_start: float, latitude: float, longitude: float
+              ) -> Optional[Tuple[float, float]]:
+    """
+    Sunrise and sunset of one UTC day.
+
+    Args:
+        day_start: Epoch seconds of 00:00 UTC of the day
+        latitude: Degrees, north positive
+        longitude: Degrees, east positive
+
+    Returns:
+        (sunrise, sunset) in epoch seconds (may fall outside the UTC day
+        for far east/west longitudes); (day_start, day_start + DAY) when
+        the sun does not set; None when it does not rise
+    """
+    day_of_year = datetime.fromtimestamp(day_start, timezone.utc).timetuple().tm_yday
+    gamma = 2 * math.pi / 365 * (day_of_year - 1)
+    eqtime = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma)
+                       - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
+    decl = (0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma)
+            - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma)
+            - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma))
+
+    lat = math.radians(latitude)
+    cos_ha = math.cos(ZENITH) / (math.cos(lat) * math.cos(decl)) - math.tan(lat) * math.tan(decl)
+    if cos_ha <= -1.0:
+        return day_start, day_start + DAY
+    if cos_ha >= 1.0:
+        return None
+    ha = math.degrees(math.acos(cos_ha))
+
+    # Minutes after 00:00 UTC
+    sunrise = 720 - 4 * (longitude + ha) - eqtime
+    sunset = 720 - 4 * (longitude - ha) - eqtime
+    return day_start + sunrise * 60, day_start + sunset * 60
+
+
+class Daylight:
+    """Daylight periods at a location, widened by margin seconds on both ends"""
+
+    def __init__(self, latitude: float, longitude: float, margin: float = 0.0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.margin = margin
+        self._cache: Tuple[float, List[Tuple[float, float]]] = (math.nan, [])
+
+    def _periods(self, now: float) -> List[Tuple[float, float]]:
+        """Daylight periods of yesterday, today and the next two days (UTC)"""
+        today = now // DAY * DAY
+        if self._cache[0] != today:
+            periods = []
+            for offset in (-1, 0, 1, 2):
+                times = sun_times(today + offset * DAY, self.latitude, self.longitude)
+                if times is not None:
+                    periods.append((times[0] - self.margin, times[1] + self.margin))
+            self._cache = (today, periods)
+        return self._cache[1]
+
+    def is_day(self, now: float) -> bool:
+        """True between sunrise - margin and sunset + margin"""
+        return any(start <= now <= end for start, end in self._periods(now))
+
+    def until_day(self, now: float) -> Optional[float]:
+        """Seconds until the next daylight period starts (0 during the day, None if not soon)"""
+        if self.is_day(now):
+            return 0.0
+        starts = [start for start, _ in self._periods(now) if start > now]
+        return min(starts) - now if starts else None
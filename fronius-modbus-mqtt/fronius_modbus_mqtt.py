@@ -11,6 +11,11 @@ Features:
 - Event flag and status code parsing
 - Publish-on-change or publish-all modes
 - Device caching for optimized startup
+- Optional Prometheus metrics endpoint
+- Inverter control writes (Model 123/124) via MQTT command topics
+- Streaming 1-minute/15-minute rollups to InfluxDB and MQTT
+- Recent history per device field, queried over MQTT
+- Night backoff for sleeping inverters (status and sunrise/sunset)
 """
 
 import sys
@@ -32,6 +37,17 @@ from fronius import (
     MQTTPublisher,
     InfluxDBPublisher,
 )
+from fronius.change_filter import ChangeFilter
+from fronius.commands import parse_command
+from fronius.metrics import (
+    MetricsRegistry,
+    MetricsServer,
+    influxdb_collector,
+    modbus_collector,
+    mqtt_collector,
+)
+from fronius.history import HistoryStore, parse_request
+from fronius.rollup import RollupEngine
 
 
 class FroniusModbusMQTT:
@@ -70,6 +86,10 @@ class FroniusModbusMQTT:
         self.modbus_client = None
         self.mqtt_publisher = None
         self.influxdb_publisher = None
+        self.metrics = None
+        self.metrics_server = None
+        self.rollups = None
+        self.history = None
 
         # Setup signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -102,6 +122,10 @@ class FroniusModbusMQTT:
 
     def _publish_data(self, device_id: int, device_type: str, data: dict):
         """Callback for polling threads to publish data"""
+        if self.rollups:
+            self.rollups.add(device_type, str(device_id), data)
+        if self.history:
+            self.history.add(device_type, str(device_id), data)
         if device_type == 'inverter':
             if self.mqtt_publisher:
                 self.mqtt_publisher.publish_inverter_data(str(device_id), data)
@@ -115,7 +139,8 @@ class FroniusModbusMQTT:
         elif device_type == 'storage':
             if self.mqtt_publisher:
                 self.mqtt_publisher.publish_storage_data(str(device_id), data)
-            # InfluxDB storage support can be added later if needed
+            if self.influxdb_publisher:
+                self.influxdb_publisher.write_storage_data(str(device_id), data)
 
     def _init_modbus(self) -> bool:
         """Initialize Modbus client and connect"""
@@ -123,15 +148,57 @@ class FroniusModbusMQTT:
             self.config.modbus,
             self.config.devices,
             self.register_map,
-            publish_callback=self._publish_data
+            publish_callback=self._publish_data,
+            endpoints=self.config.endpoints,
+            metrics=self.metrics,
+            controls_config=self.config.controls,
+            command_callback=self._command_result
         )
 
         if not self.modbus_client.connect():
+            if self.modbus_client.warm_start:
+                # Cached identities need no scan; the pollers reconnect
+                self.log.warning("Failed to connect to Modbus server, "
+                                 "starting from the device cache")
+                return True
             self.log.error("Failed to connect to Modbus server")
             return False
 
         return True
 
+    def _handle_command(self, device_id: str, control: str, payload: str):
+        """MQTT callback: validate a control command and queue it"""
+        received = time.monotonic()
+        value, error = parse_command(control, payload)
+        if error is None:
+            error = self.modbus_client.submit_command(device_id, control, value, received)
+        if error is not None:
+            self.log.warning(f"Command {device_id}/{control} = {payload!r} rejected: {error}")
+            self.mqtt_publisher.publish_command_result(
+                device_id, control, {'name': control, 'value': value,
+                                     'status': 'rejected', 'error': error})
+
+    def _handle_history(self, device_type: str, device_id: str, payload: str):
+        """MQTT callback: answer a history request"""
+        request, error = parse_request(payload)
+        if error is not None:
+            response = {'id': None, 'error': error}
+        else:
+            response = self.history.query(device_type, device_id, request)
+        reply_to = request.get('reply_to')
+        self.mqtt_publisher.publish_history(device_type, device_id, response,
+                                            reply_to if isinstance(reply_to, str) else None)
+
+    def _command_result(self, device_id: str, command, result: dict):
+        """Poller callback: publish the outcome of a control command"""
+        if self.mqtt_publisher:
+            self.mqtt_publisher.publish_command_result(device_id, command.name, result)
+
+    def _change_filter(self) -> ChangeFilter:
+        """Build the change filter from the change_detection settings"""
+        cd = self.config.change_detection
+        return ChangeFilter(cd.deadbands, cd.precision, cd.max_silence)
+
     def _init_mqtt(self) -> bool:
         """Initialize MQTT publisher"""
         if not self.config.mqtt.enabled:
@@ -140,7 +207,8 @@ class FroniusModbusMQTT:
 
         self.mqtt_publisher = MQTTPublisher(
             self.config.mqtt,
-            self.config.general.publish_mode
+            self.config.general.publish_mode,
+            self._change_filter()
         )
 
         if not self.mqtt_publisher.connect():
@@ -162,11 +230,60 @@ class FroniusModbusMQTT:
 
         self.influxdb_publisher = InfluxDBPublisher(
             self.config.influxdb,
-            publish_mode
+            publish_mode,
+            self._change_filter()
         )
 
         return self.influxdb_publisher.is_enabled()
 
+    def _init_rollups(self):
+        """Create the rollup engine with the enabled publishers as sinks"""
+        cfg = self.config.rollups
+        if not cfg.enabled:
+            return
+        sinks = []
+        if cfg.influxdb and self.influxdb_publisher:
+            sinks.append(self.influxdb_publisher.write_rollup)
+        if cfg.mqtt and self.mqtt_publisher:
+            sinks.append(self.mqtt_publisher.publish_rollup)
+        if not sinks:
+            self.log.warning("Rollups enabled but no InfluxDB/MQTT output, rollups disabled")
+            return
+        self.rollups = RollupEngine(cfg, sinks)
+        self.log.info(f"Rollups: {', '.join(self.rollups.get_stats()['windows'])} windows")
+
+    def _init_history(self):
+        """Create the history ring buffers (requests need MQTT)"""
+        cfg = self.config.history
+        if not cfg.enabled:
+            return
+        if not self.mqtt_publisher:
+            self.log.warning("History enabled but MQTT is disabled, history disabled")
+            return
+        self.history = HistoryStore(cfg)
+
+    def _init_metrics(self):
+        """Create the metrics registry (before Modbus, so the pollers record into it)"""
+        if not self.config.metrics.enabled:
+            return
+        buckets = self.config.metrics.buckets
+        self.metrics = MetricsRegistry(buckets) if buckets else MetricsRegistry()
+
+    def _start_metrics_server(self):
+        """Register the scrape-time collectors and start serving"""
+        if self.metrics is None:
+            return
+        self.metrics.add_collector(modbus_collector(self.modbus_client))
+        if self.mqtt_publisher:
+            self.metrics.add_collector(mqtt_collector(self.mqtt_publisher))
+        if self.influxdb_publisher:
+            self.metrics.add_collector(influxdb_collector(self.influxdb_publisher))
+
+        cfg = self.config.metrics
+        self.metrics_server = MetricsServer(self.metrics, cfg.host, cfg.port, cfg.path)
+        if not self.metrics_server.start():
+            self.metrics_server = None
+
     def _discover_devices(self):
         """Discover devices at configured IDs based on device_filter"""
         filter_msg = f" (filter: {self.device_filter})" if self.device_filter != 'all' else ""
@@ -183,14 +300,19 @@ class FroniusModbusMQTT:
         self.log.info("=" * 60)
 
         # Log device configuration
-        self.log.info(f"Configured inverters: {self.config.devices.inverters}")
-        self.log.info(f"Configured meters: {self.config.devices.meters}")
+        for endpoint in self.config.endpoints:
+            self.log.info(f"Endpoint {endpoint.name} ({endpoint.modbus.host}:{endpoint.modbus.port}, "
+                          f"{endpoint.modbus.transport}): inverters {endpoint.inverters}, "
+                          f"meters {endpoint.meters}")
         self.log.info(f"Meter poll interval: {self.config.devices.meter_poll_interval}s")
-        self.log.info(f"Inverter poll delay: {self.config.devices.inverter_poll_delay}s between each")
+        self.log.info(f"Inverter poll interval: {self.config.devices.inverter_poll_interval}s")
 
         # Initialize publishers FIRST (before modbus, so callback can use them)
         self._init_mqtt()
         self._init_influxdb()
+        self._init_rollups()
+        self._init_history()
+        self._init_metrics()
 
         # Initialize Modbus (with publish callback)
         if not self._init_modbus():
@@ -208,6 +330,14 @@ class FroniusModbusMQTT:
 
         # Start device polling threads (they publish directly via callback)
         self.modbus_client.start_polling()
+        if self.config.controls.enabled:
+            if self.mqtt_publisher:
+                self.mqtt_publisher.subscribe_commands(self._handle_command)
+            else:
+                self.log.warning("Controls enabled but MQTT is disabled, no commands accepted")
+        if self.history:
+            self.mqtt_publisher.subscribe_history(self._handle_history)
+        self._start_metrics_server()
 
         # Main loop just keeps the app running
         self.running = True
@@ -221,6 +351,8 @@ class FroniusModbusMQTT:
         while self.running:
             try:
                 time.sleep(1)
+                if self.rollups:
+                    self.rollups.close_due()
             except KeyboardInterrupt:
                 break
 
@@ -235,6 +367,9 @@ class FroniusModbusMQTT:
             self.mqtt_publisher.publish_status("offline")
             time.sleep(0.5)  # Allow message to be sent
 
+        if self.metrics_server:
+            self.metrics_server.stop()
+
         # Close connections
         if self.modbus_client:
             self.modbus_client.disconnect()
@@ -249,9 +384,43 @@ class FroniusModbusMQTT:
         # Log stats
         if self.modbus_client:
             stats = self.modbus_client.get_stats()
+            for name, ep in stats['endpoints'].items():
+                pacing = ep['pacing']
+                self.log.info(
+                    f"Modbus stats [{name}]: {ep['successful_reads']} reads, "
+                    f"{ep['failed_reads']} failures, {ep['reconnects']} reconnects, "
+                    f"gap {pacing['gap_ms']}ms, latency {pacing['latency_ms']}ms, "
+                    f"error rate {pacing['error_rate']}, "
+                    f"{ep['deadline_misses']} deadline misses, "
+                    f"{ep['unchanged_polls'].get('hits', 0)} unchanged polls skipped"
+                )
+                commands = ep['commands']
+                if commands.get('total'):
+                    self.log.info(
+                        f"Control stats [{name}]: {commands['total']} commands, "
+                        f"{commands['failed']} failed, {commands['expired']} expired, "
+                        f"latency avg {commands['avg_latency_ms']}ms / "
+                        f"max {commands['max_latency_ms']}ms"
+                    )
+                backoff = ep['backoff']
+                if backoff.get('enabled'):
+                    self.log.info(
+                        f"Backoff stats [{name}]: {backoff['transitions']} transitions, "
+                        f"{len(backoff['asleep'])} inverters asleep"
+                    )
+
+        if self.rollups:
+            stats = self.rollups.get_stats()
+            self.log.info(
+                f"Rollup stats: {stats['samples_total']} samples, "
+                f"{stats['rollups_emitted']} windows emitted"
+            )
+
+        if self.history:
+            stats = self.history.get_stats()
             self.log.info(
-                f"Modbus stats: {stats['successful_reads']} reads, "
-                f"{stats['failed_reads']} failures"
+                f"History stats: {stats['devices']} devices, {stats['memory_kib']} KiB, "
+                f"{stats['queries_total']} queries"
             )
 
         if self.mqtt_publisher:
@@ -265,8 +434,12 @@ class FroniusModbusMQTT:
             stats = self.influxdb_publisher.get_stats()
             self.log.info(
                 f"InfluxDB stats: {stats['writes_total']} writes, "
-                f"{stats['writes_failed']} failures"
+                f"{stats['writes_failed']} failures, "
+                f"{stats['lines_rejected']} lines rejected"
             )
+            if stats['spool'] and stats['spool']['pending_bytes']:
+                self.log.info(f"InfluxDB spool: {stats['spool']['pending_bytes'] // 1024} KiB "
+                              f"left for replay on next start")
 
         self.log.info("Shutdown complete")
 
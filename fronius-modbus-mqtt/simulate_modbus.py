@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Fronius Modbus TCP Simulator
+
+Serves SunSpec register images of inverters and meters over Modbus TCP so
+the bridge can be developed and benchmarked without a DataManager. Point
+modbus.host/port of the bridge configuration at the simulator.
+
+Images come from register dumps (scan_registers.py output or
+{"unit": {"start": [registers]}}) or are built from registers.json.
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+
+from fronius.logging_setup import setup_logging
+from fronius.simulator import (
+    ModbusSimulator,
+    SimulatedDevice,
+    SimulatorQuirks,
+    build_inverter_image,
+    build_meter_image,
+    load_dump,
+)
+
+
+def parse_ids(value: str):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+async def serve(simulator: ModbusSimulator):
+    await simulator.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fronius Modbus TCP simulator")
+    parser.add_argument('--host', default='127.0.0.1', help='Listen address')
+    parser.add_argument('--port', type=int, default=5020, help='Listen port')
+    parser.add_argument('--registers', default='config/registers.json',
+                        help='Register map used for synthetic images')
+    parser.add_argument('--dump', action='append', default=[],
+                        help='Register dump to serve (repeatable)')
+    parser.add_argument('--inverters', type=parse_ids, default=None,
+                        help='Synthetic inverter unit IDs (default: 1 without --dump)')
+    parser.add_argument('--meters', type=parse_ids, default=None,
+                        help='Synthetic meter unit IDs (default: 240 without --dump)')
+    parser.add_argument('--storage', type=parse_ids, default=[],
+                        help='Synthetic inverters with Model 124')
+    parser.add_argument('--mppt-modules', type=int, default=2, help='Model 160 modules')
+    parser.add_argument('--float', action='store_true', help='Float register maps (113/213)')
+    parser.add_argument('--animate', action='store_true', help='Time-varying values')
+    parser.add_argument('--day-length', type=float, default=600.0,
+                        help='Seconds per simulated day (--animate)')
+    parser.add_argument('--update-interval', type=float, default=1.0,
+                        help='Seconds between value changes (--animate)')
+    parser.add_argument('--datamanager', action='store_true',
+                        help='DataManager quirks: 1 connection, 5%% stale, 40ms latency')
+    parser.add_argument('--max-connections', type=int, default=None,
+                        help='Drop the oldest connection beyond this (0 = unlimited)')
+    parser.add_argument('--stale-rate', type=float, default=None,
+                        help='Stale answer probability after a unit ID switch')
+    parser.add_argument('--latency-ms', type=float, default=None, help='Delay per request')
+    parser.add_argument('--jitter-ms', type=float, default=None, help='Random extra delay')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Serve pipelined requests in parallel (GEN24)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    log = setup_logging(args.log_level)
+    with open(args.registers) as f:
+        register_map = json.load(f)
+
+    banks = {}
+    for path in args.dump:
+        banks.update(load_dump(path))
+    inverters = args.inverters if args.inverters is not None else ([] if banks else [1])
+    meters = args.meters if args.meters is not None else ([] if banks else [240])
+    for unit_id in inverters:
+        banks.setdefault(unit_id, build_inverter_image(
+            unit_id, register_map, args.float, args.mppt_modules, unit_id in args.storage))
+    for unit_id in meters:
+        banks.setdefault(unit_id, build_meter_image(unit_id, register_map, args.float))
+    if not banks:
+        parser.error("no units to serve")
+
+    devices = {
+        unit_id: SimulatedDevice(unit_id, bank, register_map, animate=args.animate,
+                                 day_length=args.day_length,
+                                 update_interval=args.update_interval, seed=args.seed)
+        for unit_id, bank in banks.items()
+    }
+
+    quirks = SimulatorQuirks(max_connections=1, stale_rate=0.05, latency_ms=40.0, jitter_ms=20.0) \
+        if args.datamanager else SimulatorQuirks()
+    for name in ('max_connections', 'stale_rate', 'latency_ms', 'jitter_ms'):
+        if getattr(args, name) is not None:
+            setattr(quirks, name, getattr(args, name))
+    quirks.concurrent = args.concurrent
+
+    simulator = ModbusSimulator(devices, args.host, args.port, quirks, seed=args.seed)
+    for unit_id, device in sorted(devices.items()):
+        log.info(f"Unit {unit_id}: models " +
+                 ", ".join(f"{m}@{a}" for m, a, _ in device.models))
+    try:
+        asyncio.run(serve(simulator))
+    finally:
+        log.info(f"Simulator stats: {simulator.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
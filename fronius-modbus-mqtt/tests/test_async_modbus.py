@@ -0,0 +1,117 @@
+"""ModbusTcpPipeline response matching, failures and shutdown"""
+
+import asyncio
+import socket
+import struct
+
+import pytest
+
+from fronius.async_modbus import (ModbusPipelineStale, ModbusPipelineTimeout,
+                                  ModbusTcpPipeline, PipelinedConnection)
+from fronius.config import ModbusConfig
+from fronius.register_parser import RegisterParser
+
+
+def serve(answer):
+    """Server replying to each request with answer(transaction_id, unit_id, pdu) bytes"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                transaction_id, _, length, unit_id = struct.unpack(
+                    '>HHHB', await reader.readexactly(7))
+                pdu = await reader.readexactly(length - 1)
+                writer.write(answer(transaction_id, unit_id, pdu))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+    return asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+def registers(transaction_id, unit_id, values, function=0x03):
+    pdu = struct.pack(f'>BB{len(values)}H', function, len(values) * 2, *values)
+    return struct.pack('>HHHB', transaction_id, 0, len(pdu) + 1, unit_id) + pdu
+
+
+def run(answer, check):
+    async def main():
+        server = await serve(answer)
+        pipeline = ModbusTcpPipeline('127.0.0.1', server.sockets[0].getsockname()[1], timeout=1.0)
+        assert await pipeline.connect()
+        try:
+            await check(pipeline)
+        finally:
+            await pipeline.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_matching_response():
+    async def check(pipeline):
+        assert await pipeline.read_holding_registers(40001, 2, 1) == [0x5375, 0x6e53]
+
+    run(lambda tid, unit, pdu: registers(tid, unit, [0x5375, 0x6e53]), check)
+
+
+@pytest.mark.parametrize('answer', [
+    lambda tid, unit, pdu: registers(tid, unit + 1, [1, 2]),
+    lambda tid, unit, pdu: registers(tid, unit, [1, 2], function=0x04),
+    lambda tid, unit, pdu: registers(tid, unit, [1, 2])[:2] + b'\x00\x01' + registers(
+        tid, unit, [1, 2])[4:],
+], ids=['unit', 'function', 'protocol'])
+def test_mismatched_response_is_stale(answer):
+    async def check(pipeline):
+        with pytest.raises(ModbusPipelineStale):
+            await pipeline.read_holding_registers(40001, 2, 1)
+        assert pipeline.stale_responses == 1
+        assert pipeline.connected
+
+    run(answer, check)
+
+
+def test_invalid_length_drops_the_connection():
+    async def check(pipeline):
+        with pytest.raises(ModbusPipelineTimeout, match='connection lost'):
+            await pipeline.read_holding_registers(40001, 2, 1)
+        assert not pipeline.connected
+        assert pipeline._reader_task.done()
+
+    run(lambda tid, unit, pdu: struct.pack('>HHHB', tid, 0, 0, unit), check)
+
+
+def test_close_finishes_the_reader_task():
+    async def main():
+        server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        pipeline = ModbusTcpPipeline('127.0.0.1', port, timeout=1.0)
+        assert await pipeline.connect()
+        task = pipeline._reader_task
+        # Writer already gone: close() must not rely on wait_closed() to yield
+        writer, pipeline.writer = pipeline.writer, None
+
+        await pipeline.close()
+
+        assert task.done()
+        assert pipeline._reader_task is None
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_failed_reconnect_counts_every_request():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    connection = PipelinedConnection(ModbusConfig(host='127.0.0.1', port=port, timeout=1,
+                                                  pacing_max_ms=50), RegisterParser({}))
+    try:
+        assert connection.read_many([(40001, 2, 1), (40003, 2, 1), (40005, 2, 2)]) == [None] * 3
+    finally:
+        connection.disconnect()
+
+    assert connection.failed_reads == 3
+    assert connection.pacer.failures == 3
+    assert connection.pacer.timeouts == 3
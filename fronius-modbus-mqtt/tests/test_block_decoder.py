@@ -0,0 +1,51 @@
+"""Not-implemented handling of the compiled inverter blocks"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from fronius.register_parser import RegisterParser
+
+
+REGISTERS = Path(__file__).resolve().parent.parent / 'config' / 'registers.json'
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return RegisterParser(json.loads(REGISTERS.read_text()))
+
+
+@pytest.mark.parametrize('model_id', [101, 102, 103, 111, 112, 113])
+def test_status_registers_keep_0xffff(parser, model_id):
+    decoder = parser.inverter_decoders[model_id]
+    registers = [0xFFFF] * decoder.length
+    data = parser.parse_inverter_measurements(registers, model_id)
+
+    assert data['status_code'] == 0xFFFF
+    assert data['status_vendor'] == 0xFFFF
+    # Everything else stays "not implemented"
+    assert data['ac_current'] is None
+    assert data['evt1'] is None
+
+
+def test_status_code_with_other_sentinels(parser):
+    decoder = parser.inverter_decoders[103]
+    registers = [0] * decoder.length
+    registers[36] = 4                 # St: MPPT
+    registers[31] = 0x8000            # TmpCab not implemented
+    data = parser.parse_inverter_measurements(registers, 103)
+
+    assert data['status_code'] == 4
+    assert data['temp_cabinet'] is None
+
+
+def test_mppt_keeps_modules_without_values(parser):
+    fixed = [160, 48, 0, 0, 0, 0, 0, 0, 2, 0]
+    idle = [1] + [0] * 8 + [0xFFFF] * 3 + [0xFFFF] * 4 + [0x8000, 0xFFFF, 0, 0]
+    active = [2] + [0] * 8 + [2, 4000, 80, 0, 0, 0, 0, 25, 4, 0, 0]
+    data = parser.parse_mppt_measurements(fixed + idle + active)
+
+    assert [module['id'] for module in data['modules']] == [1, 2]
+    assert data['modules'][0]['dc_voltage'] is None
+    assert data['modules'][1]['dc_voltage'] == 4000.0
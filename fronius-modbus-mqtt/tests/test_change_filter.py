@@ -0,0 +1,187 @@
+"""ChangeFilter deadbands for every published field, and their effect on MQTT"""
+
+import pytest
+
+from fronius.change_filter import ChangeFilter
+from fronius.config import MQTTConfig
+from fronius.mqtt_publisher import MQTTPublisher
+
+
+# Expected quantity of every field the publishers compare (None = no deadband)
+EXPECTED = {
+    # Inverter (Model 101-103)
+    'ac_current': 'current', 'ac_current_a': 'current', 'ac_current_b': 'current',
+    'ac_current_c': 'current',
+    'ac_voltage_ab': 'voltage', 'ac_voltage_bc': 'voltage', 'ac_voltage_ca': 'voltage',
+    'ac_voltage_an': 'voltage', 'ac_voltage_bn': 'voltage', 'ac_voltage_cn': 'voltage',
+    'ac_power': 'power', 'ac_frequency': 'frequency', 'apparent_power': 'power',
+    'reactive_power': 'power', 'power_factor': 'power_factor', 'lifetime_energy': 'energy',
+    'dc_current': 'current', 'dc_voltage': 'voltage', 'dc_power': 'power',
+    'temp_cabinet': 'temperature', 'temp_heatsink': 'temperature',
+    'temp_transformer': 'temperature', 'temp_other': 'temperature',
+    'status_code': None, 'status_vendor': None,
+    'status': None, 'is_active': None, 'model': None, 'manufacturer': None,
+    'serial_number': None, 'num_modules': None,
+    # Immediate controls (Model 123)
+    'controls.connected': 'setpoint', 'controls.power_limit_pct': 'setpoint',
+    'controls.power_limit_enabled': 'setpoint', 'controls.power_factor': 'setpoint',
+    'controls.power_factor_enabled': 'setpoint', 'controls.var_enabled': 'setpoint',
+    # MPPT (Model 160)
+    'dc_energy': 'energy', 'temperature': 'temperature',
+    # Meter
+    'current_total': 'current', 'current_a': 'current', 'current_b': 'current',
+    'current_c': 'current',
+    'voltage_ln_avg': 'voltage', 'voltage_an': 'voltage', 'voltage_bn': 'voltage',
+    'voltage_cn': 'voltage', 'voltage_ll_avg': 'voltage', 'voltage_ab': 'voltage',
+    'voltage_bc': 'voltage', 'voltage_ca': 'voltage',
+    'frequency': 'frequency',
+    'power_total': 'power', 'power_a': 'power', 'power_b': 'power', 'power_c': 'power',
+    'va_total': 'power', 'va_a': 'power', 'va_b': 'power', 'va_c': 'power',
+    'var_total': 'power', 'var_a': 'power', 'var_b': 'power', 'var_c': 'power',
+    'pf_avg': 'power_factor', 'pf_a': 'power_factor', 'pf_b': 'power_factor',
+    'pf_c': 'power_factor',
+    'energy_exported': 'energy', 'energy_exported_a': 'energy', 'energy_exported_b': 'energy',
+    'energy_exported_c': 'energy', 'energy_imported': 'energy', 'energy_imported_a': 'energy',
+    'energy_imported_b': 'energy', 'energy_imported_c': 'energy',
+    # Storage (Model 124)
+    'max_charge_power': 'setpoint', 'charge_ramp_rate': 'setpoint',
+    'discharge_ramp_rate': 'setpoint', 'storage_control_mode': 'setpoint',
+    'max_charge_va': 'setpoint', 'min_reserve_pct': 'setpoint',
+    'charge_state_pct': 'percent', 'available_storage_ah': None, 'battery_voltage': 'voltage',
+    'charge_status_code': None,
+    'discharge_rate_pct': 'setpoint', 'charge_rate_pct': 'setpoint',
+    'rate_window_secs': 'setpoint', 'rate_revert_secs': 'setpoint',
+    'rate_ramp_secs': 'setpoint', 'grid_charging_code': 'setpoint',
+    'charge_status': None, 'grid_charging': None, 'charge_limit_active': None,
+    'discharge_limit_active': None,
+}
+
+
+def published_fields():
+    """Data fields selecting the deadband of every per-field MQTT topic"""
+    fields = {field for _, field in MQTTPublisher(MQTTConfig(enabled=False))
+              ._inverter_topic_fields(2)}
+    fields.update(field for _, field in MQTTPublisher.METER_TOPIC_FIELDS)
+    fields.update(field for _, field in MQTTPublisher.STORAGE_TOPIC_FIELDS)
+    return fields
+
+
+def test_every_published_field_is_covered():
+    assert published_fields() == set(EXPECTED)
+
+
+@pytest.mark.parametrize('field', sorted(EXPECTED))
+def test_band(field):
+    change_filter = ChangeFilter()
+    quantity = EXPECTED[field]
+    assert change_filter.quantity(field) == quantity
+    expected = ChangeFilter.DEFAULT_DEADBANDS[quantity] if quantity else ChangeFilter.NO_DEADBAND
+    assert change_filter.band(field) == expected
+
+
+def test_setpoints_have_no_deadband():
+    change_filter = ChangeFilter()
+    assert change_filter.changed(100.0, 95.0, change_filter.band('controls.power_limit_pct'))
+    assert change_filter.changed(1.0, 0.95, change_filter.band('controls.power_factor'))
+    assert change_filter.changed(50.0, 49.5, change_filter.band('discharge_rate_pct'))
+    # The measured PF (a percentage) keeps its deadband
+    assert not change_filter.changed(99.5, 99.0, change_filter.band('power_factor'))
+
+
+def test_field_override_beats_quantity():
+    change_filter = ChangeFilter({'ac_power': 5, 'setpoint': 1, 'controls.power_factor': 0})
+    assert change_filter.band('ac_power') == (5.0, 0.0)
+    assert change_filter.band('dc_power') == ChangeFilter.DEFAULT_DEADBANDS['power']
+    assert change_filter.band('controls.power_limit_pct') == (1.0, 0.0)
+    assert change_filter.band('controls.power_factor') == (0.0, 0.0)
+
+
+class FakeResult:
+    rc = 0
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.messages.append((topic, payload))
+        return FakeResult()
+
+
+@pytest.fixture
+def publisher():
+    pub = MQTTPublisher(MQTTConfig(enabled=False))
+    pub.client = FakeClient()
+    pub.connected = True
+    return pub
+
+
+def inverter(**controls):
+    data = {'ac_power': 1500.0, 'power_factor': 99.0, 'status_code': 4,
+            'controls': {'connected': True, 'power_limit_pct': 100.0, 'power_limit_enabled': False,
+                         'power_factor': 1.0, 'power_factor_enabled': False,
+                         'var_enabled': False}}
+    data['controls'].update(controls)
+    return data
+
+
+def sent(publisher, topic):
+    return [payload for t, payload in publisher.client.messages if t == topic]
+
+
+def test_control_readbacks_are_published(publisher):
+    publisher.publish_inverter_data('1', inverter())
+    publisher.publish_inverter_data('1', inverter(power_limit_pct=95.0, power_limit_enabled=True))
+    publisher.publish_inverter_data('1', inverter(power_limit_pct=95.0, power_limit_enabled=True,
+                                                  power_factor=0.95))
+
+    assert sent(publisher, 'fronius/inverter/1/controls/power_limit_pct') == ['100.0', '95.0']
+    assert sent(publisher, 'fronius/inverter/1/controls/power_factor') == ['1.0', '0.95']
+    assert sent(publisher, 'fronius/inverter/1/PF') == ['99.0']
+
+
+@pytest.fixture
+def json_publisher():
+    pub = MQTTPublisher(MQTTConfig(enabled=False, publish_format='json'))
+    pub.client = FakeClient()
+    pub.connected = True
+    return pub
+
+
+def test_document_ignores_changes_inside_deadbands(json_publisher):
+    data = inverter()
+    json_publisher.publish_inverter_data('1', data)
+    for ac_power, power_factor in ((1500.001, 99.0), (1505.0, 99.5), (1509.0, 99.4)):
+        json_publisher.publish_inverter_data('1', dict(data, ac_power=ac_power,
+                                                       power_factor=power_factor))
+
+    assert len(sent(json_publisher, 'fronius/inverter/1/state')) == 1
+    assert json_publisher.messages_skipped == 3
+
+
+def test_document_publishes_values_leaving_their_deadband(json_publisher):
+    data = inverter()
+    json_publisher.publish_inverter_data('1', data)
+    json_publisher.publish_inverter_data('1', dict(data, ac_power=1520.0))
+    json_publisher.publish_inverter_data('1', dict(inverter(power_factor=0.95), ac_power=1520.0))
+    json_publisher.publish_inverter_data('1', dict(inverter(power_factor=0.95), ac_power=1520.0,
+                                                   events=['GROUND_FAULT']))
+
+    docs = sent(json_publisher, 'fronius/inverter/1/state')
+    assert len(docs) == 4
+    assert '"W":1520.0' in docs[1]
+    assert '"power_factor":0.95' in docs[2]
+    assert '"events":["GROUND_FAULT"]' in docs[3]
+
+
+def test_document_deadband_is_relative_to_last_published(json_publisher):
+    data = inverter()
+    json_publisher.publish_inverter_data('1', data)
+    # 6 W steps never reach the 15 W band alone, but add up against the last document
+    for step in range(1, 4):
+        json_publisher.publish_inverter_data('1', dict(data, ac_power=1500.0 + 6 * step))
+
+    docs = sent(json_publisher, 'fronius/inverter/1/state')
+    assert len(docs) == 2
+    assert '"W":1518.0' in docs[1]
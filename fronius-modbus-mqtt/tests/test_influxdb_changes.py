@@ -0,0 +1,76 @@
+"""InfluxDBPublisher change detection per measurement (publish_mode 'changed')"""
+
+import pytest
+
+from fronius.config import InfluxDBConfig
+from fronius.influxdb_publisher import InfluxDBPublisher
+
+
+class FakeWriteApi:
+    def __init__(self):
+        self.lines = []
+
+    def write(self, bucket, record):
+        self.lines.extend(record.split('\n'))
+
+
+@pytest.fixture
+def publisher():
+    pub = InfluxDBPublisher(InfluxDBConfig(enabled=False, batch_interval=0, write_interval=0))
+    pub.config.enabled = True
+    pub.connected = True
+    pub.write_api = FakeWriteApi()
+    return pub
+
+
+def inverter(power_limit_pct=100.0, power_factor=1.0, dc_power=(800.0, 700.0), ac_power=1500.0):
+    return {
+        'ac_power': ac_power, 'power_factor': 99.0,
+        'controls': {'connected': True, 'power_limit_pct': power_limit_pct,
+                     'power_limit_enabled': power_limit_pct < 100.0,
+                     'power_factor': power_factor, 'power_factor_enabled': power_factor != 1.0},
+        'mppt': {'num_modules': 2, 'modules': [
+            {'id': i + 1, 'dc_power': power, 'dc_voltage': 400.0}
+            for i, power in enumerate(dc_power)]},
+    }
+
+
+def measurements(publisher):
+    return [line.split(',', 1)[0] for line in publisher.write_api.lines]
+
+
+def test_first_poll_writes_every_measurement(publisher):
+    publisher.write_inverter_data('1', inverter())
+    assert measurements(publisher) == ['fronius_inverter', 'fronius_mppt', 'fronius_mppt',
+                                       'fronius_controls']
+
+
+def test_control_change_is_written_while_ac_values_are_steady(publisher):
+    publisher.write_inverter_data('1', inverter())
+    publisher.write_api.lines.clear()
+
+    publisher.write_inverter_data('1', inverter(power_limit_pct=95.0, ac_power=1501.0))
+    publisher.write_inverter_data('1', inverter(power_limit_pct=95.0, power_factor=0.95))
+
+    assert measurements(publisher) == ['fronius_controls', 'fronius_controls']
+    assert 'power_limit_pct=95.0' in publisher.write_api.lines[0]
+    assert 'power_factor=0.95' in publisher.write_api.lines[1]
+
+
+def test_mppt_strings_are_compared_separately(publisher):
+    publisher.write_inverter_data('1', inverter())
+    publisher.write_api.lines.clear()
+
+    publisher.write_inverter_data('1', inverter(dc_power=(800.0, 650.0)))
+
+    assert measurements(publisher) == ['fronius_mppt']
+    assert 'string=2' in publisher.write_api.lines[0]
+
+
+def test_unchanged_poll_writes_nothing(publisher):
+    publisher.write_inverter_data('1', inverter())
+    publisher.write_api.lines.clear()
+
+    publisher.write_inverter_data('1', inverter(ac_power=1502.0))
+
+    assert publisher.write_api.lines == []
@@ -0,0 +1,99 @@
+"""InfluxDBPublisher outage spool: rejected lines versus unavailable server"""
+
+import pytest
+from influxdb_client.rest import ApiException
+
+from fronius.config import InfluxDBConfig
+from fronius.influxdb_publisher import InfluxDBPublisher
+from fronius.spool import LineSpool
+
+
+class FakeWriteApi:
+    """Stores written lines; refuses requests containing 'bad' lines with a 400"""
+
+    def __init__(self):
+        self.lines = []
+        self.requests = 0
+        self.down = False
+
+    def write(self, bucket, record):
+        self.requests += 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        lines = record.split('\n')
+        if any('bad' in line for line in lines):
+            raise ApiException(status=400, reason="Bad Request")
+        self.lines.extend(lines)
+
+
+@pytest.fixture
+def publisher(tmp_path):
+    config = InfluxDBConfig(enabled=False, batch_interval=0, retry_interval=60.0,
+                            replay_rate=1000)
+    pub = InfluxDBPublisher(config)
+    pub.config.enabled = True
+    pub.write_api = FakeWriteApi()
+    pub.spool = LineSpool(str(tmp_path))
+    return pub
+
+
+def points(prefix, count):
+    return [f"m,n={prefix} v={i} {i}" for i in range(count)]
+
+
+def test_rejected_live_line_is_dropped_without_outage(publisher):
+    lines = points('a', 7) + ['m bad'] + points('b', 8)
+    publisher._submit(lines)
+
+    assert publisher.connected
+    assert publisher._retry_at == 0.0
+    assert not publisher.spool.segments
+    assert publisher.lines_rejected == 1
+    assert publisher.write_api.lines == points('a', 7) + points('b', 8)
+    assert publisher.writes_total == 15
+
+
+def test_rejected_line_in_spool_does_not_block_replay(publisher):
+    publisher.spool.append(points('a', 5) + ['m bad'] + points('b', 5))
+    publisher._submit(points('live', 1))
+
+    assert not publisher.spool.segments
+    assert publisher.spool.lines_replayed == 11
+    assert publisher.lines_rejected == 1
+    assert publisher.write_api.lines == points('live', 1) + points('a', 5) + points('b', 5)
+    assert publisher.connected
+    assert publisher._retry_at == 0.0
+
+
+def test_live_writes_continue_after_rejected_replay(publisher):
+    publisher.spool.append(['m bad'])
+    for i in range(30):
+        publisher._submit(points(f'live{i}', 1))
+
+    assert publisher.write_api.lines == [line for i in range(30) for line in points(f'live{i}', 1)]
+    assert not publisher.spool.segments
+    assert publisher.spool.lines_spooled == 1
+
+
+def test_unavailable_server_spools_and_holds_off(publisher):
+    publisher.connected = True
+    publisher.write_api.down = True
+    publisher._submit(points('a', 3))
+    publisher._submit(points('b', 3))
+
+    assert not publisher.connected
+    assert publisher._retry_at > 0
+    assert publisher.write_api.requests == 1
+    assert publisher.spool.lines_spooled == 6
+    assert publisher.lines_rejected == 0
+
+
+def test_spool_is_kept_while_replay_fails(publisher):
+    publisher.spool.append(points('a', 3))
+    publisher.write_api.down = True
+
+    publisher._replay(1.0)
+
+    assert publisher.spool.segments
+    assert not publisher.connected
+    assert publisher.write_api.lines == []
@@ -0,0 +1,87 @@
+"""ModbusConnection response validation against a scripted Modbus client"""
+
+import pytest
+
+from fronius import modbus_client
+from fronius.config import ModbusConfig
+from fronius.modbus_client import ModbusConnection
+from fronius.register_parser import RegisterParser
+
+
+class FakeResponse:
+    def __init__(self, registers, unit_id):
+        self.registers = list(registers)
+        self.dev_id = unit_id
+        self.transaction_id = None
+
+    def isError(self):
+        return False
+
+
+class FakeClient:
+    """Answers every read from a {(unit, address): registers} table"""
+
+    blocks = {}
+    wrong_unit = None     # Answer with this unit ID instead of the requested one
+
+    def __init__(self, host, port, timeout):
+        self.requests = []
+        self.socket = None
+
+    def connect(self):
+        return True
+
+    def is_socket_open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def read_holding_registers(self, address, count, slave):
+        self.requests.append((slave, address + 1, count))
+        registers = self.blocks[(slave, address + 1)][:count]
+        return FakeResponse(registers, self.wrong_unit or slave)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    monkeypatch.setattr(modbus_client, 'ModbusTcpClient', FakeClient)
+    FakeClient.blocks = {}
+    FakeClient.wrong_unit = None
+    conn = ModbusConnection(ModbusConfig(host='test', retry_attempts=3, retry_delay=0.0),
+                            RegisterParser({}), initial_gap=0.0)
+    assert conn.connect()
+    return conn
+
+
+def test_identical_blocks_from_different_units_are_not_stale(connection):
+    header = [123, 24] + [0] * 24
+    idle = [0] * 40
+    for unit in (1, 2, 3):
+        FakeClient.blocks[(unit, 40239)] = header
+        FakeClient.blocks[(unit, 40072)] = idle
+
+    for unit in (1, 2, 3, 1, 2, 3):
+        assert connection.read_registers(40239, 26, unit) == header
+        assert connection.read_registers(40072, 40, unit) == idle
+
+    assert connection.stale_responses == 0
+    assert connection.reconnects == 0
+    assert len(connection.client.requests) == 12
+    assert connection.pacer.failures == 0
+
+
+def test_wrong_unit_id_is_stale(connection):
+    FakeClient.blocks[(1, 40072)] = [1] * 10
+    FakeClient.wrong_unit = 2
+
+    assert connection.read_registers(40072, 10, 1) is None
+    assert connection.stale_responses == 3
+    assert connection.failed_reads == 1
+
+
+def test_short_response_is_stale(connection):
+    FakeClient.blocks[(1, 40072)] = [1] * 5
+
+    assert connection.read_registers(40072, 10, 1) is None
+    assert connection.stale_responses == 3
@@ -0,0 +1,55 @@
+"""Warm start from the device cache while the gateway is unreachable"""
+
+import socket
+import time
+
+import pytest
+
+from fronius.config import DevicesConfig, ModbusConfig
+from fronius.device_cache import DeviceCache
+from fronius.modbus_client import FroniusModbusClient
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    path = str(tmp_path / 'device_cache.json')
+    cache = DeviceCache(path)
+    cache.set_device(1, 'inverter', {'device_id': 1, 'model': 'Symo 10.0-3-M',
+                                     'serial_number': '12345', 'model_id': 103,
+                                     'has_storage': False, 'host': '127.0.0.1'})
+    cache.set_discovery_complete()
+    return path
+
+
+def client(cache_file, **devices):
+    modbus = ModbusConfig(host='127.0.0.1', port=closed_port(), timeout=1, retry_attempts=1,
+                          pacing_max_ms=50)
+    config = DevicesConfig(inverters=[1], cache_file=cache_file, **devices)
+    return FroniusModbusClient(modbus, config, {})
+
+
+def test_cached_devices_are_polled_without_connection(cache_file):
+    fronius = client(cache_file)
+
+    assert not fronius.connect()
+    assert fronius.warm_start
+    inverters, meters = fronius.discover_devices()
+    assert [inv['serial_number'] for inv in inverters] == ['12345']
+
+    fronius.start_polling()
+    try:
+        time.sleep(0.2)
+        assert fronius.device_poller.is_alive()
+    finally:
+        fronius.disconnect()
+
+
+def test_no_warm_start_without_cache(cache_file):
+    assert not client(cache_file, device_cache=False).warm_start
+    assert not client(cache_file + '.missing').warm_start